@@ -0,0 +1,10 @@
+# benchmarks/__init__.py
+
+"""
+Offline benchmark suite of the Web Accessibility Checker.
+
+Serves a synthetic website from a local fixture server and measures crawling, sitemap parsing, result saving
+and report reading against it, without network access or a browser:
+
+    python -m benchmarks --pages 2000 --fan-out 8 --sitemap-files 20 --gzip --output bench.json
+"""
@@ -0,0 +1,140 @@
+# benchmarks/axe_payloads.py
+
+import copy
+import logging
+import os
+import random
+from typing import Any
+
+from util.results_processor import ResultsProcessor
+
+# (rule id, impact, tags) of the rules the synthetic results are made of
+_RULES = [
+    ("color-contrast", "serious", ["cat.color", "wcag2aa", "wcag143"]),
+    ("image-alt", "critical", ["cat.text-alternatives", "wcag2a", "wcag111"]),
+    ("link-name", "serious", ["cat.name-role-value", "wcag2a", "wcag244", "wcag412"]),
+    ("label", "critical", ["cat.forms", "wcag2a", "wcag412", "wcag131"]),
+    ("heading-order", "moderate", ["cat.semantics", "best-practice"]),
+    ("region", "moderate", ["cat.keyboard", "best-practice"]),
+    ("landmark-one-main", "moderate", ["cat.semantics", "best-practice"]),
+    ("button-name", "critical", ["cat.name-role-value", "wcag2a", "wcag412"]),
+    ("list", "serious", ["cat.structure", "wcag2a", "wcag131"]),
+    ("duplicate-id", "minor", ["cat.parsing", "wcag2a", "wcag411"]),
+    ("aria-allowed-attr", "critical", ["cat.aria", "wcag2a", "wcag412"]),
+    ("document-title", "serious", ["cat.text-alternatives", "wcag2a", "wcag242"]),
+]
+
+
+def _node(rule: str, impact: str, index: int, rng: random.Random) -> dict[str, Any]:
+    """
+    Returns a node of an axe result the way axe-core reports it.
+    """
+    selector = f"#main > .teaser:nth-child({index + 1}) > a"
+    check_data = ({"fgColor": f"#{rng.randrange(0x1000000):06x}", "bgColor": "#ffffff",
+                   "contrastRatio": round(rng.uniform(1.5, 4.4), 2), "fontSize": "12.0pt"}
+                  if rule == "color-contrast" else None)
+    return {
+        "any": [{"id": rule, "data": check_data, "impact": impact, "message": f"Check {rule} failed",
+                 "relatedNodes": []}],
+        "all": [],
+        "none": [],
+        "impact": impact,
+        "html": f'<a href="/pages/{rng.randrange(10000)}" class="teaser-link">Read more</a>',
+        "target": [selector],
+        "failureSummary": f"Fix any of the following:\n  Element fails the {rule} check",
+    }
+
+
+def _rule(rule: str, impact: str | None, tags: list[str], nodes: list[dict[str, Any]]) -> dict[str, Any]:
+    return {
+        "id": rule,
+        "impact": impact,
+        "tags": tags,
+        "description": f"Ensures the {rule} rule is met",
+        "help": f"Elements must pass {rule}",
+        "helpUrl": f"https://dequeuniversity.com/rules/axe/4.10/{rule}?application=axeAPI",
+        "nodes": nodes,
+    }
+
+
+def synthetic_results(url: str, rng: random.Random, violations: int = 6, nodes: int = 5, passes: int = 40,
+                      incomplete: int = 2, inapplicable: int = 30) -> dict[str, Any]:
+    """
+    Generates axe-core results of a page with the structure of `axe.run`.
+
+    Args:
+        url (str): The URL of the page.
+        rng (random.Random): The source of randomness, seeded by the caller for reproducible payloads.
+        violations (int, optional): The number of violated rules. Defaults to 6.
+        nodes (int, optional): The average number of nodes per violated rule. Defaults to 5.
+        passes (int, optional): The number of passed rules. Defaults to 40.
+        incomplete (int, optional): The number of rules needing review. Defaults to 2.
+        inapplicable (int, optional): The number of inapplicable rules. Defaults to 30.
+
+    Returns:
+        Dict: The results.
+    """
+    def rules(count: int, with_nodes: bool) -> list[dict[str, Any]]:
+        picked = []
+        for i in range(count):
+            rule, impact, tags = _RULES[i % len(_RULES)]
+            rule_id = rule if i < len(_RULES) else f"{rule}-{i}"
+            node_count = max(1, round(rng.uniform(0.5, 1.5) * nodes)) if with_nodes else 0
+            picked.append(_rule(rule_id, impact if with_nodes else None, tags,
+                                [_node(rule, impact, n, rng) for n in range(node_count)]))
+        return picked
+
+    return {
+        "testEngine": {"name": "axe-core", "version": "4.10.0"},
+        "testRunner": {"name": "axe"},
+        "testEnvironment": {"userAgent": "Mozilla/5.0 (X11; Linux x86_64) HeadlessChrome/126.0",
+                            "windowWidth": 1280, "windowHeight": 800},
+        "timestamp": "2024-07-01T12:00:00.000Z",
+        "url": url,
+        "toolOptions": {"runOnly": {"type": "tag", "values": ["wcag2a", "wcag2aa", "wcag2aaa", "best-practice"]}},
+        "violations": rules(violations, with_nodes=True),
+        "passes": rules(passes, with_nodes=True),
+        "incomplete": rules(incomplete, with_nodes=True),
+        "inapplicable": rules(inapplicable, with_nodes=False),
+    }
+
+
+def load_recorded(directory: str) -> list[dict[str, Any]]:
+    """
+    Loads the axe results saved by earlier runs (`*_accessibility_test.json` and `.json.gz`) below `directory`.
+    """
+    recorded = []
+    for root, _, names in os.walk(directory):
+        for name in sorted(names):
+            if name.endswith(("_accessibility_test.json", "_accessibility_test.json.gz")):
+                try:
+                    recorded.append(ResultsProcessor.load_results(os.path.join(root, name)))
+                except (OSError, ValueError) as e:
+                    logging.warning(f"Skipping unreadable results {name}: {e}")
+    return recorded
+
+
+def payloads_for(urls: list[str], recorded: list[dict[str, Any]] | None = None, seed: int = 0,
+                 **synthetic_options: int) -> dict[str, dict[str, Any]]:
+    """
+    Returns axe results for every URL: the recorded results in turn if there are any, synthetic ones otherwise.
+
+    Args:
+        urls (List[str]): The page URLs.
+        recorded (List[Dict], optional): Results of real pages, see `load_recorded`. Defaults to None.
+        seed (int, optional): The seed of the synthetic results. Defaults to 0.
+        **synthetic_options: Passed to `synthetic_results`.
+
+    Returns:
+        Dict[str, Dict]: The results by URL.
+    """
+    rng = random.Random(seed)
+    payloads = {}
+    for i, url in enumerate(urls):
+        if recorded:
+            payload = copy.deepcopy(recorded[i % len(recorded)])
+            payload["url"] = url
+        else:
+            payload = synthetic_results(url, rng, **synthetic_options)
+        payloads[url] = payload
+    return payloads
@@ -0,0 +1,270 @@
+# benchmarks/fixture_site.py
+
+import gzip
+import hashlib
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+
+class SiteSpec:
+    """
+    The shape of a synthetic website.
+
+    Pages form a tree: page `n` links to its `fan_out` children `n * fan_out + 1 ...`, so a breadth-first
+    crawl reaches every page within `crawl_depth()` levels. Every page also links to `cross_links` random
+    pages and to the first pages of the site from its navigation, like real templates do.
+
+    Attributes:
+        pages (int): The number of HTML pages.
+        fan_out (int): The number of child pages linked from every page.
+        cross_links (int): The number of additional links to random pages.
+        sitemap_files (int): The number of child sitemaps listed in the sitemap index.
+        gzip (bool): Serve the child sitemaps as `.xml.gz` and HTML gzip-encoded to clients accepting it.
+        latency_ms (float): Milliseconds every response is delayed by.
+        jitter_ms (float): Additional random delay of up to this many milliseconds.
+        seed (int): The seed of the random links and delays.
+    """
+
+    def __init__(self, pages: int = 1000, fan_out: int = 8, cross_links: int = 2, sitemap_files: int = 10,
+                 gzip: bool = False, latency_ms: float = 0.0, jitter_ms: float = 0.0, seed: int = 0):
+        self.pages = max(1, pages)
+        self.fan_out = max(1, fan_out)
+        self.cross_links = max(0, cross_links)
+        self.sitemap_files = max(1, sitemap_files)
+        self.gzip = gzip
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.seed = seed
+
+    def crawl_depth(self) -> int:
+        """
+        Returns the crawl depth at which the tree links alone reach every page.
+        """
+        depth, last_page = 0, 0
+        while last_page < self.pages - 1:
+            last_page = last_page * self.fan_out + self.fan_out
+            depth += 1
+        return depth
+
+    def to_dict(self) -> dict[str, Any]:
+        return dict(vars(self))
+
+
+class _FixtureHandler(BaseHTTPRequestHandler):
+    """
+    Answers the requests of a FixtureSite. Keeps connections alive like a production web server.
+    """
+    protocol_version = "HTTP/1.1"
+    server: "_FixtureServer"
+
+    def do_GET(self) -> None:
+        self._respond(send_body=True)
+
+    def do_HEAD(self) -> None:
+        self._respond(send_body=False)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass  # thousands of requests per second are not worth a log line
+
+    def _respond(self, send_body: bool) -> None:
+        site = self.server.site
+        site.count_request()
+        site.delay()
+        resource = site.resource(self.path.split("?")[0])
+        if resource is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        content_type, body = resource
+        etag = f'"{hashlib.sha1(body).hexdigest()[:16]}"'
+        if self.headers.get("If-None-Match") == etag:
+            site.count_not_modified()
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("ETag", etag)
+        if site.spec.gzip and content_type.startswith("text/html") and "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body, compresslevel=5)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+
+class _FixtureServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # the crawler opens many connections at once
+    request_queue_size = 256
+    site: "FixtureSite"
+
+
+class FixtureSite:
+    """
+    A local HTTP server that generates the pages, robots.txt and sitemaps of a SiteSpec.
+
+    - `/` and `/pages/<n>`: HTML pages with navigation, tree and cross links
+    - `/robots.txt`: allows everything and points to `/sitemap_index.xml`
+    - `/sitemap_index.xml`: lists `sitemap_files` child sitemaps `/sitemaps/<i>.xml` (`.xml.gz` with gzip)
+
+    Every response carries an ETag and `If-None-Match` is answered with `304 Not Modified`, so the persistent
+    HTTP cache behaves as against a real server. Use it as a context manager:
+
+        with FixtureSite(SiteSpec(pages=500)) as site:
+            WebsiteCrawler(site.base_url).crawl_urls_to_test(site.base_url, site.spec.crawl_depth())
+
+    Attributes:
+        spec (SiteSpec): The shape of the site.
+        requests_served (int): The number of requests answered.
+        not_modified (int): The number of `304 Not Modified` responses.
+    """
+
+    def __init__(self, spec: SiteSpec, host: str = "127.0.0.1", port: int = 0):
+        """
+        Args:
+            spec (SiteSpec): The shape of the site.
+            host (str, optional): The address to listen on. Defaults to 127.0.0.1.
+            port (int, optional): The port; 0 picks a free one. Defaults to 0.
+        """
+        self.spec = spec
+        self.requests_served = 0
+        self.not_modified = 0
+        self._host = host
+        self._port = port
+        self._server: _FixtureServer | None = None
+        self._lock = threading.Lock()
+        self._random = random.Random(spec.seed)
+        self._cross_links = [[random.Random(spec.seed * 1_000_003 + page).randrange(spec.pages)
+                              for _ in range(spec.cross_links)] for page in range(spec.pages)]
+
+    @property
+    def base_url(self) -> str:
+        """
+        The URL of the home page, e.g. `http://127.0.0.1:54321/`.
+        """
+        host, port = self._server.server_address[:2] if self._server else (self._host, self._port)
+        return f"http://{host}:{port}/"
+
+    def start(self) -> "FixtureSite":
+        """
+        Starts serving from a daemon thread.
+        """
+        self._server = _FixtureServer((self._host, self._port), _FixtureHandler)
+        self._server.site = self
+        threading.Thread(target=self._server.serve_forever, name="fixture-site", daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        """
+        Stops the server.
+        """
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "FixtureSite":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    # ------------------------------------------------------------------ #
+    # Content                                                            #
+    # ------------------------------------------------------------------ #
+    def page_path(self, page: int) -> str:
+        """
+        Returns the path of a page; page 0 is the home page.
+        """
+        return "/" if page == 0 else f"/pages/{page}"
+
+    def page_urls(self) -> list[str]:
+        """
+        Returns the URLs of all pages of the site.
+        """
+        return [self.base_url.rstrip("/") + self.page_path(page) for page in range(self.spec.pages)]
+
+    def _page(self, page: int) -> bytes:
+        spec = self.spec
+        children = range(page * spec.fan_out + 1, min(spec.pages, page * spec.fan_out + spec.fan_out + 1))
+        navigation = "".join(f'<li><a href="{self.page_path(n)}">Section {n}</a></li>'
+                             for n in range(min(spec.pages, 6)))
+        links = "".join(f'<li class="teaser"><a href="{self.page_path(n)}">Page {n}</a><p>Teaser of page {n}.</p></li>'
+                        for n in [*children, *self._cross_links[page]])
+        paragraphs = "".join(f"<p>Paragraph {i} of page {page}. Lorem ipsum dolor sit amet, consectetur "
+                             f"adipiscing elit, sed do eiusmod tempor incididunt ut labore.</p>" for i in range(8))
+        return (f'<!DOCTYPE html><html lang="en"><head><meta charset="utf-8"><title>Page {page}</title></head>'
+                f'<body><header><nav><ul>{navigation}</ul></nav></header>'
+                f'<main><h1>Page {page}</h1>{paragraphs}<ul>{links}</ul>'
+                f'<img src="/static/{page}.png"><a href="#top">Top</a><a href="/feed/" rel="nofollow">Feed</a></main>'
+                f'<footer><p>Fixture site</p></footer></body></html>').encode()
+
+    def _sitemap_index(self) -> bytes:
+        extension = "xml.gz" if self.spec.gzip else "xml"
+        entries = "".join(f"<sitemap><loc>{self.base_url}sitemaps/{i}.{extension}</loc></sitemap>"
+                          for i in range(self.spec.sitemap_files))
+        return ('<?xml version="1.0" encoding="UTF-8"?>'
+                f'<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</sitemapindex>').encode()
+
+    def _sitemap(self, index: int) -> bytes | None:
+        if not 0 <= index < self.spec.sitemap_files:
+            return None
+        base_url = self.base_url.rstrip("/")
+        entries = "".join(f"<url><loc>{base_url}{self.page_path(page)}</loc><lastmod>2024-01-{page % 28 + 1:02d}</lastmod></url>"
+                          for page in range(index, self.spec.pages, self.spec.sitemap_files))
+        content = ('<?xml version="1.0" encoding="UTF-8"?>'
+                   f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</urlset>').encode()
+        # compresslevel and mtime are fixed so the ETag does not change between requests
+        return gzip.compress(content, compresslevel=5, mtime=0) if self.spec.gzip else content
+
+    def resource(self, path: str) -> tuple[str, bytes] | None:
+        """
+        Returns the content type and body of a path, None if it does not exist.
+        """
+        if path == "/robots.txt":
+            return "text/plain", f"User-agent: *\nAllow: /\nSitemap: {self.base_url}sitemap_index.xml\n".encode()
+        if path == "/sitemap_index.xml":
+            return "application/xml", self._sitemap_index()
+        if path.startswith("/sitemaps/"):
+            name = path.removeprefix("/sitemaps/").removesuffix(".gz").removesuffix(".xml")
+            sitemap = self._sitemap(int(name)) if name.isdigit() else None
+            if sitemap is None:
+                return None
+            return ("application/x-gzip" if self.spec.gzip else "application/xml"), sitemap
+        if path == "/":
+            return "text/html; charset=utf-8", self._page(0)
+        if path.startswith("/pages/"):
+            name = path.removeprefix("/pages/")
+            if name.isdigit() and 0 < int(name) < self.spec.pages:
+                return "text/html; charset=utf-8", self._page(int(name))
+        return None
+
+    # ------------------------------------------------------------------ #
+    # Accounting                                                         #
+    # ------------------------------------------------------------------ #
+    def delay(self) -> None:
+        """
+        Waits the configured latency plus jitter before a response.
+        """
+        if not (self.spec.latency_ms or self.spec.jitter_ms):
+            return
+        with self._lock:
+            jitter = self._random.uniform(0, self.spec.jitter_ms)
+        time.sleep((self.spec.latency_ms + jitter) / 1000)
+
+    def count_request(self) -> None:
+        with self._lock:
+            self.requests_served += 1
+
+    def count_not_modified(self) -> None:
+        with self._lock:
+            self.not_modified += 1
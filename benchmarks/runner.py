@@ -0,0 +1,354 @@
+# benchmarks/runner.py
+
+import argparse
+import json
+import logging
+import math
+import multiprocessing
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Any
+
+from config.constants import COLUMNAR_RESULTS_NAME, CRAWL_MAX_WORKERS
+from util.accessibility_report_viewer import AccessibilityReportViewer
+from util.metrics import SpanLog
+from util.rate_limiter import host_rate_limiter
+from util.results_processor import ResultsProcessor
+from util.sitemap_parser import SitemapParser
+from util.website_crawler import WebsiteCrawler
+
+from .axe_payloads import load_recorded, payloads_for
+from .fixture_site import FixtureSite, SiteSpec
+
+# Exit codes: no regression (or no baseline), regression against the baseline
+EXIT_OK, EXIT_REGRESSION = 0, 1
+
+
+def _percentiles(values: list[float]) -> dict[str, float] | None:
+    """
+    Returns the p50, p95, p99 and maximum of `values` in seconds, None if there are none.
+    """
+    if not values:
+        return None
+    values = sorted(values)
+
+    def percentile(share: float) -> float:
+        return round(values[max(0, math.ceil(share * len(values)) - 1)], 6)
+
+    return {"p50": percentile(0.5), "p95": percentile(0.95), "p99": percentile(0.99), "max": round(values[-1], 6)}
+
+
+def _peak_rss_mb() -> float | None:
+    """
+    Returns the peak resident set size of the current process in MiB, None where it is not available.
+    """
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _result(items: int, unit: str, seconds: float, latency: dict[str, float] | None,
+            **extra: Any) -> dict[str, Any]:
+    """
+    Builds the result of a scenario run.
+    """
+    return {"items": items, "unit": unit, "seconds": round(seconds, 4),
+            "items_per_second": round(items / seconds, 2) if seconds else None,
+            "latency": latency, **extra}
+
+
+# ---------------------------------------------------------------------- #
+# Scenarios, run in a fresh process each                                 #
+# ---------------------------------------------------------------------- #
+def _crawl(options: dict[str, Any], base_url: str, work_directory: str) -> dict[str, Any]:
+    span_log = SpanLog(work_directory)
+    crawler = WebsiteCrawler(base_url, max_workers=options["crawl_workers"], span_log=span_log)
+    started = time.perf_counter()
+    urls = crawler.crawl_urls_to_test(base_url, options["depth"])
+    seconds = time.perf_counter() - started
+    phases = span_log.summarize()
+    fetch = phases.get("crawl_fetch")
+    latency = {key: fetch[key] for key in ("p50", "p95", "p99", "max")} if fetch else None
+    return _result(len(urls), "pages", seconds, latency, phases=phases)
+
+
+def _crawl_cached(options: dict[str, Any], base_url: str, work_directory: str) -> dict[str, Any]:
+    # an untimed first crawl fills the HTTP cache, the second one revalidates every page
+    WebsiteCrawler(base_url, max_workers=options["crawl_workers"]).crawl_urls_to_test(base_url, options["depth"])
+    return _crawl(options, base_url, work_directory)
+
+
+def _sitemap(options: dict[str, Any], base_url: str, work_directory: str) -> dict[str, Any]:
+    span_log = SpanLog(work_directory)
+    parser = SitemapParser(base_url, span_log=span_log)
+    started = time.perf_counter()
+    parser.has_sitemap()
+    urls = parser.get_sitemap_urls()
+    seconds = time.perf_counter() - started
+    phases = span_log.summarize()
+    sitemap = phases.get("sitemap")
+    latency = {key: sitemap[key] for key in ("p50", "p95", "p99", "max")} if sitemap else None
+    return _result(len(urls), "urls", seconds, latency, sitemaps=sitemap["count"] if sitemap else 0)
+
+
+def _payloads(options: dict[str, Any]) -> dict[str, dict[str, Any]]:
+    recorded = load_recorded(options["payloads"]) if options["payloads"] else None
+    return payloads_for(options["page_urls"][:options["result_pages"]], recorded, options["seed"],
+                        violations=options["violations"], nodes=options["nodes"])
+
+
+def _save_results(options: dict[str, Any], work_directory: str, storage: str) -> dict[str, Any]:
+    payloads = _payloads(options)
+    test_directory = os.path.join(work_directory, "run")
+    os.makedirs(test_directory)
+    latencies = []
+    started = time.perf_counter()
+    for url, payload in payloads.items():
+        page_started = time.perf_counter()
+        ResultsProcessor(url, payload, test_directory, storage).save_results()
+        latencies.append(time.perf_counter() - page_started)
+    compact_started = time.perf_counter()
+    ResultsProcessor.compact_columnar_results(test_directory)
+    seconds = time.perf_counter() - started
+    return _result(len(payloads), "pages", seconds, _percentiles(latencies),
+                   compact_seconds=round(time.perf_counter() - compact_started, 4))
+
+
+def _read_reports(options: dict[str, Any], work_directory: str, storage: str) -> dict[str, Any]:
+    payloads = _payloads(options)
+    test_directory = os.path.join(work_directory, "run")
+    os.makedirs(test_directory)
+    processors = [ResultsProcessor(url, payload, test_directory, storage) for url, payload in payloads.items()]
+    for processor in processors:
+        processor.save_results()
+    ResultsProcessor.compact_columnar_results(test_directory)
+    columnar_path = os.path.join(test_directory, COLUMNAR_RESULTS_NAME) if storage == "columnar" else None
+
+    latencies = []
+    violating_nodes = 0
+    started = time.perf_counter()
+    for processor in processors:
+        page_started = time.perf_counter()
+        viewer = AccessibilityReportViewer(processor.get_json_path(), columnar_path, processor.url)
+        viewer.calculate_accessibility_score()
+        violating_nodes += len(viewer.create_violations_dataframe())
+        viewer.extract_critical_violations()
+        latencies.append(time.perf_counter() - page_started)
+    seconds = time.perf_counter() - started
+    return _result(len(processors), "pages", seconds, _percentiles(latencies), violating_nodes=violating_nodes)
+
+
+# Scenario name -> function(options, base_url, work_directory)
+SCENARIOS: dict[str, Callable[[dict[str, Any], str, str], dict[str, Any]]] = {
+    "crawl": _crawl,
+    "crawl_cached": _crawl_cached,
+    "sitemap": _sitemap,
+    "results_json": lambda options, base_url, work_directory: _save_results(options, work_directory, "json"),
+    "results_columnar": lambda options, base_url, work_directory: _save_results(options, work_directory, "columnar"),
+    "report_json": lambda options, base_url, work_directory: _read_reports(options, work_directory, "json"),
+    "report_columnar": lambda options, base_url, work_directory: _read_reports(options, work_directory, "columnar"),
+}
+
+
+def run_scenario(name: str, options: dict[str, Any], base_url: str) -> dict[str, Any]:
+    """
+    Runs one scenario in a temporary working directory, so the results index, HTTP cache and metrics
+    file of the scenario (all below `data/`) start empty and do not touch the real ones.
+    Meant to run in a fresh process, which makes the peak RSS that of the scenario.
+    """
+    logging.basicConfig(level=options["log_level"], format='%(asctime)s %(levelname)s %(message)s',
+                        stream=sys.stderr)
+    # pace the fixture host like a production host, or not at all
+    host_rate_limiter.initial_rate = host_rate_limiter.max_rate = options["host_rate"] or 1e9
+
+    previous_directory = os.getcwd()
+    work_directory = tempfile.mkdtemp(prefix=f"a11y-bench-{name}-")
+    os.chdir(work_directory)
+    rss_start = _peak_rss_mb()
+    try:
+        result = SCENARIOS[name](options, base_url, work_directory)
+    finally:
+        os.chdir(previous_directory)
+        shutil.rmtree(work_directory, ignore_errors=True)
+    return {"scenario": name, **result, "rss_start_mb": rss_start, "peak_rss_mb": _peak_rss_mb()}
+
+
+# ---------------------------------------------------------------------- #
+# Suite                                                                  #
+# ---------------------------------------------------------------------- #
+def _git_commit() -> str | None:
+    try:
+        completed = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                   check=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return completed.stdout.strip()
+
+
+def run_suite(spec: SiteSpec, scenarios: list[str], options: dict[str, Any], repeat: int = 1) -> dict[str, Any]:
+    """
+    Serves the site of `spec` and runs every scenario `repeat` times, each run in a fresh process.
+
+    Of several runs of a scenario the one with the median throughput is reported, with the throughput of
+    all runs in `runs`. `requests` and `not_modified` count what the fixture server answered during that run.
+
+    Returns:
+        Dict: The machine-readable report.
+    """
+    results = []
+    context = multiprocessing.get_context("spawn")
+    with FixtureSite(spec) as site:
+        options = {**options, "page_urls": site.page_urls()}
+        for name in scenarios:
+            runs = []
+            for attempt in range(repeat):
+                requests_before, not_modified_before = site.requests_served, site.not_modified
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                    result = executor.submit(run_scenario, name, options, site.base_url).result()
+                result["requests"] = site.requests_served - requests_before
+                result["not_modified"] = site.not_modified - not_modified_before
+                logging.info(f"{name} ({attempt + 1}/{repeat}): {result['items']} {result['unit']} in "
+                             f"{result['seconds']:.2f}s, {result['items_per_second']} {result['unit']}/s, "
+                             f"peak RSS {result['peak_rss_mb']} MiB")
+                runs.append(result)
+            runs.sort(key=lambda run: run["items_per_second"] or 0)
+            reported = dict(runs[len(runs) // 2])
+            reported["runs"] = [run["items_per_second"] for run in runs]
+            results.append(reported)
+
+    return {
+        "suite": "a11y-benchmarks",
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "site": spec.to_dict(),
+        "options": {key: value for key, value in options.items() if key != "page_urls"},
+        "results": results,
+    }
+
+
+def compare(report: dict[str, Any], baseline: dict[str, Any], tolerance: float) -> list[str]:
+    """
+    Compares a report with a baseline report of the same suite.
+
+    A scenario regresses if its throughput dropped, or its p95 latency or peak RSS grew, by more than
+    `tolerance` (a share, e.g. 0.2 for 20 %). Scenarios missing from either report are skipped.
+
+    Returns:
+        List[str]: One message per regression.
+    """
+    baseline_results = {result["scenario"]: result for result in baseline.get("results", [])}
+    regressions = []
+    for result in report["results"]:
+        base = baseline_results.get(result["scenario"])
+        if not base:
+            continue
+        name = result["scenario"]
+        if base.get("items_per_second") and (result["items_per_second"] or 0) < base["items_per_second"] * (1 - tolerance):
+            regressions.append(f"{name}: {result['items_per_second']} {result['unit']}/s, baseline {base['items_per_second']}")
+        p95, base_p95 = (result.get("latency") or {}).get("p95"), (base.get("latency") or {}).get("p95")
+        if p95 and base_p95 and p95 > base_p95 * (1 + tolerance):
+            regressions.append(f"{name}: p95 latency {p95}s, baseline {base_p95}s")
+        if result.get("peak_rss_mb") and base.get("peak_rss_mb") and result["peak_rss_mb"] > base["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(f"{name}: peak RSS {result['peak_rss_mb']} MiB, baseline {base['peak_rss_mb']} MiB")
+    return regressions
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """
+    Parses the command-line arguments.
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Benchmark crawling, sitemap parsing, result saving and report reading against a local synthetic site.",
+    )
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"Comma-separated scenarios to run. Default: all of {', '.join(SCENARIOS)}.")
+    site = parser.add_argument_group("synthetic site")
+    site.add_argument("--pages", type=int, default=1000, help="HTML pages of the site. Default: 1000.")
+    site.add_argument("--fan-out", type=int, default=8, help="Child pages linked from every page. Default: 8.")
+    site.add_argument("--cross-links", type=int, default=2, help="Links to random pages per page. Default: 2.")
+    site.add_argument("--sitemap-files", type=int, default=10, help="Child sitemaps in the sitemap index. Default: 10.")
+    site.add_argument("--gzip", action="store_true", help="Serve gzipped sitemaps and gzip-encoded HTML.")
+    site.add_argument("--latency-ms", type=float, default=0.0, help="Delay of every response. Default: 0.")
+    site.add_argument("--jitter-ms", type=float, default=0.0, help="Random additional delay of up to this. Default: 0.")
+    site.add_argument("--seed", type=int, default=0, help="Seed of links, delays and payloads. Default: 0.")
+    run = parser.add_argument_group("runs")
+    run.add_argument("--depth", type=int, help="The crawl depth. Default: deep enough to reach every page.")
+    run.add_argument("--crawl-workers", type=int, default=CRAWL_MAX_WORKERS,
+                     help=f"Concurrent requests while crawling. Default: {CRAWL_MAX_WORKERS}.")
+    run.add_argument("--host-rate", type=float, default=0.0,
+                     help="Requests per second to the fixture host, like A11Y_HTTP_HOST_RATE. Default: 0, unlimited.")
+    run.add_argument("--result-pages", type=int,
+                     help="Pages saved and read by the results and report scenarios. Default: --pages.")
+    run.add_argument("--violations", type=int, default=6, help="Violated rules per synthetic payload. Default: 6.")
+    run.add_argument("--nodes", type=int, default=5, help="Average nodes per violated rule. Default: 5.")
+    run.add_argument("--payloads", metavar="DIRECTORY",
+                     help="Use the axe results saved below this directory (e.g. a run directory) instead of synthetic ones.")
+    run.add_argument("--repeat", type=int, default=1, help="Runs per scenario; the median is reported. Default: 1.")
+    output = parser.add_argument_group("output")
+    output.add_argument("--output", metavar="FILE", help="Write the report to FILE instead of stdout.")
+    output.add_argument("--baseline", metavar="FILE", help="Compare with an earlier report and fail on regressions.")
+    output.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed change against the baseline before it counts as a regression. Default: 0.2.")
+    output.add_argument("-v", "--verbose", action="store_true", help="Log the messages of the benchmarked code.")
+    args = parser.parse_args(argv)
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios {', '.join(unknown)}, expected some of {', '.join(SCENARIOS)}")
+    return args
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s', stream=sys.stderr)
+
+    spec = SiteSpec(pages=args.pages, fan_out=args.fan_out, cross_links=args.cross_links,
+                    sitemap_files=args.sitemap_files, gzip=args.gzip, latency_ms=args.latency_ms,
+                    jitter_ms=args.jitter_ms, seed=args.seed)
+    options = {
+        "depth": spec.crawl_depth() if args.depth is None else args.depth,
+        "crawl_workers": args.crawl_workers,
+        "host_rate": args.host_rate,
+        "result_pages": args.result_pages or spec.pages,
+        "violations": args.violations,
+        "nodes": args.nodes,
+        "payloads": os.path.abspath(args.payloads) if args.payloads else None,
+        "seed": args.seed,
+        # the benchmarked code logs every page at INFO, which would be measured as well
+        "log_level": logging.INFO if args.verbose else logging.WARNING,
+    }
+    report = run_suite(spec, args.scenarios, options, max(1, args.repeat))
+
+    document = json.dumps(report, indent=4)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(document + "\n")
+        logging.info(f"Benchmark report written to {args.output}")
+    else:
+        print(document)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = compare(report, json.load(baseline_file), args.tolerance)
+        for regression in regressions:
+            logging.error(f"Regression: {regression}")
+        if regressions:
+            return EXIT_REGRESSION
+        logging.info(f"No regressions against {args.baseline}")
+    return EXIT_OK
@@ -10,10 +10,131 @@ ACCESSIBILITY_RESULTS_DIRECTORY = "accessibility_results"
 # Full paths to subfolders
 FULL_LOGS_DIRECTORY = os.path.join(DATA_DIRECTORY, LOGS_DIRECTORY)
 FULL_ACCESSIBILITY_RESULTS_DIRECTORY = os.path.join(DATA_DIRECTORY, ACCESSIBILITY_RESULTS_DIRECTORY)
+# Parsed reports, scores and tables memoized per Streamlit function (keyed by file path and mtime)
+REPORT_CACHE_MAX_ENTRIES = 256
+# Number of rules and selectors listed as top offenders in the site overview
+SITE_TOP_N = 20
+# Result storage: "json" writes pretty-printed JSON per page; "columnar" archives the raw payload as gzipped JSON
+# and writes violations and incomplete results to a Parquet dataset per run, read column-wise by the report viewer
+RESULTS_STORAGE = os.getenv("A11Y_RESULTS_STORAGE", "json")
+COLUMNAR_RESULTS_NAME = "results.parquet"
+# Rows per row group once the per-page files of a run are merged
+COLUMNAR_ROW_GROUP_SIZE = 20000
+# SQLite index of test runs and page results, used by the UI instead of scanning the results directory
+RESULTS_INDEX_PATH = os.path.join(DATA_DIRECTORY, "results_index.sqlite3")
+
+# Background audit jobs started from the UI, persisted so progress survives reruns and reconnects
+AUDIT_JOBS_PATH = os.path.join(DATA_DIRECTORY, "audit_jobs.sqlite3")
+# Audits running at the same time; they share the browsers of the WebDriver pool
+AUDIT_MAX_JOBS = int(os.getenv("A11Y_AUDIT_JOBS", "2"))
+# Seconds between two progress updates of a running job in the UI
+AUDIT_JOB_POLL_INTERVAL = 2
+
+# Metrics: counters and latency histograms in the Prometheus text format, rewritten after every crawl and run
+METRICS_FILE = os.getenv("A11Y_METRICS_FILE", os.path.join(DATA_DIRECTORY, "metrics.prom"))
+# Port of the /metrics endpoint; 0 serves no endpoint
+METRICS_PORT = int(os.getenv("A11Y_METRICS_PORT", "0"))
+# Upper bounds in seconds of the latency histogram buckets
+METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# Persistent HTTP cache for sitemaps, robots.txt and crawled pages (conditional GET with ETag/Last-Modified)
+HTTP_CACHE_ENABLED = os.getenv("A11Y_HTTP_CACHE", "true").lower() == "true"
+HTTP_CACHE_DIRECTORY = os.path.join(DATA_DIRECTORY, "http_cache")
+# Total size of cached bodies; least recently used entries are evicted beyond this
+HTTP_CACHE_MAX_BYTES = 512 * 1024 * 1024
+# Bodies larger than this are passed through without being cached
+HTTP_CACHE_MAX_ENTRY_BYTES = 32 * 1024 * 1024
+
+# HTTP transport shared by the crawler, sitemap parser, robots.txt and page checks
+# Requests per second and host at the start; raised by HTTP_HOST_RATE_INCREASE per second while the host answers,
+# halved on 429/503 (AIMD) and kept between HTTP_HOST_MIN_RATE and HTTP_HOST_MAX_RATE
+HTTP_HOST_RATE = float(os.getenv("A11Y_HTTP_HOST_RATE", "10"))
+HTTP_HOST_MIN_RATE = 0.2
+HTTP_HOST_MAX_RATE = float(os.getenv("A11Y_HTTP_HOST_MAX_RATE", "50"))
+HTTP_HOST_RATE_INCREASE = 1.0
+# Requests a host may receive at once after an idle period
+HTTP_HOST_BURST = 10
+# Retries of GET/HEAD requests after connection errors, timeouts and 429/502/503/504 responses
+HTTP_RETRIES = 3
+# Exponential backoff between retries: base * 2^(retry - 1) seconds with jitter, capped
+HTTP_BACKOFF_BASE = 0.5
+HTTP_BACKOFF_MAX = 30
+# Longest Retry-After honoured; hosts asking for more are retried after this many seconds
+HTTP_MAX_RETRY_AFTER = 120
+# Timeouts of requests that do not set their own
+HTTP_CONNECT_TIMEOUT = 5
+HTTP_READ_TIMEOUT = 15
+# Hosts whose connections are kept per session (the pool size per host is set by each session)
+HTTP_POOL_HOSTS = 16
+
+# Incremental re-audits: reuse the previous axe results of pages whose content has not changed
+INCREMENTAL_AUDIT = os.getenv("A11Y_INCREMENTAL", "").lower() == "true"
+FINGERPRINTS_DIRECTORY = os.path.join(DATA_DIRECTORY, "fingerprints")
+
+# Crawling
+# Number of concurrent fetch workers used by the WebsiteCrawler
+CRAWL_MAX_WORKERS = 8
+# Pages crawled between two checkpoints of the crawl frontier in the run directory
+CRAWL_CHECKPOINT_INTERVAL = int(os.getenv("A11Y_CRAWL_CHECKPOINT_INTERVAL", "200"))
+# Number of child sitemaps of a sitemap index fetched concurrently
+SITEMAP_MAX_WORKERS = 8
+# Parsed sitemap entries buffered between the fetch workers and the consumer
+SITEMAP_QUEUE_SIZE = 10000
+# Seconds a parsed robots.txt is reused before it is fetched again
+ROBOTS_CACHE_TTL = 3600
+
+# Template sampling: audit a few representative pages per layout template
+# Representatives audited per cluster of URLs sharing a path pattern and DOM signature
+TEMPLATE_SAMPLES_PER_CLUSTER = int(os.getenv("A11Y_TEMPLATE_SAMPLES", "2"))
+# Depth of the tag paths that make up a DOM signature
+TEMPLATE_SIGNATURE_DEPTH = 6
+
+# WebDriver pool
+# Upper bound for parallel axe workers; the actual count is also limited by CPU cores and free RAM
+AXE_MAX_WORKERS = int(os.getenv("A11Y_AXE_WORKERS", "4"))
+# Memory budget per headless Chrome used to derive the worker count from free RAM
+BROWSER_MEMORY_MB = 512
+# Maximum number of headless Chrome instances kept alive by the WebDriverPool
+WEBDRIVER_POOL_SIZE = AXE_MAX_WORKERS
+# A browser is replaced after it has audited this many pages ...
+WEBDRIVER_MAX_PAGES = 200
+# ... or once its process tree uses more than this many MB of memory
+WEBDRIVER_MAX_MEMORY_MB = 1536
 
 USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
 
 CDNJS_AXE_API = "https://api.cdnjs.com/libraries/axe-core?fields=version"
 AXE_CDN_LATEST = (
     "https://cdnjs.cloudflare.com/ajax/libs/axe-core/{version}/axe.min.js"
-)
\ No newline at end of file
+)
+
+# Page readiness before an audit: "load", "network-idle", "selector" or "dom"; "dom" also starts the
+# browsers with the eager page load strategy, auditing pages before their styles, fonts and images load
+PAGE_READY_STRATEGY = os.getenv("A11Y_PAGE_READY", "load")
+# CSS selector waited for by the "selector" strategy
+PAGE_READY_SELECTOR = os.getenv("A11Y_PAGE_READY_SELECTOR", "")
+# Seconds to wait for readiness; the page is audited as it is once this has passed
+PAGE_READY_MAX_SETTLE = 10
+# Seconds without new network resources after which a page counts as network-idle
+PAGE_NETWORK_IDLE_TIME = 0.5
+
+# Lean load: skip images, media, web fonts and analytics during audits (per run, opt-in)
+LEAN_LOAD = os.getenv("A11Y_LEAN_LOAD", "").lower() == "true"
+LEAN_LOAD_BLOCKED_EXTENSIONS = [
+    "png", "jpg", "jpeg", "gif", "webp", "avif", "bmp", "ico", "svg",  # images
+    "mp4", "webm", "ogg", "ogv", "mov", "m4v", "mp3", "wav", "m4a",    # audio / video
+    "woff", "woff2", "ttf", "otf", "eot",                              # web fonts
+]
+LEAN_LOAD_BLOCKED_HOSTS = [
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net", "googlesyndication.com",
+    "connect.facebook.net", "hotjar.com", "clarity.ms", "segment.io", "matomo.cloud", "youtube.com",
+]
+
+# axe-core script cache
+AXE_CACHE_DIRECTORY = os.path.join(DATA_DIRECTORY, "axe_cache")
+# Seconds a cached axe.min.js is used before cdnjs is asked for a newer version
+AXE_CACHE_TTL = 24 * 60 * 60
+# Seconds the asynchronous axe.run call may take per page
+AXE_SCRIPT_TIMEOUT = 120
+# axe-core pinned in package.json, used when the CDN is unreachable
+VENDORED_AXE_DIRECTORY = os.path.join("node_modules", "axe-core")
@@ -9,20 +9,37 @@
 
 """
 Convenience re-exports for the util package.
+
+The classes are imported on first access, so command-line tools that import a single
+module of the package do not load the Streamlit UI.
 """
 
-from .accessibility_tester import AccessibilityTester as AccessibilityTester
-from .helper_functions import HelperFunctions as HelperFunctions
-from .results_processor import ResultsProcessor as ResultsProcessor
-from .sitemap_parser import SitemapParser as SitemapParser
-from .ui_components import UIComponents as UIComponents
-from .website_crawler import WebsiteCrawler as WebsiteCrawler
-
-__all__ = [
-    "AccessibilityTester",
-    "HelperFunctions",
-    "ResultsProcessor",
-    "SitemapParser",
-    "UIComponents",
-    "WebsiteCrawler",
-]
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .accessibility_tester import AccessibilityTester as AccessibilityTester
+    from .helper_functions import HelperFunctions as HelperFunctions
+    from .results_processor import ResultsProcessor as ResultsProcessor
+    from .sitemap_parser import SitemapParser as SitemapParser
+    from .ui_components import UIComponents as UIComponents
+    from .website_crawler import WebsiteCrawler as WebsiteCrawler
+
+_EXPORTS = {
+    "AccessibilityTester": ".accessibility_tester",
+    "HelperFunctions": ".helper_functions",
+    "ResultsProcessor": ".results_processor",
+    "SitemapParser": ".sitemap_parser",
+    "UIComponents": ".ui_components",
+    "WebsiteCrawler": ".website_crawler",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -1,16 +1,35 @@
+import gzip
 import json
+import os
 
 import pandas as pd
 
+from util.violation_flattener import VIOLATION_COLUMNS, flatten_violations
+
 
 class AccessibilityReportViewer:
-    def __init__(self, json_file):
-        # Load the JSON data from the file upon initialization
-        with open(json_file) as file:
-            self.data = json.load(file)
+    def __init__(self, json_file, columnar_path=None, url=None):
+        # The JSON is only loaded when a method needs it. With a columnar store of the run
+        # (see ResultsProcessor.save_results_to_columnar) the violations table is read from there.
+        self.json_file = json_file
+        self.columnar_path = columnar_path
+        self.url = url
+        self._data = None
+
+    @property
+    def data(self):
+        if self._data is None:
+            opener = gzip.open if self.json_file.endswith('.gz') else open
+            with opener(self.json_file, 'rt') as file:
+                self._data = json.load(file)
+        return self._data
     
 
     def calculate_accessibility_score(self):
+        return self.score_results(self.data)
+
+    @staticmethod
+    def score_results(data):
         # Impact weights for different levels of severity
         impact_weights = {
             'critical': 3,#3
@@ -24,16 +43,16 @@ class AccessibilityReportViewer:
         total_penalty = 0
 
         # Calculate the penalty for each violation based on its impact level
-        for violation in self.data['violations']:
+        for violation in data['violations']:
             impact_level = violation['impact']
             weight = impact_weights.get(impact_level, 0)  # Default to 0 if impact level not found
             total_penalty += weight
 
         # Calculate the number of checks
-        total_checks = (len(self.data['violations']) + 
-                        len(self.data['passes']) + 
-                        len(self.data['incomplete']) + 
-                        len(self.data['inapplicable']))
+        total_checks = (len(data['violations']) + 
+                        len(data['passes']) + 
+                        len(data['incomplete']) + 
+                        len(data['inapplicable']))
         
         # Avoid division by zero
         if total_checks == 0:
@@ -68,50 +87,24 @@ class AccessibilityReportViewer:
     
 
     def create_violations_dataframe(self):
-    #with open(result_path, 'r') as json_file:
-        #results = json.load(json_file)
-    
-    # Extract the data needed for the dataframe
-        data_rows = []
-        for violation in self.data['violations']:
-            for node in violation['nodes']:
-                # Extract data from the "any" list inside the node
-                any_list = node.get('any', [])
-                #data_list = [item.get('data', []) for item in any_list if item.get('data') is not None]
-                data_list = []
-                for item in any_list:
-                    data = item.get('data', [])
-                    if isinstance(data, list):
-                        data_list.extend(data)
-                    else:
-                        data_list.extend([data])
-                # Flatten and join the data elements
-                #flattened_data = " | ".join([data_item for sublist in data_list for data_item in sublist])
-                flattened_data = " | ".join([str(data_item) for data_item in data_list])
-
-                targets = node.get('target', [])
-                flattened_targets = " | ".join([str(target) for sublist in targets for target in (sublist if isinstance(sublist, list) else [sublist])])
-
-
-                data_rows.append({
-                    #'URL': violation.get('url', ''),
-                    'ID': violation.get('id', ''),
-                    'Description': violation.get('description', ''),
-                    'Impact': violation.get('impact', ''),
-                    'Help': violation.get('help', ''),
-                    'HTML': node.get('html', ''),
-                    'Target': flattened_targets,
-                    #'Target': " | ".join(node.get('target', [])),
-                    'Help URL': violation.get('helpUrl', ''),
-                    'Tags': violation.get('tags', ''),
-                    'FailureSummary': node.get('failureSummary', ''),
-                    'Data': flattened_data,
-                    'Url' : self.data['url']
-                })
-    
-        # Create the dataframe
-        df = pd.DataFrame(data_rows)
-        return df
+        if self.columnar_path and self.url and os.path.isdir(self.columnar_path):
+            return self._read_columnar_violations()
+
+        columns = flatten_violations(self.data['violations'], self.data['url'])
+        if not columns['ID']:
+            return pd.DataFrame()
+        return pd.DataFrame(columns)
+
+    def _read_columnar_violations(self):
+        # Reads only the shown columns and the rows of this page from the Parquet dataset of the run
+        import pyarrow.dataset as ds
+
+        dataset = ds.dataset(self.columnar_path, format='parquet')
+        table = dataset.to_table(
+            columns=VIOLATION_COLUMNS,
+            filter=(ds.field('Url') == self.url) & (ds.field('Result') == 'violations'),
+        )
+        return table.to_pandas()
 
 # Example usage
 #json_file = 'path_to_your_json_file'  # Replace with your actual JSON file path
@@ -1,143 +1,496 @@
 # util/accessibility_tester.py
+import itertools
+import json
 import logging
 import os
+import queue
+import shutil
+import threading
+import time
+from collections.abc import Callable, Iterable, Sized
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
 
-import streamlit as st
 from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.ui import WebDriverWait
-from webdriver_manager.chrome import ChromeDriverManager
-from typing import Any, Optional, Tuple, Set, Dict
 
+from config.constants import (
+    AXE_SCRIPT_TIMEOUT,
+    FULL_ACCESSIBILITY_RESULTS_DIRECTORY,
+    INCREMENTAL_AUDIT,
+    LEAN_LOAD,
+    LEAN_LOAD_BLOCKED_EXTENSIONS,
+    LEAN_LOAD_BLOCKED_HOSTS,
+    RESULTS_STORAGE,
+)
+from util.axe_script_cache import axe_script_cache
+from util.fingerprint_store import FingerprintStore
 from util.helper_functions import HelperFunctions
+from util.metrics import SpanLog, metrics, timed
+from util.page_readiness import PageReadiness
+from util.results_index import results_index
 from util.results_processor import ResultsProcessor
+from util.run_checkpoint import RunCheckpoint
+from util.webdriver_pool import WebDriverPool, default_worker_count, webdriver_pool
+
+
+# Receives (level, message) for problems the user should see; level is "warning" or "error"
+Reporter = Callable[[str, str], None]
+# Receives (url, succeeded) after each URL of a run; called on the worker threads
+PageCallback = Callable[[str, bool], None]
+
+
+def log_reporter(level: str, message: str) -> None:
+    """
+    Default reporter: writes user-facing problems to the log.
+    """
+    logging.log(logging.ERROR if level == "error" else logging.WARNING, message)
 
 
 class AccessibilityTester:
     """
     Crawl-agnostic axe-core runner.
-    Always fetches the latest axe.min.js from the CDN at runtime.
+    Uses the latest axe.min.js from the CDN, cached on disk and in memory by `axe_script_cache`.
+    Browsers are borrowed from the process-wide WebDriverPool instead of being started per tester,
+    and URLs can be audited by several browsers in parallel.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, pool: WebDriverPool | None = None, workers: int | None = None,
+                 readiness: PageReadiness | None = None, lean_load: bool = LEAN_LOAD,
+                 incremental: bool = INCREMENTAL_AUDIT, storage: str = RESULTS_STORAGE,
+                 results_directory: str = FULL_ACCESSIBILITY_RESULTS_DIRECTORY,
+                 reporter: Reporter | None = None) -> None:
         self.test_directory: str = ""
-
-        #opts = Options()
-        #opts.add_argument("--headless")
-        #opts.add_argument("--disable-gpu")
-        #opts.add_argument("--no-sandbox")
-        #opts.add_argument("--disable-dev-shm-usage")
-        #opts.add_argument("--window-size=1920x1080")
-
-        #self.driver = webdriver.Chrome(
-            #service=Service(ChromeDriverManager().install()),
-            #options=opts,
-        #)
-        self.driver = self._setup_webdriver()
-        # download latest axe script once per tester instance
-        self._axe_script = HelperFunctions.fetch_latest_axe()
-
-    # ──────────────────────────────────────────────────────────────
-    # choose driver depending on env
-    # ──────────────────────────────────────────────────────────────
-    def _setup_webdriver(self) -> webdriver.Chrome:
-        opts = Options()
-        opts.add_argument("--headless=new")
-        opts.add_argument("--disable-gpu")
-        opts.add_argument("--no-sandbox")
-        opts.add_argument("--disable-dev-shm-usage")
-        opts.add_argument("--window-size=1920x1080")
-
-        if os.getenv("DOCKER_ENV", "").lower() == "true":
-            logging.info("Docker environment detected – using system chromedriver")
-            return webdriver.Chrome(service=Service("/usr/bin/chromedriver"),
-                                    options=opts)
-        else:
-            logging.info("Local environment – using webdriver_manager")
-            return webdriver.Chrome(service=Service(ChromeDriverManager().install()),
-                                    options=opts)
+        self.pool = pool or webdriver_pool
+        # number of parallel browsers; None sizes it to the available cores and RAM
+        self.workers = workers
+        # when a loaded page counts as ready to audit
+        self.readiness = readiness or PageReadiness()
+        # skip images, media, fonts and analytics; keep False for colour-contrast-sensitive audits
+        self.lean_load = lean_load
+        # reuse the previous results of pages whose content has not changed since the last run
+        self.incremental = incremental
+        # "json" or "columnar", see ResultsProcessor
+        self.storage = storage
+        # runs are saved to <results_directory>/<domain>/<timestamp>
+        self.results_directory = results_directory
+        # how warnings and errors reach the user: the log by default
+        self.reporter = reporter or log_reporter
+        # seconds spent per phase for every URL of the last run
+        self.timings: dict[str, dict[str, float]] = {}
+        # per-run state of incremental mode
+        self._fingerprints: FingerprintStore | None = None
+        self._lastmod: dict[str, str] = {}
+        self._session = None
+        # test status of every URL of the run, recorded in the run directory for resuming
+        self._checkpoint: RunCheckpoint | None = None
+        # timing spans of every phase of the run, recorded in the run directory
+        self._span_log: SpanLog | None = None
+        # loaded once per process, refreshed from the CDN when the disk copy is older than the TTL
+        self._axe_script = axe_script_cache.get_script()
 
     # ------------------------------------------------------------------ #
     # Core helpers                                                        #
     # ------------------------------------------------------------------ #
-    def _inject_axe(self) -> None:
+    # axe.run and axe.version in one round trip; the result is passed to Selenium's async callback
+    AXE_RUN_SCRIPT = """
+        const done = arguments[arguments.length - 1];
+        if (typeof axe === 'undefined') { done({ missing: true }); return; }
+        axe.run({
+            runOnly: { type: 'tag',
+                       values: ['wcag2a','wcag2aa','wcag2aaa','best-practice'] },
+        }).then(r => done({ version: axe.version, results: r }),
+                e => done({ error: String(e) }));
+    """
+
+    # DNS, connection and server time of the last navigation in seconds, from the Navigation Timing API
+    NAVIGATION_TIMING_SCRIPT = """
+        const n = performance.getEntriesByType('navigation')[0];
+        if (!n) { return null; }
+        return { dns: n.domainLookupEnd - n.domainLookupStart, connect: n.connectEnd - n.connectStart,
+                 ttfb: n.responseStart - n.requestStart, download: n.responseEnd - n.responseStart };
+    """
+
+    def _register_axe(self, driver: webdriver.Chrome) -> bool:
+        """
+        Register axe.min.js once per browser session so Chrome evaluates it in every new document.
+        Returns False if the browser does not support the DevTools protocol.
+        """
+        state = self.pool.driver_state(driver)
+        if "axe_script_id" in state:
+            return state["axe_script_id"] is not None
+
+        try:
+            registration = driver.execute_cdp_cmd(
+                "Page.addScriptToEvaluateOnNewDocument", {"source": self._axe_script}
+            )
+            state["axe_script_id"] = registration.get("identifier")
+            driver.set_script_timeout(AXE_SCRIPT_TIMEOUT)
+            logging.info("Registered axe-core via CDP for the browser session")
+            return True
+        except Exception as exc:
+            logging.warning("CDP injection unavailable, pushing axe per page: %s", exc)
+            state["axe_script_id"] = None
+            driver.set_script_timeout(AXE_SCRIPT_TIMEOUT)
+            return False
+
+    @staticmethod
+    def _lean_load_patterns() -> list[str]:
+        """URL patterns for Network.setBlockedURLs, with and without query strings."""
+        patterns = []
+        for extension in LEAN_LOAD_BLOCKED_EXTENSIONS:
+            patterns += [f"*.{extension}", f"*.{extension}?*"]
+        patterns += [f"*{host}/*" for host in LEAN_LOAD_BLOCKED_HOSTS]
+        return patterns
+
+    def _apply_lean_load(self, driver: webdriver.Chrome, enabled: bool) -> None:
+        """
+        Switch request blocking of the browser on or off. Pooled browsers keep the setting,
+        so it is only sent when it differs from what the browser currently uses.
+        """
+        state = self.pool.driver_state(driver)
+        if state.get("lean_load", False) == enabled or state.get("lean_load_unsupported"):
+            return
+        try:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs",
+                                   {"urls": self._lean_load_patterns() if enabled else []})
+            state["lean_load"] = enabled
+        except Exception as exc:
+            logging.warning("Lean load unavailable, loading all resources: %s", exc)
+            state["lean_load_unsupported"] = True
+
+    def _navigation_timing(self, driver: webdriver.Chrome) -> dict[str, float]:
+        """
+        Split the navigation of the current page into DNS lookup, connect, time to first byte and download.
+        Returns an empty dict if the browser does not report it.
+        """
+        try:
+            timing = driver.execute_script(self.NAVIGATION_TIMING_SCRIPT)
+        except Exception as exc:
+            logging.debug("Navigation timing unavailable: %s", exc)
+            return {}
+        return {name: round(max(0.0, ms) / 1000, 4) for name, ms in (timing or {}).items()}
+
+    def _inject_axe(self, driver: webdriver.Chrome) -> None:
         """Inject the downloaded axe.min.js into the current page."""
-        self.driver.execute_script(self._axe_script)
+        driver.execute_script(self._axe_script)
+
+    def _run_axe(self, driver: webdriver.Chrome) -> tuple[dict[str, Any], str]:
+        """
+        Run the audit on the loaded page and return (results_json, axe_version).
+        Falls back to pushing the script over the wire if axe is missing from the page.
+        """
+        outcome = driver.execute_async_script(self.AXE_RUN_SCRIPT)
+        if outcome.get("missing"):
+            self._inject_axe(driver)
+            outcome = driver.execute_async_script(self.AXE_RUN_SCRIPT)
+        if "error" in outcome or outcome.get("missing"):
+            raise RuntimeError(f"axe.run failed: {outcome.get('error', 'axe not loaded')}")
+        return outcome["results"], outcome["version"]
 
     #def _run_for_url(self, url: str) -> dict | None:
-    def _run_for_url(self, url: str) -> Optional[Tuple[Dict[str, Any], str]]:
+    def _run_for_url(self, driver: webdriver.Chrome, url: str,
+                     lean_load: bool = False) -> tuple[dict[str, Any], str] | None:
         """
-        Navigate to `url`, inject axe, run audit, save JSON/CSV.
+        Navigate to `url`, run the audit with the pre-registered axe, save JSON/CSV.
+        Every phase is recorded as a span of the run and in `timings`.
         Returns (results_json, axe_version) or None on failure.
         """
-        try:
-            self.driver.get(url)
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.TAG_NAME, "body"))
-            )
+        timings: dict[str, float] = {}
+        started = time.perf_counter()
 
-            self._inject_axe()
-            axe_version = self.driver.execute_script("return axe.version;")
+        def phase_done(phase: str, **attributes: Any) -> None:
+            nonlocal started
+            now = time.perf_counter()
+            timings[phase] = round(now - started, 3)
+            if self._span_log:
+                self._span_log.record(phase, now - started, url=url, **attributes)
+            started = now
 
-            results = self.driver.execute_script(
-                """
-                return axe.run({
-                    runOnly: { type: 'tag',
-                               values: ['wcag2a','wcag2aa','wcag2aaa','best-practice'] },
-                }).then(r => r);
-                """
-            )
+        try:
+            registered = self._register_axe(driver)
+            self.readiness.register(driver, self.pool.driver_state(driver))
+            self._apply_lean_load(driver, lean_load)
+            driver.get(url)
+            phase_done("navigation", **self._navigation_timing(driver))
+            self.readiness.wait(driver)
+            phase_done("settle")
+            if not registered:
+                self._inject_axe(driver)
 
-            proc = ResultsProcessor(url, results, self.test_directory)
-            proc.save_results_to_json()
-            proc.save_results_to_csv()
+            results, axe_version = self._run_axe(driver)
+            phase_done("audit")
+
+            proc = ResultsProcessor(url, results, self.test_directory, self.storage, self._span_log)
+            proc.save_results()
+            phase_done("save")
 
             return results, axe_version
 
         except Exception as exc:
             logging.error("axe test failed for %s: %s", url, exc, exc_info=True)
             return None
+        finally:
+            self.timings[url] = timings
+            logging.info("Timings for %s: %s", url, timings)
+
+    def _reuse_if_unchanged(self, url: str) -> tuple[tuple[dict[str, Any], str] | None, str | None]:
+        """
+        Incremental mode: reuse the previous results of `url` if the page has not changed.
+
+        A page counts as unchanged if its sitemap <lastmod> equals the stored one, or else if the
+        fingerprint of its HTML (fetched with the cached session, so usually a 304) is the same.
+        Returns (outcome, fingerprint); outcome is None if the page has to be audited.
+        """
+        entry = self._fingerprints.get(url)
+        lastmod = self._lastmod.get(url)
+        fingerprint = entry["fingerprint"] if entry else None
+
+        unchanged = bool(entry and lastmod and entry.get("lastmod") == lastmod)
+        if not unchanged:
+            fingerprint = None
+            try:
+                with timed("fingerprint", self._span_log, url=url):
+                    response = self._session.get(url, timeout=10)
+                    if response.status_code == 200:
+                        fingerprint = FingerprintStore.fingerprint(response.content)
+            except Exception as exc:
+                logging.warning("Could not fingerprint %s: %s", url, exc)
+            unchanged = bool(entry and fingerprint and entry["fingerprint"] == fingerprint)
+        if not unchanged:
+            return None, fingerprint
+
+        try:
+            results = ResultsProcessor.load_results(entry["json_path"])
+            proc = ResultsProcessor(url, results, self.test_directory, self.storage, self._span_log)
+            # a rerun within the same second writes into the same directory
+            if os.path.abspath(entry["json_path"]) != os.path.abspath(proc.get_json_path()):
+                if os.path.splitext(entry["json_path"])[1] == os.path.splitext(proc.get_json_path())[1]:
+                    shutil.copy2(entry["json_path"], proc.get_json_path())
+                else:
+                    proc.save_results_to_json()  # the storage format changed since the last run
+                if os.path.exists(entry.get("csv_path") or ""):
+                    shutil.copy2(entry["csv_path"], proc.get_csv_path())
+            if proc.storage == "columnar":
+                proc.save_results_to_columnar()
+            proc.index_results()
+        except (OSError, ValueError) as exc:
+            logging.warning("Could not reuse previous results of %s: %s", url, exc)
+            return None, fingerprint
+
+        self._fingerprints.update(url, fingerprint, lastmod, proc.get_json_path(), proc.get_csv_path())
+        logging.info("Unchanged since last audit, reusing results: %s", url)
+        return (results, results.get("testEngine", {}).get("version", "")), fingerprint
+
+    def _worker(self, pending: queue.SimpleQueue, outcomes: dict[str, tuple[dict[str, Any], str]],
+                outcomes_lock: threading.Lock, lean_load: bool, on_page: PageCallback | None = None) -> None:
+        """
+        Audit URLs from the shared `pending` queue with one borrowed browser until the queue is empty.
+        Runs on a worker thread; outcomes go to the shared `outcomes` as soon as they are known, so
+        they survive the worker. A failing URL only affects this worker's current page; if no
+        replacement for a crashed browser can be started, the worker stops and leaves the queue to
+        the others.
+        """
+        def finished(url: str, succeeded: bool, reused: bool = False) -> None:
+            metrics.inc("a11y_pages_total", outcome="reused" if reused else "done" if succeeded else "failed")
+            try:
+                self._checkpoint.record_status(url, succeeded)
+            finally:
+                if on_page:
+                    on_page(url, succeeded)
+
+        driver = self.pool.acquire()
+        try:
+            while True:
+                url = pending.get()
+                if url is None:  # no more URLs will be queued
+                    break
+                outcome, audited, reported = None, False, False
+                try:
+                    fingerprint = None
+                    if self._fingerprints is not None:
+                        outcome, fingerprint = self._reuse_if_unchanged(url)
+                    if outcome is None:
+                        audited = True
+                        outcome = self._run_for_url(driver, url, lean_load)
+                    if outcome:
+                        with outcomes_lock:
+                            outcomes[url] = outcome
+                        if audited and self._fingerprints is not None:
+                            proc = ResultsProcessor(url, {}, self.test_directory, self.storage)
+                            self._fingerprints.update(url, fingerprint, self._lastmod.get(url),
+                                                      proc.get_json_path(), proc.get_csv_path())
+                    reported = True
+                    finished(url, outcome is not None, reused=not audited)
+                except Exception as exc:
+                    # e.g. the status could not be recorded; the outcome is kept and the worker goes on
+                    logging.error("axe worker failed on %s: %s", url, exc, exc_info=True)
+                    if not reported:
+                        try:
+                            finished(url, outcome is not None)
+                        except Exception:
+                            pass
+                if audited:
+                    # count the page and swap in a fresh browser when this one is worn out or crashed
+                    driver = self.pool.record_page(driver, failed=outcome is None)
+        finally:
+            self.pool.release(driver)  # hand the browser back instead of quitting it
+
+    def _save_timings(self) -> None:
+        """
+        Write the per-URL phase timings of the run to `timings.json` in the test directory.
+        """
+        try:
+            with open(os.path.join(self.test_directory, "timings.json"), "w") as timings_file:
+                json.dump(self.timings, timings_file, indent=4)
+        except OSError as exc:
+            logging.error("Error while saving timings: %s", exc)
+
+    def _load_timings(self) -> dict[str, dict[str, float]]:
+        """
+        Read the timings of an earlier attempt of the run, so a resumed run keeps them.
+        """
+        try:
+            with open(os.path.join(self.test_directory, "timings.json")) as timings_file:
+                return json.load(timings_file)
+        except (OSError, ValueError):
+            return {}
+
+    def _load_completed(self, completed: set[str]) -> dict[str, tuple[dict[str, Any], str]]:
+        """
+        Load the saved results of the URLs completed before a resumed run, as found in the results index.
+        """
+        if not completed:
+            return {}
+        outcomes: dict[str, tuple[dict[str, Any], str]] = {}
+        for page in results_index.pages(self.test_directory):
+            if page["url"] not in completed:
+                continue
+            try:
+                results = ResultsProcessor.load_results(page["json_path"])
+            except (OSError, ValueError) as exc:
+                logging.warning("Could not load saved results of %s: %s", page["url"], exc)
+                continue
+            outcomes[page["url"]] = (results, results.get("testEngine", {}).get("version", ""))
+        return outcomes
+
+    def _worker_count(self, url_count: int | None, workers: int | None) -> int:
+        """
+        Number of browsers to use: the requested count (or one sized to the machine),
+        capped by the pool size and the number of URLs if it is known.
+        """
+        requested = min(workers or self.workers or default_worker_count(), self.pool.max_size)
+        return max(1, min(requested, url_count) if url_count else requested)
 
     # ------------------------------------------------------------------ #
     # Public API                                                         #
     # ------------------------------------------------------------------ #
     #def test_urls(self, urls: set[str]):
-    def test_urls(self, urls: Set[str]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    def test_urls(self, urls: Iterable[str], workers: int | None = None,
+                  lean_load: bool | None = None, incremental: bool | None = None,
+                  lastmod: dict[str, str] | None = None,
+                  on_page: PageCallback | None = None, test_directory: str | None = None,
+                  resume: bool = False) -> tuple[dict[str, Any] | None, str | None]:
         """
-        Run axe on each URL in `urls`.
+        Run axe on each URL in `urls`, spread across `workers` headless browsers.
+        `urls` may be a generator (e.g. `SitemapParser.iter_urls()`); testing starts with the first URL
+        while the rest are still being produced.
+        `lean_load` and `incremental` override the tester's settings for this run. In incremental mode
+        pages whose sitemap `lastmod` or content fingerprint is unchanged reuse their previous results.
+        `on_page(url, succeeded)` is called from the worker threads after each URL, e.g. to report progress.
+        Results are saved to `test_directory`, a new timestamped run directory if it is None. The status of
+        every URL is recorded in the run directory; with `resume` the URLs it records as done are not
+        audited again and their saved results are returned with the new ones.
+        The timing spans of every phase are appended to `spans.jsonl` in the run directory and summarized
+        per phase in `run_metrics.json`; the process-wide metrics are written to METRICS_FILE.
         Returns (result_dict, axe_version) or (None, None) if nothing succeeded.
         """
-        if not urls:
-            st.warning("No URLs to test.")
+        url_iterator = iter(urls)
+        first_url = next(url_iterator, None)
+        if first_url is None:
+            self.reporter("warning", "No URLs to test.")
             return None, None
 
-        # create timestamped results directory based on first URL
-        from util.helper_functions import HelperFunctions  # avoid circular import
-        self.test_directory = HelperFunctions.create_test_directory(next(iter(urls)))
+        if test_directory:
+            os.makedirs(test_directory, exist_ok=True)
+            self.test_directory = test_directory
+        else:
+            # create timestamped results directory based on first URL
+            self.test_directory = HelperFunctions.create_test_directory(first_url, self.results_directory)
+        self._checkpoint = RunCheckpoint(self.test_directory)
+        self._span_log = SpanLog(self.test_directory)
+        completed = self._checkpoint.completed_urls() if resume else set()
+        if completed:
+            logging.info(f"Resuming run in {self.test_directory}: {len(completed)} URLs already tested")
+
+        worker_count = self._worker_count(len(urls) if isinstance(urls, Sized) else None, workers)
+        lean_load = self.lean_load if lean_load is None else lean_load
+        logging.info(f"Testing URLs from {first_url} with {worker_count} browser(s), lean load: {lean_load}")
+
+        self.timings = self._load_timings() if resume else {}
+        incremental = self.incremental if incremental is None else incremental
+        self._fingerprints = FingerprintStore(first_url) if incremental else None
+        self._lastmod = lastmod or {}
+        if incremental:
+            self._session = HelperFunctions.create_session(pool_size=worker_count)
+
+        pending: queue.SimpleQueue = queue.SimpleQueue()
+        queued_urls: list[str] = []
+        outcomes: dict[str, tuple[dict[str, Any], str]] = {}
+        outcomes_lock = threading.Lock()
+        with ThreadPoolExecutor(max_workers=worker_count, thread_name_prefix="axe") as executor:
+            futures = [executor.submit(self._worker, pending, outcomes, outcomes_lock, lean_load, on_page)
+                       for _ in range(worker_count)]
+            try:
+                for url in itertools.chain([first_url], url_iterator):
+                    queued_urls.append(url)
+                    if url not in completed:
+                        pending.put(url)
+            finally:
+                # also when the URL source fails mid-stream, or the workers would wait forever
+                for _ in range(worker_count):
+                    pending.put(None)  # one stop marker per worker
+
+            for future in futures:
+                try:
+                    future.result()
+                except Exception as exc:
+                    # URLs this worker had not started yet are picked up by the others
+                    logging.error("axe worker failed: %s", exc, exc_info=True)
+
+        outcomes.update(self._load_completed(completed))
+        self._save_timings()
+        with timed("compact", self._span_log):
+            ResultsProcessor.compact_columnar_results(self.test_directory)
+        if self._fingerprints is not None:
+            self._fingerprints.save()
+            self._session.close()
+            self._session = None
+        self._span_log.save_summary()
+        metrics.inc("a11y_runs_total")
+        metrics.write_textfile()
 
         all_results, axe_ver = {}, None
-        for url in urls:
-            outcome = self._run_for_url(url)
+        for url in queued_urls:
+            outcome = outcomes.get(url)
             if not outcome:
-                st.warning(f"No results for {url}")
+                self.reporter("warning", f"No results for {url}")
                 continue
             res, ver = outcome
             all_results[url] = res
             axe_ver = axe_ver or ver
 
-        self.driver.quit()
-
         if not all_results:
-            st.error("No accessibility results generated.")
+            self.reporter("error", "No accessibility results generated.")
             return None, None
 
         return all_results, axe_ver
 
-    # optional explicit close
-    def close(self):
-        if self.driver:
-            self.driver.quit()
-
+    def close(self) -> None:
+        """
+        Releases what the tester holds between runs. Browsers are borrowed from the pool per run and
+        already returned, so only an open HTTP session is closed; the pool itself is shared.
+        """
+        if self._session is not None:
+            self._session.close()
+            self._session = None
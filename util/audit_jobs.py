@@ -0,0 +1,425 @@
+# util/audit_jobs.py
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from config.constants import AUDIT_JOBS_PATH, AUDIT_MAX_JOBS, INCREMENTAL_AUDIT, LEAN_LOAD
+from util.accessibility_tester import AccessibilityTester
+from util.helper_functions import HelperFunctions
+from util.run_checkpoint import RunCheckpoint
+from util.template_sampler import TemplateSampler
+from util.url_extraction import ExtractedUrls, extract_urls
+
+# Job states; queued and running jobs are active, the others are final
+QUEUED, RUNNING, DONE, FAILED, INTERRUPTED = "queued", "running", "done", "failed", "interrupted"
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+_JOB_COLUMNS = ("id", "key", "url", "method", "options", "urls", "status", "created_at", "started_at",
+                "finished_at", "pages_total", "pages_done", "pages_failed", "test_directory", "axe_version", "error",
+                "warnings")
+
+
+class JobStore:
+    """
+    A SQLite table of audit jobs and their progress.
+
+    Every job is one row that the runner updates as pages are audited, so any session (or a
+    reconnected one) can read the state of a job without holding a reference to it.
+
+    Attributes:
+        path (str): The SQLite database file.
+    """
+
+    def __init__(self, path: str = AUDIT_JOBS_PATH):
+        """
+        Initializes the store. The database is created on first use.
+
+        Args:
+            path (str, optional): The SQLite database file. Defaults to AUDIT_JOBS_PATH.
+        """
+        self.path = path
+        self._connection: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def _db(self) -> sqlite3.Connection:
+        """
+        Returns the store connection, creating the schema on first use.
+        """
+        if self._connection is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._connection.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    key TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    method TEXT NOT NULL,
+                    options TEXT NOT NULL,
+                    urls TEXT,
+                    status TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    pages_total INTEGER,
+                    pages_done INTEGER NOT NULL DEFAULT 0,
+                    pages_failed INTEGER NOT NULL DEFAULT 0,
+                    test_directory TEXT,
+                    axe_version TEXT,
+                    error TEXT,
+                    warnings TEXT
+                );
+                CREATE INDEX IF NOT EXISTS jobs_key ON jobs (key, status);
+                CREATE INDEX IF NOT EXISTS jobs_created_at ON jobs (created_at);
+                """
+            )
+            # job tables created before warnings were recorded
+            columns = {row[1] for row in self._connection.execute("PRAGMA table_info(jobs)")}
+            if "warnings" not in columns:
+                self._connection.execute("ALTER TABLE jobs ADD COLUMN warnings TEXT")
+            self._connection.commit()
+        return self._connection
+
+    def _execute(self, query: str, parameters: tuple = ()) -> None:
+        """
+        Runs a write statement and commits it.
+        """
+        try:
+            with self._lock:
+                db = self._db()
+                db.execute(query, parameters)
+                db.commit()
+        except sqlite3.Error as e:
+            logging.error(f"Error while updating the audit job table: {e}")
+
+    def _rows(self, query: str, parameters: tuple = ()) -> list[dict[str, Any]]:
+        """
+        Runs a query on the jobs table and returns its rows with progress figures, see `with_progress`.
+        """
+        with self._lock:
+            rows = self._db().execute(query, parameters).fetchall()
+        return [self.with_progress(dict(zip(_JOB_COLUMNS, row))) for row in rows]
+
+    @staticmethod
+    def with_progress(job: dict[str, Any]) -> dict[str, Any]:
+        """
+        Adds `pages_per_minute`, `eta_seconds` and `elapsed_seconds` to a job row.
+        The rate is measured since the job started; the ETA is unknown until a page is done.
+        """
+        started_at = job["started_at"]
+        end = job["finished_at"] or time.time()
+        elapsed = end - started_at if started_at else 0.0
+        done = job["pages_done"] + job["pages_failed"]
+        rate = done / elapsed if elapsed > 0 else 0.0
+        job["elapsed_seconds"] = elapsed
+        job["pages_per_minute"] = rate * 60
+        if job["status"] == RUNNING and rate and job["pages_total"]:
+            job["eta_seconds"] = max(job["pages_total"] - done, 0) / rate
+        else:
+            job["eta_seconds"] = None
+        return job
+
+    def create(self, key: str, url: str, method: str, options: dict[str, Any], urls: list[str] | None) -> str:
+        """
+        Adds a queued job and returns its id.
+        """
+        job_id = uuid.uuid4().hex[:12]
+        self._execute(
+            "INSERT INTO jobs (id, key, url, method, options, urls, status, created_at, pages_total) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (job_id, key, url, method, json.dumps(options), json.dumps(urls) if urls is not None else None,
+             QUEUED, time.time(), len(urls) if urls is not None else None),
+        )
+        return job_id
+
+    def get(self, job_id: str) -> dict[str, Any] | None:
+        """
+        Returns a job with its progress, None if there is no such job.
+        """
+        rows = self._rows(f"SELECT {', '.join(_JOB_COLUMNS)} FROM jobs WHERE id = ?", (job_id,))
+        return rows[0] if rows else None
+
+    def active_job(self, key: str) -> dict[str, Any] | None:
+        """
+        Returns the queued or running job with the given key, if any.
+        """
+        rows = self._rows(
+            f"SELECT {', '.join(_JOB_COLUMNS)} FROM jobs WHERE key = ? AND status IN (?, ?) ORDER BY created_at",
+            (key, *ACTIVE_STATES),
+        )
+        return rows[0] if rows else None
+
+    def recent(self, limit: int = 20) -> list[dict[str, Any]]:
+        """
+        Returns the most recently created jobs, newest first.
+        """
+        return self._rows(f"SELECT {', '.join(_JOB_COLUMNS)} FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,))
+
+    def start(self, job_id: str, test_directory: str) -> None:
+        """
+        Marks a job as running and records its run directory.
+        """
+        self._execute("UPDATE jobs SET status = ?, started_at = ?, test_directory = ? WHERE id = ?",
+                      (RUNNING, time.time(), test_directory, job_id))
+
+    def requeue(self, job_id: str) -> None:
+        """
+        Queues an interrupted or failed job again. The warnings of the previous attempt are dropped.
+        """
+        self._execute("UPDATE jobs SET status = ?, finished_at = NULL, error = NULL, warnings = NULL WHERE id = ?",
+                      (QUEUED, job_id))
+
+    def set_urls(self, job_id: str, urls: list[str]) -> None:
+        """
+        Records the URLs a job audits once they are extracted.
+        """
+        self._execute("UPDATE jobs SET urls = ?, pages_total = ? WHERE id = ?", (json.dumps(urls), len(urls), job_id))
+
+    def set_found(self, job_id: str, pages_found: int) -> None:
+        """
+        Records the number of URLs found so far by an extraction that is still running.
+        """
+        self._execute("UPDATE jobs SET pages_total = ? WHERE id = ?", (pages_found, job_id))
+
+    def progress(self, job_id: str, pages_done: int, pages_failed: int) -> None:
+        """
+        Records the pages audited and failed so far.
+        """
+        self._execute("UPDATE jobs SET pages_done = ?, pages_failed = ? WHERE id = ?",
+                      (pages_done, pages_failed, job_id))
+
+    def add_warning(self, job_id: str, message: str) -> None:
+        """
+        Appends a warning for the user (e.g. a URL without results) to a job, one line per warning.
+        """
+        self._execute("UPDATE jobs SET warnings = COALESCE(warnings || char(10), '') || ? WHERE id = ?",
+                      (message.replace("\n", " "), job_id))
+
+    def finish(self, job_id: str, status: str, axe_version: str | None = None, error: str | None = None) -> None:
+        """
+        Records the final state of a job.
+        """
+        self._execute(
+            "UPDATE jobs SET status = ?, finished_at = ?, axe_version = ?, error = ? WHERE id = ?",
+            (status, time.time(), axe_version, error, job_id),
+        )
+
+    def interrupt_active(self) -> int:
+        """
+        Marks the queued and running jobs of a previous process as interrupted.
+
+        Returns:
+            int: The number of jobs marked.
+        """
+        try:
+            with self._lock:
+                db = self._db()
+                cursor = db.execute(
+                    "UPDATE jobs SET status = ?, finished_at = ? WHERE status IN (?, ?)",
+                    (INTERRUPTED, time.time(), *ACTIVE_STATES),
+                )
+                db.commit()
+                return cursor.rowcount
+        except sqlite3.Error as e:
+            logging.error(f"Error while updating the audit job table: {e}")
+            return 0
+
+
+class AuditJobRunner:
+    """
+    Runs URL extraction and accessibility tests in background threads, so audits outlive the
+    Streamlit script run and the browser session that started them.
+
+    Jobs are executed by a small thread pool; all of them share the process-wide WebDriver pool,
+    which bounds the number of browsers however many jobs run. Submitting an audit identical to a
+    queued or running one returns the existing job instead of starting a second one.
+
+    Attributes:
+        store (JobStore): The persistent job table.
+        max_jobs (int): The number of jobs run at the same time.
+    """
+
+    def __init__(self, store: JobStore | None = None, max_jobs: int = AUDIT_MAX_JOBS):
+        """
+        Args:
+            store (JobStore, optional): The job table. Defaults to a JobStore at AUDIT_JOBS_PATH.
+            max_jobs (int, optional): Jobs run at the same time. Defaults to AUDIT_MAX_JOBS.
+        """
+        self.store = store or JobStore()
+        self.max_jobs = max(1, max_jobs)
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+        # no job runs in this process yet: queued and running jobs were left by a previous one
+        interrupted = self.store.interrupt_active()
+        if interrupted:
+            logging.warning(f"{interrupted} audit job(s) of a previous run were interrupted")
+
+    def _pool(self) -> ThreadPoolExecutor:
+        """
+        Returns the job thread pool, started with the first job of this process.
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_jobs, thread_name_prefix="audit-job")
+        return self._executor
+
+    @staticmethod
+    def job_key(url: str, method: str, options: dict[str, Any], urls: set[str] | None) -> str:
+        """
+        Identifies identical audits: same site, same URLs or extraction method, same options.
+        """
+        payload = json.dumps([url, method, options, sorted(urls) if urls is not None else None], sort_keys=True)
+        return hashlib.sha1(payload.encode()).hexdigest()
+
+    def submit(self, url: str, urls: set[str] | None = None, method: str = "sitemap", crawl_depth: int = 2,
+               lean_load: bool = LEAN_LOAD, incremental: bool = INCREMENTAL_AUDIT, template_sampling: bool = False,
+               lastmod: dict[str, str] | None = None, page_signatures: dict[str, str] | None = None) -> str:
+        """
+        Queues an audit and returns its job id.
+
+        Args:
+            url (str): The entered URL of the site.
+            urls (Set[str], optional): The URLs to test. If None, they are extracted with `method` first.
+            method (str, optional): The extraction method, see `extract_urls`. Defaults to "sitemap".
+            crawl_depth (int, optional): The crawl depth. Defaults to 2.
+            lean_load (bool, optional): Audit with lean page loads. Defaults to LEAN_LOAD.
+            incremental (bool, optional): Reuse the results of unchanged pages. Defaults to INCREMENTAL_AUDIT.
+            template_sampling (bool, optional): Audit representatives of each page template only. Defaults to False.
+            lastmod (Dict[str, str], optional): Sitemap `lastmod` values of `urls`, for incremental mode.
+            page_signatures (Dict[str, str], optional): DOM signatures of `urls` recorded by the crawler.
+
+        Returns:
+            str: The id of the new job, or of the identical job already queued or running.
+        """
+        options = {"crawl_depth": crawl_depth, "lean_load": lean_load, "incremental": incremental,
+                   "template_sampling": template_sampling}
+        # jobs of given URLs record "urls" as their method
+        method = method if urls is None else "urls"
+        key = self.job_key(url, method, options, urls)
+        with self._lock:
+            executor = self._pool()
+            existing = self.store.active_job(key)
+            if existing:
+                logging.info(f"Audit of {url} is already {existing['status']} as job {existing['id']}")
+                return existing["id"]
+            job_id = self.store.create(key, url, method, options, sorted(urls) if urls is not None else None)
+        executor.submit(self._run, job_id, url, urls, method, options, lastmod or {}, page_signatures or {})
+        logging.info(f"Queued audit job {job_id} for {url}")
+        return job_id
+
+    def resume(self, job_id: str) -> bool:
+        """
+        Continues an interrupted or failed job from the checkpoint in its run directory:
+        completed URLs are neither extracted nor audited again.
+
+        Returns:
+            bool: True if the job was queued again.
+        """
+        with self._lock:
+            executor = self._pool()
+            job = self.store.get(job_id)
+            if not job or job["status"] not in (INTERRUPTED, FAILED) or not job["test_directory"]:
+                return False
+            self.store.requeue(job_id)
+        executor.submit(self._run, job_id, job["url"], None, job["method"], json.loads(job["options"]), {}, {},
+                        job["test_directory"])
+        logging.info(f"Resuming audit job {job_id} for {job['url']}")
+        return True
+
+    def _run(self, job_id: str, url: str, urls: set[str] | None, method: str, options: dict[str, Any],
+             lastmod: dict[str, str], page_signatures: dict[str, str], test_directory: str | None = None) -> None:
+        """
+        Executes a job on a pool thread and records its progress and outcome.
+        A job with a `test_directory` is resumed from the checkpoint of that run.
+        Sitemap URLs are audited while the sitemap is still being expanded, unless the job
+        samples page templates, which needs all URLs first.
+        """
+        errors: list[str] = []
+        try:
+            resume = test_directory is not None
+            if not resume:
+                test_directory = HelperFunctions.create_test_directory(url)
+            self.store.start(job_id, test_directory)
+            checkpoint = RunCheckpoint(test_directory)
+            extracted = None
+            if urls is not None and not resume:
+                checkpoint.save_plan(urls, method, lastmod, page_signatures)
+            else:
+                extracted = extract_urls(url, method, options["crawl_depth"], checkpoint=checkpoint,
+                                         stream=not options["template_sampling"])
+                urls, lastmod, page_signatures = extracted.urls, extracted.lastmod, extracted.page_signatures
+
+            streamed = extracted is not None and not extracted.urls
+            if not urls and not streamed:
+                self.store.finish(job_id, FAILED, error=f"No URLs found for {url}")
+                return
+
+            clusters = None
+            if options["template_sampling"] and len(urls) > 1:
+                clusters = TemplateSampler().cluster(urls, page_signatures)
+                urls = TemplateSampler.representatives(clusters)
+            if streamed:
+                # the URLs are found while the audit runs
+                pages = self._found(job_id, extracted)
+            else:
+                self.store.set_urls(job_id, sorted(urls))
+                pages = urls
+
+            def reporter(level: str, message: str) -> None:
+                logging.log(logging.ERROR if level == "error" else logging.WARNING, f"Audit job {job_id}: {message}")
+                if level == "error":
+                    errors.append(message)
+                else:
+                    self.store.add_warning(job_id, message)
+
+            lock = threading.Lock()
+            completed = checkpoint.completed_urls() if resume else set()
+            counts = {"done": len(completed if streamed else completed & set(urls)), "failed": 0}
+            self.store.progress(job_id, counts["done"], counts["failed"])
+
+            def on_page(page_url: str, succeeded: bool) -> None:
+                with lock:
+                    counts["done" if succeeded else "failed"] += 1
+                    self.store.progress(job_id, counts["done"], counts["failed"])
+
+            tester = AccessibilityTester(lean_load=options["lean_load"], incremental=options["incremental"],
+                                         reporter=reporter)
+            results, axe_version = tester.test_urls(pages, lastmod=lastmod, on_page=on_page,
+                                                    test_directory=test_directory, resume=resume)
+            if streamed:
+                urls = extracted.urls
+                if not urls:
+                    self.store.finish(job_id, FAILED, error=f"No URLs found for {url}")
+                    return
+            if results and clusters:
+                TemplateSampler.save_report(clusters, results, tester.test_directory)
+            self.store.finish(job_id, DONE if results else FAILED, axe_version, "; ".join(errors) or None)
+            logging.info(f"Audit job {job_id} for {url} finished: {len(results or {})} of {len(urls)} URLs tested")
+        except Exception as e:
+            logging.exception(f"Audit job {job_id} for {url} failed")
+            self.store.finish(job_id, FAILED, error=str(e))
+
+    def _found(self, job_id: str, extracted: ExtractedUrls, every: float = 1.0) -> Iterator[str]:
+        """
+        Passes on the URLs of an extraction, recording how many were found at most every `every`
+        seconds and all of them once the extraction has finished.
+        """
+        recorded = time.monotonic()
+        for count, page_url in enumerate(extracted, 1):
+            if time.monotonic() - recorded >= every:
+                self.store.set_found(job_id, count)
+                recorded = time.monotonic()
+            yield page_url
+        self.store.set_urls(job_id, sorted(extracted.urls))
+
+
+# Process-wide runner shared by all Streamlit sessions
+audit_jobs = AuditJobRunner()
@@ -0,0 +1,165 @@
+# util/axe_script_cache.py
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+import requests
+
+from config.constants import AXE_CACHE_DIRECTORY, AXE_CACHE_TTL, VENDORED_AXE_DIRECTORY
+
+from .helper_functions import HelperFunctions
+
+
+class AxeScriptCache:
+    """
+    A versioned cache for the axe-core script, kept on disk and in memory.
+
+    Lookup order:
+    1. The copy already loaded into memory by this process.
+    2. The newest `axe-<version>.min.js` on disk, if it is younger than the TTL.
+    3. cdnjs: only the version is queried if a cached copy exists; the script is downloaded
+       only if a newer version was released.
+    4. A stale copy on disk, then the axe-core package installed by `npm install` in
+       `node_modules/axe-core` when offline. The fallback is kept for another TTL, so the CDN
+       is not probed again by every process while it is unreachable.
+
+    Attributes:
+        cache_directory (str): The directory holding the cached scripts.
+        ttl (float): Seconds a cached script is used before checking for a newer version.
+        version (Optional[str]): The axe-core version of the script in memory.
+    """
+
+    FILE_PATTERN = re.compile(r"^axe-(?P<version>[\w.\-]+)\.min\.js$")
+
+    def __init__(self, cache_directory: str = AXE_CACHE_DIRECTORY, ttl: float = AXE_CACHE_TTL,
+                 vendored_directory: str = VENDORED_AXE_DIRECTORY):
+        """
+        Initializes the cache. Nothing is read until `get_script` is called.
+
+        Args:
+            cache_directory (str, optional): The directory holding the cached scripts. Defaults to AXE_CACHE_DIRECTORY.
+            ttl (float, optional): Freshness of a cached script in seconds. Defaults to AXE_CACHE_TTL.
+            vendored_directory (str, optional): The vendored axe-core package. Defaults to VENDORED_AXE_DIRECTORY.
+        """
+        self.cache_directory = cache_directory
+        self.ttl = ttl
+        self.vendored_directory = vendored_directory
+        self.version: str | None = None
+        self._script: str | None = None
+        self._lock = threading.Lock()
+
+    def get_script(self) -> str:
+        """
+        Returns the axe.min.js source, loading it at most once per process.
+
+        Returns:
+            str: The full JavaScript source.
+
+        Raises:
+            requests.RequestException: If the CDN is unreachable and no cached or vendored copy exists.
+        """
+        with self._lock:
+            if self._script is None:
+                self.version, self._script = self._load()
+                logging.info("Using axe-core %s", self.version)
+            return self._script
+
+    def _load(self) -> tuple[str, str]:
+        """
+        Loads the script from disk, the CDN or the vendored package.
+        """
+        cached = self._newest_cached()
+        if cached and time.time() - os.path.getmtime(cached[1]) < self.ttl:
+            return cached[0], self._read(cached[1])
+
+        try:
+            version = HelperFunctions.fetch_latest_axe_version()
+            if cached and cached[0] == version:
+                os.utime(cached[1])  # still the latest release, renew its freshness
+                return version, self._read(cached[1])
+            script = HelperFunctions.fetch_axe(version)
+            self._store(version, script)
+            return version, script
+        except (requests.RequestException, ValueError, KeyError) as e:
+            logging.warning(f"Could not fetch axe-core from the CDN: {e}")
+            if cached:
+                logging.info("Falling back to cached axe-core %s", cached[0])
+                self._renew(cached[1])
+                return cached[0], self._read(cached[1])
+            vendored = self._vendored()
+            if vendored:
+                logging.info("Falling back to vendored axe-core %s", vendored[0])
+                self._store(*vendored)
+                return vendored
+            raise
+
+    def _newest_cached(self) -> tuple[str, str] | None:
+        """
+        Returns the version and path of the most recently stored script, or None.
+        """
+        try:
+            file_names = os.listdir(self.cache_directory)
+        except OSError:
+            return None
+
+        newest = None
+        for file_name in file_names:
+            match = self.FILE_PATTERN.match(file_name)
+            if not match:
+                continue
+            path = os.path.join(self.cache_directory, file_name)
+            if newest is None or os.path.getmtime(path) > os.path.getmtime(newest[1]):
+                newest = (match.group("version"), path)
+        return newest
+
+    def _store(self, version: str, script: str) -> None:
+        """
+        Writes a downloaded script to the cache directory atomically.
+        """
+        try:
+            os.makedirs(self.cache_directory, exist_ok=True)
+            path = os.path.join(self.cache_directory, f"axe-{version}.min.js")
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as script_file:
+                script_file.write(script)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.error(f"Error while caching axe-core {version}: {e}")
+
+    @staticmethod
+    def _renew(path: str) -> None:
+        """
+        Marks a cached script as fresh for another TTL.
+        """
+        try:
+            os.utime(path)
+        except OSError as e:
+            logging.error(f"Error while renewing cached axe-core {path}: {e}")
+
+    def _vendored(self) -> tuple[str, str] | None:
+        """
+        Returns the version and source of the axe-core package installed by npm, or None.
+        """
+        script_path = os.path.join(self.vendored_directory, "axe.min.js")
+        if not os.path.exists(script_path):
+            return None
+        version = "vendored"
+        try:
+            with open(os.path.join(self.vendored_directory, "package.json"), encoding="utf-8") as package_file:
+                version = json.load(package_file).get("version", version)
+        except (OSError, ValueError):
+            pass
+        return version, self._read(script_path)
+
+    @staticmethod
+    def _read(path: str) -> str:
+        with open(path, encoding="utf-8") as script_file:
+            return script_file.read()
+
+
+# Process-wide cache shared by all AccessibilityTester instances
+axe_script_cache = AxeScriptCache()
@@ -0,0 +1,97 @@
+# util/fingerprint_store.py
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from urllib.parse import urlparse
+
+from config.constants import FINGERPRINTS_DIRECTORY
+
+# Attributes that change on every request without changing the page (CSP nonces, CSRF tokens)
+_VOLATILE_PATTERNS = [
+    re.compile(rb'\snonce="[^"]*"'),
+    re.compile(rb'<meta[^>]+name="csrf-token"[^>]*>', re.IGNORECASE),
+    re.compile(rb'<input[^>]+name="(?:csrfmiddlewaretoken|_token|authenticity_token)"[^>]*>', re.IGNORECASE),
+]
+_WHITESPACE = re.compile(rb'\s+')
+
+
+class FingerprintStore:
+    """
+    Remembers, per domain, a content fingerprint and the sitemap <lastmod> of every audited page
+    together with the results file of its last audit.
+
+    The store is a JSON file `data/fingerprints/<domain>.json` that maps each URL to
+    `{"fingerprint", "lastmod", "json_path", "csv_path"}`.
+
+    Attributes:
+        path (str): The JSON file of the domain.
+        entries (Dict[str, Dict[str, str]]): The stored entries keyed by URL.
+    """
+
+    def __init__(self, url: str, directory: str = FINGERPRINTS_DIRECTORY):
+        """
+        Loads the store of the domain of `url`.
+
+        Args:
+            url (str): Any URL of the audited website.
+            directory (str, optional): The directory of the store files. Defaults to FINGERPRINTS_DIRECTORY.
+        """
+        domain = urlparse(url).netloc.replace('www.', '')
+        self.path = os.path.join(directory, f"{domain}.json")
+        self.entries: dict[str, dict[str, str]] = {}
+        self._lock = threading.Lock()
+        try:
+            with open(self.path) as store_file:
+                self.entries = json.load(store_file)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logging.error(f"Error while loading fingerprints from {self.path}: {e}")
+
+    @staticmethod
+    def fingerprint(content: bytes) -> str:
+        """
+        Returns a hash of the page content that ignores whitespace, nonces and CSRF tokens.
+        """
+        for pattern in _VOLATILE_PATTERNS:
+            content = pattern.sub(b'', content)
+        return hashlib.sha256(_WHITESPACE.sub(b' ', content)).hexdigest()
+
+    def get(self, url: str) -> dict[str, str] | None:
+        """
+        Returns the stored entry of `url` if its results files still exist.
+        """
+        with self._lock:
+            entry = self.entries.get(url)
+        if entry and os.path.exists(entry.get("json_path", "")):
+            return entry
+        return None
+
+    def update(self, url: str, fingerprint: str | None, lastmod: str | None, json_path: str, csv_path: str) -> None:
+        """
+        Records the state of `url` after it was audited or reused.
+        """
+        with self._lock:
+            self.entries[url] = {
+                "fingerprint": fingerprint,
+                "lastmod": lastmod,
+                "json_path": json_path,
+                "csv_path": csv_path,
+            }
+
+    def save(self) -> None:
+        """
+        Writes the store back to disk.
+        """
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with self._lock, open(tmp_path, "w") as store_file:
+                json.dump(self.entries, store_file)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logging.error(f"Error while saving fingerprints to {self.path}: {e}")
@@ -2,9 +2,9 @@
 import json
 import logging
 import os
+import time
 from datetime import datetime
 from urllib.parse import urlparse, urlunparse
-from urllib.robotparser import RobotFileParser
 
 import requests
 import streamlit as st
@@ -17,6 +17,19 @@ from config import (
     setup_directories,
     setup_logging,
 )
+from config.constants import (
+    HTTP_CACHE_ENABLED,
+    HTTP_POOL_HOSTS,
+    HTTP_RETRIES,
+    INCREMENTAL_AUDIT,
+    LEAN_LOAD,
+    METRICS_PORT,
+)
+from util.http_cache import CachingHTTPAdapter
+from util.http_transport import ThrottledHTTPAdapter
+from util.metrics import metrics
+from util.results_index import results_index
+from util.robots_cache import robots_cache
 
 
 class HelperFunctions:
@@ -30,10 +43,13 @@ class HelperFunctions:
     @staticmethod
     def initialize_logging_and_directories() -> None:
         """
-        Initializes logging and directory setup for the application.
+        Initializes logging and directory setup for the application, and serves the metrics
+        endpoint if METRICS_PORT is set.
         """
         setup_directories()
         setup_logging()
+        if METRICS_PORT:
+            metrics.serve(METRICS_PORT)
 
     @staticmethod
     def check_credentials() -> bool:
@@ -76,11 +92,7 @@ class HelperFunctions:
         """
         with open(json_file_path) as file:
             data = json.load(file)
-            url = data.get('url', '')
-            parsed_url = urlparse(url)
-            domain = parsed_url.netloc
-            path = parsed_url.path.rstrip('/').lstrip('/')
-            return f"{domain}/{path}" if path else domain
+            return results_index.display_name(data.get('url', ''))
 
     @staticmethod
     def initialize_session_state() -> None:
@@ -101,6 +113,20 @@ class HelperFunctions:
             st.session_state.axe_version = None
         if 'download_initiated' not in st.session_state:
             st.session_state.download_initiated = False
+        if 'lean_load' not in st.session_state:
+            st.session_state.lean_load = LEAN_LOAD
+        if 'incremental' not in st.session_state:
+            st.session_state.incremental = INCREMENTAL_AUDIT
+        if 'sitemap_lastmod' not in st.session_state:
+            st.session_state.sitemap_lastmod = {}
+        if 'template_sampling' not in st.session_state:
+            st.session_state.template_sampling = False
+        if 'page_signatures' not in st.session_state:
+            st.session_state.page_signatures = {}
+        if 'job_id' not in st.session_state:
+            st.session_state.job_id = None
+        if 'results_directory' not in st.session_state:
+            st.session_state.results_directory = None
        
     @staticmethod
     def handle_url_extraction(url: str, crawl_depth: int, WebsiteCrawler, SitemapParser) -> None:
@@ -116,13 +142,13 @@ class HelperFunctions:
         Returns:
             None
         """
-        from util.accessibility_tester import AccessibilityTester
-
         if "previous_url" not in st.session_state or st.session_state.previous_url != url:
             st.session_state.extracted_urls = set()
             st.session_state.previous_url = url
             st.session_state.choice_made = False
             st.session_state.test_choice = None
+            st.session_state.sitemap_lastmod = {}
+            st.session_state.page_signatures = {}
 
         if not validators.url(url):
             st.error("Please provide a valid URL")
@@ -138,35 +164,28 @@ class HelperFunctions:
             st.session_state.sitemap_exists = False
 
             # Immediately send URL for testing
-            if 'tester' not in st.session_state:
-                st.session_state.tester = AccessibilityTester()
             st.session_state.show_tests = True
             st.session_state.choice_made = True
             st.session_state.test_choice = 'Test only homepage'
         elif st.session_state.extraction_method == 'Use Sitemap':
             sitemap_parser = SitemapParser(url)
-            if sitemap_parser.has_sitemap():
-                logging.info(f"Sitemap found on {url}: Extracting URLs for Accessibility Tests")
-                st.info("Sitemap found. Extracting URLs for Accessibility Tests")
-                extracted_urls = sitemap_parser.get_sitemap_urls()
-                logging.info(f"Extracted {len(extracted_urls)} URLs from {url}")
-                if not extracted_urls:
-                    with st.spinner("Sitemap index found but could not be parsed. Crawling for URLs"):
-                        crawler = WebsiteCrawler(url)
-                        extracted_urls = crawler.crawl_urls_to_test(url, crawl_depth)
-                if extracted_urls:
-                    st.session_state.extracted_urls = extracted_urls
-                    st.session_state.previous_url = url
-                    st.session_state.extracted_urls_valid = True
-                    st.success(f"Extracted {len(extracted_urls)} URLs from the sitemap.")
-                else:
-                    st.error("No URLs extracted from the sitemap. Please choose to crawl the website.")
+            # the URLs are listed for selection, so the whole sitemap is expanded in one pass
+            with st.spinner("Extracting URLs from the sitemap"):
+                extracted_urls = set(sitemap_parser.iter_urls())
+            if extracted_urls:
+                logging.info(f"Extracted {len(extracted_urls)} URLs from the sitemap of {url}")
+                st.session_state.sitemap_lastmod = sitemap_parser.lastmod
+                st.session_state.extracted_urls = extracted_urls
+                st.session_state.previous_url = url
+                st.session_state.extracted_urls_valid = True
+                st.success(f"Extracted {len(extracted_urls)} URLs from the sitemap.")
             else:
                 st.error("No sitemap found. Please choose Crawl Website to extract URLs.")
         elif st.session_state.extraction_method == 'Crawl Website':
             crawler = WebsiteCrawler(url)
             with st.spinner("Crawling for URLs"):
                 extracted_urls = crawler.crawl_urls_to_test(url, crawl_depth)
+            st.session_state.page_signatures = crawler.page_signatures
             if extracted_urls:
                 st.session_state.extracted_urls = extracted_urls
                 st.session_state.previous_url = url
@@ -191,6 +210,8 @@ class HelperFunctions:
             st.session_state.previous_url = url
             st.session_state.choice_made = False
             st.session_state.test_choice = None
+            st.session_state.sitemap_lastmod = {}
+            st.session_state.page_signatures = {}
 
         if not validators.url(url):
             st.error("Please provide a valid URL")
@@ -278,50 +299,86 @@ class HelperFunctions:
 
         Args:
             url (str): URL to check.
+            session (requests.Session, optional): The session to use; a cached session is created if omitted.
 
         Returns:
             bool: True if the URL is accessible, False otherwise.
         """
         if not url.startswith(('http://', 'https://')):
             return False
-        
-#### Add headers to the request to avoid 403 Forbidden errors
-        from config.constants import USER_AGENT
-        headers = {"User-Agent": USER_AGENT}
+
+        # The session sets the user agent to avoid 403 Forbidden errors
+        own_session = session is None
+        if own_session:
+            session = HelperFunctions.create_session(pool_size=1)
 
         try:
-            response = requests.get(url,headers=headers, stream=True, timeout=10)
+            response = session.get(url, stream=True, timeout=10)
             response.close()  # Make sure to close the response
             logging.info(f"response: {response}")
             return response.status_code == 200
         except requests.RequestException as e:
             logging.error(f"Failed to access URL {url}: {e}")
             return False
+        finally:
+            if own_session:
+                session.close()
+
+    @staticmethod
+    def create_session(pool_size: int = 10, cache: bool = HTTP_CACHE_ENABLED,
+                       retries: int = HTTP_RETRIES) -> requests.Session:
+        """
+        Creates a requests session with a connection pool large enough to be shared by
+        `pool_size` concurrent workers. Requests are paced per host, retried and given default
+        timeouts by the ThrottledHTTPAdapter.
+
+        Args:
+            pool_size (int): The maximum number of pooled connections per host.
+            cache (bool): Whether GET requests go through the persistent conditional-GET `http_cache`.
+            retries (int): The number of retries of a failed GET, HEAD or OPTIONS request.
+
+        Returns:
+            requests.Session: A session with the default user agent set.
+        """
+        from config.constants import USER_AGENT
+
+        session = requests.Session()
+        adapter_cls = CachingHTTPAdapter if cache else ThrottledHTTPAdapter
+        adapter = adapter_cls(pool_connections=HTTP_POOL_HOSTS, pool_maxsize=pool_size, retries=retries)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers.update({"User-Agent": USER_AGENT})
+        return session
 
     @staticmethod
-    def create_test_directory(url: str) -> str:
+    def create_test_directory(url: str, base_directory: str = FULL_ACCESSIBILITY_RESULTS_DIRECTORY) -> str:
         """
         Creates a nested directory structure for test results based on the given URL.
         The structure will be: data/accessibility_tests/domain/timestamp/
 
         Args:
             url (str): The full URL for which to create the directory structure.
+            base_directory (str, optional): The results directory. Defaults to FULL_ACCESSIBILITY_RESULTS_DIRECTORY.
 
         Returns:
             str: The path to the directory for the specific test-session.
         """
         parsed_url = urlparse(url)
         domain = parsed_url.netloc.replace('www.', '')
-
-        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-
-        directory_path = os.path.join(FULL_ACCESSIBILITY_RESULTS_DIRECTORY, domain, timestamp)
-        os.makedirs(directory_path, exist_ok=True)
-
-        return directory_path
+        os.makedirs(os.path.join(base_directory, domain), exist_ok=True)
+
+        # Audits of the same site may start within the same second (background jobs), each gets its own run
+        while True:
+            timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+            directory_path = os.path.join(base_directory, domain, timestamp)
+            try:
+                os.mkdir(directory_path)
+                return directory_path
+            except FileExistsError:
+                time.sleep(1 - datetime.now().microsecond / 1_000_000)
 
     @staticmethod
-    def is_valid_url(url: str, base_url: str, session: requests.Session) -> bool:
+    def is_valid_url(url: str, base_url: str, session: requests.Session, check_content_type: bool = True) -> bool:
         """
         Validates a URL based on specific criteria and content type check.
 
@@ -329,6 +386,8 @@ class HelperFunctions:
             url (str): The URL to validate.
             base_url (str): The base URL of the target website.
             session (requests.Session): The requests session for making HTTP requests.
+            check_content_type (bool): Whether to send a HEAD request to check the Content-Type.
+                Callers that fetch the page anyway should pass False and use `is_html_response`.
 
         Returns:
             bool: True if the URL is valid and points to a webpage, False otherwise.
@@ -357,9 +416,12 @@ class HelperFunctions:
             logging.debug(f"URL does not start with base URL: {url}")
             return False
 
+        if not check_content_type:
+            return True
+
         try:
             response = session.head(cleaned_url, allow_redirects=True, timeout=10)
-            if 'text/html' not in response.headers.get('Content-Type', ''):
+            if not HelperFunctions.is_html_response(response):
                 logging.debug(f"URL rejected due to content type: {url}")
                 return False
         except requests.RequestException as e:
@@ -368,6 +430,19 @@ class HelperFunctions:
 
         return True
 
+    @staticmethod
+    def is_html_response(response: requests.Response) -> bool:
+        """
+        Checks the Content-Type header of a response for an HTML document.
+
+        Args:
+            response (requests.Response): The response to check. Its body is not read.
+
+        Returns:
+            bool: True if the response declares `text/html` content, False otherwise.
+        """
+        return 'text/html' in response.headers.get('Content-Type', '')
+
     #@staticmethod
     #def can_fetch(url: str, user_agent: str = '*') -> bool:
         """
@@ -404,82 +479,77 @@ class HelperFunctions:
 
     @staticmethod
     def can_fetch(url: str, user_agent: str = '*', session: requests.Session | None = None) -> bool:
-        parsed_url = urlparse(url)
-        robots_url = f"{parsed_url.scheme}://{parsed_url.netloc}/robots.txt"
-        rp = RobotFileParser()
-
-        try:
-            if session:
-                response = session.get(robots_url, timeout=10)
-            else:
-                response = requests.get(robots_url, timeout=10)
-
-            if response.status_code == 200:
-                rp.parse(response.text.splitlines())
-            else:
-                logging.info(f"No robots.txt found at {robots_url}. Assuming crawling is allowed.")
-                return True
-        except requests.RequestException as e:
-            logging.error(f"Error fetching robots.txt: {e}")
-            return True
-
-        return rp.can_fetch(user_agent, url)
+        """
+        Checks if a URL can be fetched based on the website's robots.txt file.
+        The robots.txt of each host is fetched once and served from the shared `robots_cache`.
 
+        Args:
+            url (str): The URL to check.
+            user_agent (str): The user agent of the crawler (default is '*').
+            session (requests.Session, optional): The session to fetch robots.txt with.
 
+        Returns:
+            bool: True if fetching the URL is allowed, False otherwise.
+        """
+        return robots_cache.can_fetch(url, user_agent, session)
 
     @staticmethod
     def get_latest_results_directory(base_results_directory: str) -> str | None:
         """
         Get the latest results directory based on the timestamped directories.
 
+        The run is looked up in the `results_index`; the directories are only scanned once
+        to import runs made before the index existed.
+
         Args:
             base_results_directory (str): The base directory where results are stored.
 
         Returns:
             Optional[str]: The path to the latest results directory, or None if not found.
         """
-        logging.info(f"Checking for latest results directory in: {base_results_directory}")
-        domain_directories = os.listdir(base_results_directory)
-        latest_time = datetime.min
-        latest_directory = None
-
-        for domain_dir in domain_directories:
-            full_domain_path = os.path.join(base_results_directory, domain_dir)
-            if os.path.isdir(full_domain_path):  # Ensure it's a directory
-                timestamps = [d for d in os.listdir(full_domain_path) if os.path.isdir(os.path.join(full_domain_path, d))]
-                for ts in timestamps:
-                    try:
-                        ts_time = datetime.strptime(ts, "%Y-%m-%d_%H-%M-%S")
-                        if ts_time > latest_time:
-                            latest_time = ts_time
-                            latest_directory = os.path.join(full_domain_path, ts)
-                    except ValueError:
-                        continue
-
+        latest_directory = results_index.latest_run(base_results_directory)
+        if latest_directory is None:
+            logging.info(f"No indexed runs, scanning for results directories in: {base_results_directory}")
+            results_index.index_runs(base_results_directory)
+            latest_directory = results_index.latest_run(base_results_directory)
         return latest_directory
     
     @staticmethod
-    def fetch_latest_axe() -> str:
+    def fetch_latest_axe_version() -> str:
         """
-        Download and return the newest axe.min.js script as a text string.
-        Steps:
-        1. Query cdnjs for the latest axe-core version.
-        2. Build the exact CDN URL for that version.
-        3. Download axe.min.js and return its content.
-        Raises `requests.HTTPError` if either request fails.
-    """
-        # ── 1) get latest version ─────────────────────────────────────────
-        meta = requests.get(CDNJS_AXE_API, timeout=8)
+        Query cdnjs for the latest axe-core version.
+        A cached script can be used instead, so the probe is not retried and gives up quickly.
+        Raises `requests.HTTPError` if the request fails.
+        """
+        with HelperFunctions.create_session(pool_size=1, cache=False, retries=0) as session:
+            meta = session.get(CDNJS_AXE_API, timeout=3)
         meta.raise_for_status()
         version = meta.json()["version"]          # e.g. "4.10.3"
         logging.info("Latest axe-core version: %s", version)
+        return version
 
-        # ── 2) build URL & fetch script ───────────────────────────────────
+    @staticmethod
+    def fetch_axe(version: str) -> str:
+        """
+        Download axe.min.js of the given axe-core version from the CDN and return its content.
+        Raises `requests.HTTPError` if the request fails.
+        """
         axe_url = AXE_CDN_LATEST.format(version=version)
-        r = requests.get(axe_url, timeout=8)
+        with HelperFunctions.create_session(pool_size=1, cache=False) as session:
+            r = session.get(axe_url, timeout=8)
         r.raise_for_status()
         logging.info("Downloaded axe.min.js (%d bytes)", len(r.content))
-
         return r.text            # full JavaScript source
 
-    
\ No newline at end of file
+    @staticmethod
+    def fetch_latest_axe() -> str:
+        """
+        Download and return the newest axe.min.js script as a text string.
+        Steps:
+        1. Query cdnjs for the latest axe-core version.
+        2. Build the exact CDN URL for that version.
+        3. Download axe.min.js and return its content.
+        Raises `requests.HTTPError` if either request fails.
+        Testers use the cached `axe_script_cache` instead of calling this directly.
+    """
+        return HelperFunctions.fetch_axe(HelperFunctions.fetch_latest_axe_version())
@@ -0,0 +1,278 @@
+# util/http_cache.py
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from config.constants import HTTP_CACHE_DIRECTORY, HTTP_CACHE_MAX_BYTES, HTTP_CACHE_MAX_ENTRY_BYTES
+from util.http_transport import ThrottledHTTPAdapter
+
+# Headers that describe the transfer rather than the body; bodies are stored decoded
+_TRANSFER_HEADERS = ("Content-Encoding", "Content-Length", "Transfer-Encoding")
+
+
+class HttpCache:
+    """
+    A size-bounded on-disk store of HTTP response bodies and their validators.
+
+    Metadata (ETag, Last-Modified, headers, size, last access) lives in a SQLite index,
+    bodies in files named after the hash of the URL. When the total size exceeds `max_bytes`,
+    the least recently used entries are evicted.
+
+    Attributes:
+        directory (str): The cache directory.
+        max_bytes (int): The maximum total size of cached bodies.
+        max_entry_bytes (int): Bodies larger than this are not cached.
+    """
+
+    def __init__(self, directory: str = HTTP_CACHE_DIRECTORY, max_bytes: int = HTTP_CACHE_MAX_BYTES,
+                 max_entry_bytes: int = HTTP_CACHE_MAX_ENTRY_BYTES):
+        """
+        Initializes the cache. The directory and index are created on first use.
+
+        Args:
+            directory (str, optional): The cache directory. Defaults to HTTP_CACHE_DIRECTORY.
+            max_bytes (int, optional): The maximum total size. Defaults to HTTP_CACHE_MAX_BYTES.
+            max_entry_bytes (int, optional): The maximum size of one body. Defaults to HTTP_CACHE_MAX_ENTRY_BYTES.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self._connection: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def _db(self) -> sqlite3.Connection:
+        """
+        Returns the index connection, creating the directory and schema on first use.
+        """
+        if self._connection is None:
+            os.makedirs(os.path.join(self.directory, "bodies"), exist_ok=True)
+            self._connection = sqlite3.connect(os.path.join(self.directory, "index.sqlite3"),
+                                               timeout=30, check_same_thread=False)
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS entries (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    headers TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            self._connection.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries (last_access)")
+            self._connection.commit()
+        return self._connection
+
+    def body_path(self, url: str) -> str:
+        """
+        Returns the file the body of `url` is stored in.
+        """
+        digest = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, "bodies", digest[:2], digest)
+
+    def lookup(self, url: str) -> dict[str, Any] | None:
+        """
+        Returns the validators and headers stored for `url`, or None if it is not cached.
+        """
+        with self._lock:
+            row = self._db().execute(
+                "SELECT etag, last_modified, headers FROM entries WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None or not os.path.exists(self.body_path(url)):
+            return None
+        return {"etag": row[0], "last_modified": row[1], "headers": json.loads(row[2])}
+
+    def touch(self, url: str) -> None:
+        """
+        Marks an entry as recently used.
+        """
+        with self._lock:
+            self._db().execute("UPDATE entries SET last_access = ? WHERE url = ?", (time.time(), url))
+            self._db().commit()
+
+    def store(self, url: str, headers: CaseInsensitiveDict, body_file: str, size: int) -> None:
+        """
+        Moves a completely downloaded body into the cache and records its validators.
+
+        Args:
+            url (str): The requested URL.
+            headers (CaseInsensitiveDict): The response headers.
+            body_file (str): A temporary file holding the decoded body; it is moved into the cache.
+            size (int): The size of the body in bytes.
+        """
+        stored_headers = {k: v for k, v in headers.items() if k not in _TRANSFER_HEADERS}
+        path = self.body_path(url)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(body_file, path)
+            with self._lock:
+                self._db().execute(
+                    "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                    (url, headers.get("ETag"), headers.get("Last-Modified"),
+                     json.dumps(stored_headers), size, time.time()),
+                )
+                self._db().commit()
+            self._evict()
+        except (OSError, sqlite3.Error) as e:
+            logging.error(f"Error while caching {url}: {e}")
+
+    def _evict(self) -> None:
+        """
+        Deletes the least recently used entries until the cache is below `max_bytes`.
+        """
+        with self._lock:
+            db = self._db()
+            total = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            evicted = []
+            for url, size in db.execute("SELECT url, size FROM entries ORDER BY last_access"):
+                if total <= self.max_bytes * 0.9:  # leave some headroom so not every store evicts
+                    break
+                evicted.append(url)
+                total -= size
+            db.executemany("DELETE FROM entries WHERE url = ?", [(url,) for url in evicted])
+            db.commit()
+        for url in evicted:
+            try:
+                os.remove(self.body_path(url))
+            except OSError:
+                pass
+        logging.info(f"HTTP cache evicted {len(evicted)} entries")
+
+    def temp_path(self) -> str:
+        """
+        Returns a unique temporary file name inside the cache directory.
+        """
+        os.makedirs(os.path.join(self.directory, "bodies"), exist_ok=True)
+        return os.path.join(self.directory, "bodies", f"tmp-{os.getpid()}-{threading.get_ident()}-{time.monotonic_ns()}")
+
+
+class _CachingStream:
+    """
+    Wraps the raw stream of a response and copies the decoded bytes into a temporary file
+    as the caller reads them. The body is committed to the cache once it was read to the end,
+    so streaming consumers and callers that abort the download keep their behaviour.
+    """
+
+    def __init__(self, raw: Any, cache: HttpCache, url: str, headers: CaseInsensitiveDict):
+        self._raw = raw
+        self._cache = cache
+        self._url = url
+        self._headers = headers
+        self._path = cache.temp_path()
+        self._file = open(self._path, "wb")
+        self._size = 0
+
+    def read(self, amt: int | None = None, *args, **kwargs) -> bytes:
+        chunk = self._raw.read(amt, decode_content=True)
+        if self._file is None:
+            return chunk
+        if chunk:
+            self._size += len(chunk)
+            if self._size > self._cache.max_entry_bytes:
+                self._discard()
+            else:
+                self._file.write(chunk)
+        else:
+            self._file.close()
+            self._file = None
+            self._cache.store(self._url, self._headers, self._path, self._size)
+        return chunk
+
+    def stream(self, amt: int = 2 ** 16, decode_content: bool | None = None):
+        # requests prefers raw.stream() over raw.read(); route it through read() so the copy is made
+        while True:
+            chunk = self.read(amt)
+            if not chunk:
+                break
+            yield chunk
+
+    def _discard(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            try:
+                os.remove(self._path)
+            except OSError:
+                pass
+
+    def close(self) -> None:
+        self._discard()  # an incomplete body is never cached
+        self._raw.close()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._raw, name)
+
+
+class CachingHTTPAdapter(ThrottledHTTPAdapter):
+    """
+    A transport adapter that turns GET requests into conditional requests.
+
+    Responses with an ETag or Last-Modified header are stored in the `HttpCache`. Later requests
+    for the same URL send `If-None-Match` / `If-Modified-Since`, and a `304 Not Modified` is answered
+    with the stored body as a regular 200 response (with `response.from_cache` set to True).
+    Revalidations are paced and retried like any other request, see ThrottledHTTPAdapter.
+    """
+
+    def __init__(self, cache: "HttpCache | None" = None, **kwargs):
+        super().__init__(**kwargs)
+        self.cache = cache or http_cache
+
+    def send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        if request.method != "GET" or "Range" in request.headers:
+            return super().send(request, **kwargs)
+
+        entry = self.cache.lookup(request.url)
+        if entry:
+            if entry["etag"]:
+                request.headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                request.headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = super().send(request, **kwargs)
+        response.from_cache = False
+
+        if response.status_code == 304 and entry:
+            response.close()
+            self.cache.touch(request.url)
+            return self._cached_response(request, response, entry)
+
+        if response.status_code == 200 and ("ETag" in response.headers or "Last-Modified" in response.headers):
+            response.raw = _CachingStream(response.raw, self.cache, request.url, response.headers)
+        return response
+
+    def _cached_response(self, request: requests.PreparedRequest, not_modified: requests.Response,
+                         entry: dict[str, Any]) -> requests.Response:
+        """
+        Builds a 200 response whose body is read from the cache file.
+        """
+        path = self.cache.body_path(request.url)
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = "OK"
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response.headers.update({k: v for k, v in not_modified.headers.items() if k not in _TRANSFER_HEADERS})
+        response.headers["Content-Length"] = str(os.path.getsize(path))
+        response.raw = open(path, "rb")
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.elapsed = not_modified.elapsed
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.from_cache = True
+        return response
+
+
+# Process-wide cache shared by all sessions created with HelperFunctions.create_session
+http_cache = HttpCache()
@@ -0,0 +1,130 @@
+# util/http_transport.py
+
+import logging
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config.constants import (
+    HTTP_BACKOFF_BASE,
+    HTTP_BACKOFF_MAX,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_READ_TIMEOUT,
+    HTTP_RETRIES,
+)
+from util.metrics import metrics
+from util.rate_limiter import HostRateLimiter, host_rate_limiter
+
+# Only requests without side effects are sent again
+_RETRYABLE_METHODS = ("GET", "HEAD", "OPTIONS")
+# Responses asking the client to slow down
+_THROTTLE_STATUSES = (429, 503)
+# Responses of overloaded gateways, worth another attempt
+_TRANSIENT_STATUSES = (502, 504)
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """
+    Returns the seconds of a Retry-After header given as seconds or as an HTTP date.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff_delay(retry: int) -> float:
+    """
+    Returns the delay before the `retry`-th retry: exponential, capped and jittered.
+    """
+    return min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * 2 ** (retry - 1)) * random.uniform(0.5, 1.0)
+
+
+class ThrottledHTTPAdapter(HTTPAdapter):
+    """
+    A transport adapter that paces requests per host and retries failed ones.
+
+    Every request waits for a token of its host from the `HostRateLimiter`. 429 and 503 responses
+    and timeouts slow the host down; other responses speed it up again. GET and HEAD requests are
+    retried with exponential backoff after connection errors, timeouts and 429/502/503/504 responses,
+    honouring Retry-After. Requests without a timeout get HTTP_CONNECT_TIMEOUT/HTTP_READ_TIMEOUT.
+    Attempts, retries and rate-limit waits are counted in `metrics`.
+
+    Attributes:
+        limiter (HostRateLimiter): The per-host rate limiter.
+        retries (int): The number of retries of a request.
+    """
+
+    def __init__(self, limiter: HostRateLimiter | None = None, retries: int = HTTP_RETRIES, **kwargs):
+        super().__init__(**kwargs)
+        self.limiter = limiter or host_rate_limiter
+        self.retries = retries
+
+    @staticmethod
+    def _observe(method: str, status: str, started: float) -> None:
+        """
+        Records the duration of a request attempt up to its response headers.
+        """
+        metrics.observe("a11y_http_request_seconds", time.perf_counter() - started, method=method, status=status)
+        metrics.inc("a11y_http_requests_total", method=method, status=status)
+
+    def send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+        host = urlparse(request.url).netloc
+        retries_left = self.retries if request.method in _RETRYABLE_METHODS else 0
+        retry = 0
+
+        while True:
+            waited = self.limiter.acquire(host)
+            if waited:
+                metrics.inc("a11y_http_wait_seconds_total", waited)
+            started = time.perf_counter()
+            try:
+                response = super().send(request, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._observe(request.method, "error", started)
+                if isinstance(e, requests.Timeout):
+                    self.limiter.on_throttled(host)
+                # certificate problems do not go away by trying again
+                if retry >= retries_left or isinstance(e, requests.exceptions.SSLError):
+                    raise
+                retry += 1
+                metrics.inc("a11y_http_retries_total")
+                delay = backoff_delay(retry)
+                logging.debug(f"Retrying {request.url} in {delay:.1f}s ({retry}/{retries_left}) after: {e}")
+                time.sleep(delay)
+                continue
+
+            status = response.status_code
+            self._observe(request.method, str(status), started)
+            if status not in _THROTTLE_STATUSES and status not in _TRANSIENT_STATUSES:
+                self.limiter.on_success(host)
+                return response
+
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if status in _THROTTLE_STATUSES:
+                # the limiter holds back every request to the host until Retry-After has passed
+                self.limiter.on_throttled(host, retry_after)
+                logging.warning(f"{host} answered {status}, slowing down to {self.limiter.rate(host):.2f} requests/s")
+            if retry >= retries_left:
+                return response
+            retry += 1
+            metrics.inc("a11y_http_retries_total")
+            response.close()
+            if retry_after is None or status in _TRANSIENT_STATUSES:
+                time.sleep(backoff_delay(retry))
+            logging.debug(f"Retrying {request.url} ({retry}/{retries_left}) after status {status}")
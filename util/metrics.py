@@ -0,0 +1,275 @@
+# util/metrics.py
+
+import bisect
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+from config.constants import METRICS_BUCKETS, METRICS_FILE
+
+# Files of a run directory with its timing spans and their summary
+SPANS_NAME = "spans.jsonl"
+RUN_METRICS_NAME = "run_metrics.json"
+
+# HELP lines of the exported metrics
+METRIC_HELP = {
+    "a11y_phase_seconds": "Seconds spent per phase of crawling, sitemap parsing, auditing and saving.",
+    "a11y_pages_total": "Audited pages by outcome (done, failed, reused).",
+    "a11y_crawled_pages_total": "Pages fetched by the crawler by outcome (html, rejected, error).",
+    "a11y_sitemap_urls_total": "Page URLs read from sitemaps.",
+    "a11y_http_request_seconds": "Seconds per HTTP request attempt by method and status.",
+    "a11y_http_requests_total": "HTTP request attempts by method and status.",
+    "a11y_http_retries_total": "HTTP requests sent again after an error or a throttling response.",
+    "a11y_http_wait_seconds_total": "Seconds requests waited for the per-host rate limit.",
+    "a11y_runs_total": "Finished test runs.",
+}
+
+
+class MetricsRegistry:
+    """
+    Thread-safe counters and histograms of the process, exported in the Prometheus text format.
+
+    Metrics are created on first use and identified by their name and labels. Histograms share the
+    METRICS_BUCKETS upper bounds (in seconds). The registry is exported as a text file that a node_exporter
+    textfile collector can pick up, and optionally served at `/metrics` on METRICS_PORT.
+
+    Attributes:
+        buckets (Tuple[float, ...]): The upper bounds of the histogram buckets.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = METRICS_BUCKETS):
+        """
+        Args:
+            buckets (Tuple[float, ...], optional): The histogram bucket bounds. Defaults to METRICS_BUCKETS.
+        """
+        self.buckets = tuple(sorted(buckets))
+        self._counters: dict[tuple[str, tuple], float] = {}
+        # (name, labels) -> [count per bucket (the last one is +Inf), sum]
+        self._histograms: dict[tuple[str, tuple], list] = {}
+        self._lock = threading.Lock()
+        self._server: ThreadingHTTPServer | None = None
+
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        """
+        Increases a counter.
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        """
+        Records a value (usually seconds) in a histogram.
+        """
+        key = (name, tuple(sorted(labels.items())))
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            histogram[0][index] += 1
+            histogram[1] += value
+
+    # ------------------------------------------------------------------ #
+    # Export                                                             #
+    # ------------------------------------------------------------------ #
+    @staticmethod
+    def _labels(labels: tuple, extra: str = "") -> str:
+        """
+        Formats the labels of a sample, e.g. `{phase="audit",le="0.5"}`.
+        """
+        pairs = []
+        for name, value in labels:
+            escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+            pairs.append(f'{name}="{escaped}"')
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self) -> str:
+        """
+        Returns all metrics in the Prometheus text exposition format.
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: (list(counts), total) for key, (counts, total) in self._histograms.items()}
+
+        lines: list[str] = []
+        described: set[str] = set()
+
+        def describe(name: str, kind: str) -> None:
+            if name not in described:
+                described.add(name)
+                if name in METRIC_HELP:
+                    lines.append(f"# HELP {name} {METRIC_HELP[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in sorted(counters.items()):
+            describe(name, "counter")
+            lines.append(f"{name}{self._labels(labels)} {value:g}")
+        for (name, labels), (counts, total) in sorted(histograms.items()):
+            describe(name, "histogram")
+            cumulative = 0
+            for bound, count in zip([*self.buckets, math.inf], counts):
+                cumulative += count
+                le = "+Inf" if bound == math.inf else f"{bound:g}"
+                bucket_labels = self._labels(labels, f'le="{le}"')
+                lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{name}_sum{self._labels(labels)} {total:.6f}")
+            lines.append(f"{name}_count{self._labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str = METRICS_FILE) -> None:
+        """
+        Writes the metrics to `path` atomically, for a textfile collector or to be read after a run.
+        """
+        temporary_path = f"{path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(temporary_path, "w") as metrics_file:
+                metrics_file.write(self.render())
+            os.replace(temporary_path, path)
+        except OSError as e:
+            logging.error(f"Error while writing the metrics to {path}: {e}")
+
+    def serve(self, port: int, host: str = "0.0.0.0") -> None:
+        """
+        Serves the metrics at `http://<host>:<port>/metrics` from a daemon thread.
+        Calling it again (e.g. on a Streamlit rerun) keeps the running server.
+        """
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass  # scrapes are not worth a log line
+
+        with self._lock:
+            if self._server is not None:
+                return
+            try:
+                self._server = ThreadingHTTPServer((host, port), MetricsHandler)
+            except OSError as e:
+                logging.error(f"Could not serve metrics on port {port}: {e}")
+                return
+        threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True).start()
+        logging.info(f"Serving metrics at http://{host}:{port}/metrics")
+
+
+class SpanLog:
+    """
+    Appends the timing spans of a run to `spans.jsonl` in its run directory, one JSON object per line:
+    `{"ts": <unix time>, "phase": "audit", "seconds": 1.234, "url": "...", ...}`.
+
+    Every recorded span is also observed in the `a11y_phase_seconds` histogram of `metrics`.
+
+    Attributes:
+        directory (str): The run directory.
+    """
+
+    def __init__(self, directory: str):
+        """
+        Args:
+            directory (str): The run directory.
+        """
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    def record(self, phase: str, seconds: float, **attributes: Any) -> None:
+        """
+        Records a finished span. Called from worker threads.
+        """
+        metrics.observe("a11y_phase_seconds", seconds, phase=phase)
+        line = json.dumps({"ts": round(time.time(), 3), "phase": phase, "seconds": round(seconds, 4), **attributes},
+                          separators=(',', ':'))
+        try:
+            with self._lock, open(os.path.join(self.directory, SPANS_NAME), "a") as spans_file:
+                spans_file.write(line + "\n")
+        except OSError as e:
+            logging.error(f"Error while recording a {phase} span: {e}")
+
+    def spans(self) -> Iterator[dict[str, Any]]:
+        """
+        Yields the recorded spans of the run; a line cut short by a crash is skipped.
+        """
+        try:
+            with open(os.path.join(self.directory, SPANS_NAME)) as spans_file:
+                for line in spans_file:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+        except FileNotFoundError:
+            return
+
+    def summarize(self) -> dict[str, dict[str, float]]:
+        """
+        Returns the count, total, p50, p95, p99 and maximum seconds of every phase of the run.
+        """
+        durations: dict[str, list[float]] = {}
+        for span in self.spans():
+            durations.setdefault(span["phase"], []).append(span["seconds"])
+
+        def percentile(values: list[float], share: float) -> float:
+            return values[max(0, math.ceil(share * len(values)) - 1)]
+
+        summary = {}
+        for phase, values in sorted(durations.items()):
+            values.sort()
+            summary[phase] = {"count": len(values), "total": round(sum(values), 3),
+                              "p50": percentile(values, 0.5), "p95": percentile(values, 0.95),
+                              "p99": percentile(values, 0.99), "max": values[-1]}
+        return summary
+
+    def save_summary(self) -> None:
+        """
+        Writes the phase summary of the run to `run_metrics.json` in the run directory.
+        """
+        try:
+            with open(os.path.join(self.directory, RUN_METRICS_NAME), "w") as summary_file:
+                json.dump(self.summarize(), summary_file, indent=4)
+        except OSError as e:
+            logging.error(f"Error while saving the run metrics to {self.directory}: {e}")
+
+
+@contextmanager
+def timed(phase: str, span_log: SpanLog | None = None, **attributes: Any) -> Iterator[dict[str, Any]]:
+    """
+    Times the enclosed block as a span of `phase`.
+
+    The block may add attributes to the yielded dict. A block left by an exception records the span with
+    the exception type as `error` and re-raises it. Without a span log only the histogram is updated.
+    """
+    started = time.perf_counter()
+    try:
+        yield attributes
+    except BaseException as e:
+        attributes["error"] = type(e).__name__
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        if span_log:
+            span_log.record(phase, seconds, **attributes)
+        else:
+            metrics.observe("a11y_phase_seconds", seconds, phase=phase)
+
+
+# Process-wide registry shared by the crawler, the HTTP transport and all runs
+metrics = MetricsRegistry()
@@ -0,0 +1,181 @@
+# util/page_readiness.py
+
+import logging
+import time
+from typing import Any
+
+from selenium import webdriver
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+from config.constants import (
+    PAGE_NETWORK_IDLE_TIME,
+    PAGE_READY_MAX_SETTLE,
+    PAGE_READY_SELECTOR,
+    PAGE_READY_STRATEGY,
+)
+
+
+class PageReadiness:
+    """
+    Decides when a loaded page is ready to be audited.
+
+    Browsers are started with the normal page load strategy, so `driver.get` returns at the load
+    event; with PAGE_READY_STRATEGY "dom" they use the eager one and `driver.get` returns at
+    DOMContentLoaded. The strategy then decides how much longer to wait:
+
+    - "load" (default): wait for the load event (`document.readyState == "complete"`).
+    - "dom": audit right away. Stylesheets, web fonts and images may still be loading, which
+      affects rules such as color-contrast and image-alt, so it is opt-in.
+    - "network-idle": wait for the load event and until no fetch/XHR request was pending and no new
+      resource was fetched for `idle_time`. Pending requests are counted by NETWORK_TRACKER_SCRIPT,
+      which `register` adds to every document of a browser session.
+    - "selector": wait until `selector` matches an element.
+
+    No strategy waits longer than `max_settle_time`; slower pages are audited in their current state.
+
+    Attributes:
+        strategy (str): One of STRATEGIES.
+        selector (str): The CSS selector for the "selector" strategy.
+        max_settle_time (float): The maximum number of seconds to wait.
+        idle_time (float): Quiet period in seconds for the "network-idle" strategy.
+    """
+
+    STRATEGIES = ("dom", "load", "network-idle", "selector")
+    POLL_INTERVAL = 0.1
+    # the default Resource Timing buffer holds 250 entries; a full buffer would look idle
+    RESOURCE_BUFFER_SIZE = 10000
+
+    # counts the fetch and XHR requests in flight; evaluated before the page's own scripts
+    NETWORK_TRACKER_SCRIPT = """
+        (() => {
+            if (window.__a11yPendingRequests !== undefined) { return; }
+            window.__a11yPendingRequests = 0;
+            performance.setResourceTimingBufferSize(%d);
+            const started = () => { window.__a11yPendingRequests++; };
+            const finished = () => {
+                window.__a11yPendingRequests = Math.max(0, window.__a11yPendingRequests - 1);
+            };
+            const fetch = window.fetch;
+            if (fetch) {
+                window.fetch = function (...args) {
+                    started();
+                    try {
+                        return fetch.apply(this, args).finally(finished);
+                    } catch (e) { finished(); throw e; }
+                };
+            }
+            const send = XMLHttpRequest.prototype.send;
+            XMLHttpRequest.prototype.send = function (...args) {
+                started();
+                this.addEventListener('loadend', finished, { once: true });
+                try {
+                    return send.apply(this, args);
+                } catch (e) { finished(); throw e; }
+            };
+        })();
+    """ % RESOURCE_BUFFER_SIZE
+
+    # readyState, pending requests (-1 without the tracker) and the number of fetched resources
+    NETWORK_STATE_SCRIPT = """
+        if (window.__a11yPendingRequests === undefined) {
+            performance.setResourceTimingBufferSize(%d);
+        }
+        return [document.readyState,
+                window.__a11yPendingRequests === undefined ? -1 : window.__a11yPendingRequests,
+                performance.getEntriesByType('resource').length];
+    """ % RESOURCE_BUFFER_SIZE
+
+    def __init__(self, strategy: str = PAGE_READY_STRATEGY, selector: str = PAGE_READY_SELECTOR,
+                 max_settle_time: float = PAGE_READY_MAX_SETTLE, idle_time: float = PAGE_NETWORK_IDLE_TIME):
+        """
+        Initializes the readiness check.
+
+        Args:
+            strategy (str, optional): The readiness strategy. Defaults to PAGE_READY_STRATEGY.
+            selector (str, optional): The CSS selector for the "selector" strategy. Defaults to PAGE_READY_SELECTOR.
+            max_settle_time (float, optional): Maximum wait in seconds. Defaults to PAGE_READY_MAX_SETTLE.
+            idle_time (float, optional): Network quiet period in seconds. Defaults to PAGE_NETWORK_IDLE_TIME.
+
+        Raises:
+            ValueError: If the strategy is unknown or "selector" is used without a selector.
+        """
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Unknown page readiness strategy: {strategy}")
+        if strategy == "selector" and not selector:
+            raise ValueError("The 'selector' readiness strategy needs a CSS selector")
+        self.strategy = strategy
+        self.selector = selector
+        self.max_settle_time = max_settle_time
+        self.idle_time = idle_time
+
+    def register(self, driver: webdriver.Chrome, state: dict[str, Any]) -> None:
+        """
+        Registers the request tracker of the "network-idle" strategy once per browser session, so
+        Chrome evaluates it in every new document. Without the DevTools protocol, the strategy falls
+        back to the Resource Timing buffer alone.
+
+        Args:
+            driver (webdriver.Chrome): The browser.
+            state (Dict[str, Any]): The per-session state of the browser, see WebDriverPool.driver_state.
+        """
+        if self.strategy != "network-idle" or "network_tracker_id" in state:
+            return
+        try:
+            registration = driver.execute_cdp_cmd(
+                "Page.addScriptToEvaluateOnNewDocument", {"source": self.NETWORK_TRACKER_SCRIPT}
+            )
+            state["network_tracker_id"] = registration.get("identifier")
+        except Exception as exc:
+            logging.warning("CDP unavailable, network idle ignores pending requests: %s", exc)
+            state["network_tracker_id"] = None
+
+    def wait(self, driver: webdriver.Chrome) -> bool:
+        """
+        Blocks until the page loaded in `driver` is ready or `max_settle_time` has passed.
+
+        Args:
+            driver (webdriver.Chrome): The browser with the page loaded.
+
+        Returns:
+            bool: True if the page became ready, False if the wait was cut off.
+        """
+        try:
+            if self.strategy == "load":
+                WebDriverWait(driver, self.max_settle_time, self.POLL_INTERVAL).until(
+                    lambda d: d.execute_script("return document.readyState;") == "complete"
+                )
+            elif self.strategy == "network-idle":
+                self._wait_for_network_idle(driver)
+            elif self.strategy == "selector":
+                WebDriverWait(driver, self.max_settle_time, self.POLL_INTERVAL).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, self.selector))
+                )
+            return True
+        except TimeoutException:
+            logging.warning(f"Page not '{self.strategy}'-ready after {self.max_settle_time}s, auditing as is")
+            return False
+
+    def _wait_for_network_idle(self, driver: webdriver.Chrome) -> None:
+        """
+        Polls the page until the load event has fired, no fetch/XHR request is pending and no new
+        resource finished loading for `idle_time` seconds.
+
+        Raises:
+            TimeoutException: If the page did not go idle within `max_settle_time`.
+        """
+        deadline = time.monotonic() + self.max_settle_time
+        last_count = -1
+        quiet_since = time.monotonic()
+        while time.monotonic() < deadline:
+            ready_state, pending, resource_count = driver.execute_script(self.NETWORK_STATE_SCRIPT)
+            now = time.monotonic()
+            if resource_count != last_count or ready_state != "complete" or pending > 0:
+                last_count = resource_count
+                quiet_since = now
+            elif now - quiet_since >= self.idle_time:
+                return
+            time.sleep(self.POLL_INTERVAL)
+        raise TimeoutException("network did not go idle")
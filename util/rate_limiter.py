@@ -0,0 +1,149 @@
+# util/rate_limiter.py
+
+import threading
+import time
+
+from config.constants import (
+    HTTP_HOST_BURST,
+    HTTP_HOST_MAX_RATE,
+    HTTP_HOST_MIN_RATE,
+    HTTP_HOST_RATE,
+    HTTP_HOST_RATE_INCREASE,
+    HTTP_MAX_RETRY_AFTER,
+)
+
+
+class _HostBucket:
+    """
+    The token bucket of one host.
+    """
+    __slots__ = ("rate", "tokens", "updated", "blocked_until", "throttled", "last_decrease")
+
+    def __init__(self, rate: float, tokens: float):
+        self.rate = rate
+        self.tokens = tokens
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.throttled = 0
+        self.last_decrease = float("-inf")
+
+
+class HostRateLimiter:
+    """
+    A thread-safe per-host token bucket whose rate adapts to the host (AIMD).
+
+    Every request takes a token of its host; tokens refill at the host's current rate, up to
+    `burst`. While a host answers normally its rate grows additively by about `increase` requests
+    per second every second. A 429 or 503 halves the rate and, with a Retry-After header, pauses the
+    host for that long. The rate is halved at most once per `max(1 / rate, 1)` seconds: the requests
+    in flight when a host starts throttling all fail together and count as one congestion signal.
+    All sessions share the process-wide `host_rate_limiter`, so concurrent crawls, sitemap fetches
+    and page checks of one site share its budget.
+
+    Attributes:
+        initial_rate (float): Requests per second of a host seen for the first time.
+        min_rate (float): The lowest rate a host is slowed down to.
+        max_rate (float): The highest rate a host is sped up to.
+        increase (float): The rate gained per second of successful requests.
+        burst (float): The number of tokens a host can accumulate.
+    """
+
+    def __init__(self, initial_rate: float = HTTP_HOST_RATE, min_rate: float = HTTP_HOST_MIN_RATE,
+                 max_rate: float = HTTP_HOST_MAX_RATE, increase: float = HTTP_HOST_RATE_INCREASE,
+                 burst: float = HTTP_HOST_BURST):
+        """
+        Args:
+            initial_rate (float, optional): Initial requests per second per host. Defaults to HTTP_HOST_RATE.
+            min_rate (float, optional): The lowest rate. Defaults to HTTP_HOST_MIN_RATE.
+            max_rate (float, optional): The highest rate. Defaults to HTTP_HOST_MAX_RATE.
+            increase (float, optional): The additive increase per second. Defaults to HTTP_HOST_RATE_INCREASE.
+            burst (float, optional): The bucket size. Defaults to HTTP_HOST_BURST.
+        """
+        self.initial_rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max(max_rate, min_rate)
+        self.increase = increase
+        self.burst = max(1.0, burst)
+        self._buckets: dict[str, _HostBucket] = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, host: str, now: float) -> _HostBucket:
+        """
+        Returns the bucket of `host` with its tokens refilled up to `now`. Called with the lock held.
+        """
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = _HostBucket(self.initial_rate, min(self.burst, self.initial_rate))
+        bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * bucket.rate)
+        bucket.updated = now
+        return bucket
+
+    def acquire(self, host: str) -> float:
+        """
+        Blocks until a request to `host` may be sent.
+
+        Returns:
+            float: The seconds waited.
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                bucket = self._bucket(host, now)
+                if now < bucket.blocked_until:
+                    wait = bucket.blocked_until - now
+                elif bucket.tokens >= 1:
+                    bucket.tokens -= 1
+                    return waited
+                else:
+                    wait = (1 - bucket.tokens) / bucket.rate
+            time.sleep(wait)
+            waited += wait
+
+    def on_success(self, host: str) -> None:
+        """
+        Additive increase: a request was answered normally.
+        """
+        with self._lock:
+            bucket = self._bucket(host, time.monotonic())
+            # `rate` requests per second each add increase / rate, so the rate grows by `increase` per second
+            bucket.rate = min(self.max_rate, bucket.rate + self.increase / bucket.rate)
+
+    def on_throttled(self, host: str, retry_after: float | None = None) -> None:
+        """
+        Multiplicative decrease: the host answered 429/503 or timed out.
+
+        Args:
+            host (str): The host.
+            retry_after (float, optional): Seconds the host asked to wait (Retry-After).
+        """
+        with self._lock:
+            now = time.monotonic()
+            bucket = self._bucket(host, now)
+            if now - bucket.last_decrease >= max(1 / bucket.rate, 1.0):
+                bucket.rate = max(self.min_rate, bucket.rate / 2)
+                bucket.last_decrease = now
+            bucket.tokens = min(bucket.tokens, 0.0)
+            bucket.throttled += 1
+            if retry_after:
+                bucket.blocked_until = max(bucket.blocked_until, now + min(retry_after, HTTP_MAX_RETRY_AFTER))
+
+    def rate(self, host: str) -> float:
+        """
+        Returns the current requests per second of `host`.
+        """
+        with self._lock:
+            bucket = self._buckets.get(host)
+            return bucket.rate if bucket else self.initial_rate
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        """
+        Returns the current rate and the number of throttling responses of every host.
+        """
+        with self._lock:
+            return {host: {"rate": round(bucket.rate, 2), "throttled": bucket.throttled}
+                    for host, bucket in self._buckets.items()}
+
+
+# Process-wide limiter shared by all HTTP sessions
+host_rate_limiter = HostRateLimiter()
@@ -0,0 +1,120 @@
+# util/report_cache.py
+
+import json
+import os
+from typing import Any
+
+import pandas as pd
+import streamlit as st
+
+from config.constants import COLUMNAR_RESULTS_NAME, REPORT_CACHE_MAX_ENTRIES, RESULTS_INDEX_PATH
+from util.accessibility_report_viewer import AccessibilityReportViewer
+from util.results_index import results_index
+from util.run_diff import RunDiff
+from util.site_aggregator import SiteAggregator
+
+# Memoized views of saved results for the Streamlit UI. Every function takes the modification time of
+# the files it reads as an argument, so a rewritten file is a new cache key and never served stale.
+# Entries are shared by all sessions and capped at REPORT_CACHE_MAX_ENTRIES per function.
+
+
+def file_mtime(path: str | None) -> float:
+    """
+    Returns the modification time of `path`, 0 if it does not exist.
+    A Parquet dataset is a directory, whose mtime changes whenever a page file is added.
+    """
+    try:
+        return os.stat(path).st_mtime if path else 0.0
+    except OSError:
+        return 0.0
+
+
+@st.cache_data(max_entries=REPORT_CACHE_MAX_ENTRIES, show_spinner=False)
+def run_pages(test_directory: str, index_mtime: float) -> list[dict[str, Any]]:
+    """
+    The indexed pages of a run, keyed by the modification time of the results index.
+    """
+    return results_index.pages(test_directory)
+
+
+def cached_run_pages(test_directory: str) -> list[dict[str, Any]]:
+    """
+    The pages of a run from the cache, refreshed whenever the results index was written to.
+    """
+    return run_pages(test_directory, file_mtime(RESULTS_INDEX_PATH))
+
+
+@st.cache_data(max_entries=REPORT_CACHE_MAX_ENTRIES, show_spinner=False)
+def accessibility_score(json_path: str, mtime: float) -> float:
+    """
+    The accessibility score of a result file.
+    """
+    return AccessibilityReportViewer(json_path).calculate_accessibility_score()
+
+
+def cached_accessibility_score(json_path: str) -> float:
+    """
+    The accessibility score of a result file from the cache.
+    """
+    return accessibility_score(json_path, file_mtime(json_path))
+
+
+@st.cache_data(max_entries=REPORT_CACHE_MAX_ENTRIES, show_spinner=False)
+def violations_dataframe(json_path: str, mtime: float, columnar_path: str | None = None,
+                         columnar_mtime: float = 0.0, url: str | None = None) -> pd.DataFrame:
+    """
+    The violations table of a result file, read from the columnar store of the run if there is one.
+    """
+    return AccessibilityReportViewer(json_path, columnar_path=columnar_path, url=url).create_violations_dataframe()
+
+
+def cached_violations_dataframe(json_path: str, columnar_path: str | None = None, url: str | None = None) -> pd.DataFrame:
+    """
+    The violations table of a result file from the cache.
+    """
+    return violations_dataframe(json_path, file_mtime(json_path), columnar_path, file_mtime(columnar_path), url)
+
+
+@st.cache_data(max_entries=REPORT_CACHE_MAX_ENTRIES, show_spinner=False)
+def template_report(report_path: str, mtime: float) -> dict[str, Any]:
+    """
+    The parsed `template_clusters.json` of a sampled run.
+    """
+    with open(report_path) as report_file:
+        return json.load(report_file)
+
+
+@st.cache_data(max_entries=REPORT_CACHE_MAX_ENTRIES, show_spinner="Aggregating site results")
+def site_overview(test_directory: str, index_mtime: float, columnar_mtime: float) -> dict[str, Any]:
+    """
+    The site-wide statistics of a run, see SiteAggregator.aggregate.
+    """
+    return SiteAggregator(test_directory).aggregate()
+
+
+def cached_site_overview(test_directory: str) -> dict[str, Any]:
+    """
+    The site-wide statistics of a run from the cache, refreshed when pages were added to it.
+    """
+    columnar_path = os.path.join(test_directory, COLUMNAR_RESULTS_NAME)
+    return site_overview(test_directory, file_mtime(RESULTS_INDEX_PATH), file_mtime(columnar_path))
+
+
+@st.cache_data(max_entries=REPORT_CACHE_MAX_ENTRIES, show_spinner="Comparing with the previous audit")
+def run_diff(previous_directory: str, current_directory: str, index_mtime: float,
+             previous_columnar_mtime: float, current_columnar_mtime: float) -> dict[str, Any]:
+    """
+    The differences between two runs, see RunDiff.compare.
+    """
+    return RunDiff(previous_directory, current_directory).compare()
+
+
+def cached_run_diff(previous_directory: str, current_directory: str) -> dict[str, Any]:
+    """
+    The differences between two runs from the cache.
+    """
+    return run_diff(
+        previous_directory, current_directory, file_mtime(RESULTS_INDEX_PATH),
+        file_mtime(os.path.join(previous_directory, COLUMNAR_RESULTS_NAME)),
+        file_mtime(os.path.join(current_directory, COLUMNAR_RESULTS_NAME)),
+    )
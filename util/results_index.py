@@ -0,0 +1,234 @@
+# util/results_index.py
+
+import gzip
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any
+from urllib.parse import urlparse
+
+from config.constants import FULL_ACCESSIBILITY_RESULTS_DIRECTORY, RESULTS_INDEX_PATH
+from util.accessibility_report_viewer import AccessibilityReportViewer
+
+# Impact levels counted per page
+_IMPACTS = ("critical", "serious", "moderate", "minor")
+# Suffixes of the per-page result files written by the ResultsProcessor (pretty-printed or archived JSON)
+_RESULT_SUFFIXES = ("_accessibility_test.json", "_accessibility_test.json.gz")
+# Name format of the run directories created by HelperFunctions.create_test_directory
+_RUN_TIMESTAMP_FORMAT = "%Y-%m-%d_%H-%M-%S"
+
+
+class ResultsIndex:
+    """
+    A SQLite index of all test runs and their pages, so the UI never has to scan the results directory
+    or open result files just to list them.
+
+    Runs are the timestamped test directories, pages are the result files inside them together with
+    their score and violation counts. The ResultsProcessor records every page when it is saved; runs
+    written before the index existed are added from disk the first time they are looked up.
+
+    Attributes:
+        path (str): The SQLite database file.
+    """
+
+    def __init__(self, path: str = RESULTS_INDEX_PATH):
+        """
+        Initializes the index. The database is created on first use.
+
+        Args:
+            path (str, optional): The SQLite database file. Defaults to RESULTS_INDEX_PATH.
+        """
+        self.path = path
+        self._connection: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def _db(self) -> sqlite3.Connection:
+        """
+        Returns the index connection, creating the schema on first use.
+        """
+        if self._connection is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._connection.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS runs (
+                    directory TEXT PRIMARY KEY,
+                    domain TEXT NOT NULL,
+                    started_at TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS runs_started_at ON runs (started_at);
+                CREATE TABLE IF NOT EXISTS pages (
+                    directory TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    display_name TEXT NOT NULL,
+                    json_path TEXT NOT NULL,
+                    csv_path TEXT,
+                    score REAL,
+                    violations INTEGER NOT NULL,
+                    critical INTEGER NOT NULL,
+                    serious INTEGER NOT NULL,
+                    moderate INTEGER NOT NULL,
+                    minor INTEGER NOT NULL,
+                    PRIMARY KEY (directory, url)
+                );
+                """
+            )
+            self._connection.commit()
+        return self._connection
+
+    @staticmethod
+    def display_name(url: str) -> str:
+        """
+        Returns the name a page is listed under: its domain and path.
+        """
+        parsed_url = urlparse(url)
+        path = parsed_url.path.rstrip('/').lstrip('/')
+        return f"{parsed_url.netloc}/{path}" if path else parsed_url.netloc
+
+    @staticmethod
+    def _run_key(test_directory: str) -> tuple[str, str, str]:
+        """
+        Returns (directory, domain, timestamp) of a test directory `<base>/<domain>/<timestamp>`.
+        """
+        directory = os.path.normpath(test_directory)
+        domain_directory, timestamp = os.path.split(directory)
+        return directory, os.path.basename(domain_directory), timestamp
+
+    def record_page(self, test_directory: str, url: str, results: dict[str, Any],
+                    json_path: str, csv_path: str | None = None) -> None:
+        """
+        Records a page result and the run it belongs to.
+
+        Args:
+            test_directory (str): The run directory the result was saved to.
+            url (str): The tested URL.
+            results (Dict[str, Any]): The axe results of the page.
+            json_path (str): The JSON result file.
+            csv_path (str, optional): The CSV result file.
+        """
+        directory, domain, timestamp = self._run_key(test_directory)
+        violations = results.get('violations', [])
+        counts = [sum(1 for violation in violations if violation.get('impact') == impact) for impact in _IMPACTS]
+        try:
+            score = AccessibilityReportViewer.score_results(results)
+        except (KeyError, TypeError):
+            score = None
+        try:
+            with self._lock:
+                db = self._db()
+                db.execute("INSERT OR IGNORE INTO runs VALUES (?, ?, ?)", (directory, domain, timestamp))
+                db.execute(
+                    "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (directory, url, self.display_name(url), os.path.normpath(json_path), csv_path,
+                     score, len(violations), *counts),
+                )
+                db.commit()
+        except sqlite3.Error as e:
+            logging.error(f"Error while indexing results of {url}: {e}")
+
+    def latest_run(self, base_results_directory: str = FULL_ACCESSIBILITY_RESULTS_DIRECTORY) -> str | None:
+        """
+        Returns the most recent run directory below `base_results_directory` that still exists.
+        """
+        base = os.path.normpath(base_results_directory) + os.sep
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT directory FROM runs WHERE substr(directory, 1, ?) = ? ORDER BY started_at DESC",
+                (len(base), base),
+            ).fetchall()
+        for (directory,) in rows:
+            if os.path.isdir(directory):
+                return directory
+        return None
+
+    def previous_run(self, test_directory: str) -> str | None:
+        """
+        Returns the most recent run of the same domain before `test_directory` that still exists.
+        """
+        directory, domain, timestamp = self._run_key(test_directory)
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT directory FROM runs WHERE domain = ? AND started_at < ? ORDER BY started_at DESC",
+                (domain, timestamp),
+            ).fetchall()
+        for (previous_directory,) in rows:
+            if os.path.isdir(previous_directory):
+                return previous_directory
+        return None
+
+    def pages(self, test_directory: str) -> list[dict[str, Any]]:
+        """
+        Returns the indexed pages of a run, sorted by display name. A run that is not indexed yet
+        is indexed from its result files first.
+        """
+        directory = self._run_key(test_directory)[0]
+        query = (
+            "SELECT url, display_name, json_path, csv_path, score, violations, critical, serious, moderate, minor "
+            "FROM pages WHERE directory = ? ORDER BY display_name"
+        )
+        with self._lock:
+            cursor = self._db().execute(query, (directory,))
+            rows = cursor.fetchall()
+            columns = [column[0] for column in cursor.description]
+        if not rows and self.index_directory(directory):
+            with self._lock:
+                rows = self._db().execute(query, (directory,)).fetchall()
+        return [dict(zip(columns, row)) for row in rows]
+
+    def index_directory(self, test_directory: str) -> int:
+        """
+        Indexes the result files of a run written before the index existed.
+
+        Returns:
+            int: The number of pages indexed.
+        """
+        try:
+            file_names = [name for name in os.listdir(test_directory) if name.endswith(_RESULT_SUFFIXES)]
+        except OSError:
+            return 0
+        for file_name in file_names:
+            json_path = os.path.join(test_directory, file_name)
+            try:
+                opener = gzip.open if json_path.endswith('.gz') else open
+                with opener(json_path, 'rt') as json_file:
+                    results = json.load(json_file)
+            except (OSError, ValueError) as e:
+                logging.warning(f"Skipping unreadable result file {json_path}: {e}")
+                continue
+            csv_path = json_path[:json_path.rindex(".json")] + ".csv"
+            self.record_page(test_directory, results.get('url', ''), results, json_path,
+                             csv_path if os.path.exists(csv_path) else None)
+        return len(file_names)
+
+    def index_runs(self, base_results_directory: str = FULL_ACCESSIBILITY_RESULTS_DIRECTORY) -> None:
+        """
+        Adds the run directories below `base_results_directory` that are missing from the index.
+        Their pages are indexed lazily by `pages`.
+        """
+        runs = []
+        try:
+            for domain in os.listdir(base_results_directory):
+                domain_path = os.path.join(base_results_directory, domain)
+                if not os.path.isdir(domain_path):
+                    continue
+                for timestamp in os.listdir(domain_path):
+                    if not os.path.isdir(os.path.join(domain_path, timestamp)):
+                        continue
+                    try:
+                        datetime.strptime(timestamp, _RUN_TIMESTAMP_FORMAT)
+                    except ValueError:
+                        continue
+                    runs.append(self._run_key(os.path.join(domain_path, timestamp)))
+        except OSError as e:
+            logging.error(f"Error while indexing runs in {base_results_directory}: {e}")
+        with self._lock:
+            db = self._db()
+            db.executemany("INSERT OR IGNORE INTO runs VALUES (?, ?, ?)", runs)
+            db.commit()
+
+
+# Shared by the ResultsProcessor and the UI
+results_index = ResultsIndex()
@@ -1,11 +1,17 @@
 # util/results_processor.py
 
 import csv
+import gzip
 import json
 import logging
 import os
 from urllib.parse import urlparse
 
+from config.constants import COLUMNAR_RESULTS_NAME, COLUMNAR_ROW_GROUP_SIZE, RESULTS_STORAGE
+from util.metrics import SpanLog, timed
+from util.results_index import results_index
+from util.violation_flattener import VIOLATION_COLUMNS, flatten_violations
+
 
 class ResultsProcessor:
     """
@@ -15,9 +21,12 @@ class ResultsProcessor:
         url (str): The URL that was tested.
         results (Dict): The results from the Axe accessibility tests.
         test_directory (str): The directory to save the test results.
+        storage (str): "json" for pretty-printed JSON, "columnar" for a Parquet store plus gzipped JSON.
+        span_log (SpanLog | None): Where the time spent writing every format is recorded, if anywhere.
     """
 
-    def __init__(self, url: str, results: dict, test_directory: str):
+    def __init__(self, url: str, results: dict, test_directory: str, storage: str = RESULTS_STORAGE,
+                 span_log: SpanLog | None = None):
         """
         Initializes the ResultsProcessor with URL, results, and test directory.
 
@@ -25,10 +34,14 @@ class ResultsProcessor:
             url (str): The URL that was tested.
             results (Dict): The results from the Axe accessibility tests.
             test_directory (str): The directory to save the test results.
+            storage (str, optional): The storage format. Defaults to RESULTS_STORAGE.
+            span_log (SpanLog, optional): Records the save spans of the page. Defaults to None.
         """
         self.url = url
         self.results = results
         self.test_directory = test_directory
+        self.storage = storage
+        self.span_log = span_log
 
     def _get_page_identifier(self) -> str:
         """
@@ -39,24 +52,139 @@ class ResultsProcessor:
         page_name = parsed_url.path.strip('/').replace('/', '_') or domain_name
         return page_name
 
+    def get_json_path(self) -> str:
+        """
+        Returns the path the JSON results of the page are saved to.
+        """
+        extension = 'json.gz' if self.storage == 'columnar' else 'json'
+        return os.path.join(self.test_directory, f'{self._get_page_identifier()}_accessibility_test.{extension}')
+
+    def get_csv_path(self) -> str:
+        """
+        Returns the path the CSV results of the page are saved to.
+        """
+        return os.path.join(self.test_directory, f'{self._get_page_identifier()}_accessibility_test.csv')
+
+    def get_columnar_path(self) -> str:
+        """
+        Returns the Parquet dataset of the run; every page adds one file to it.
+        """
+        return os.path.join(self.test_directory, COLUMNAR_RESULTS_NAME)
+
+    @staticmethod
+    def load_results(json_path: str) -> dict:
+        """
+        Loads saved results from a pretty-printed `.json` or an archived `.json.gz` file.
+        """
+        opener = gzip.open if json_path.endswith('.gz') else open
+        with opener(json_path, 'rt') as json_file:
+            return json.load(json_file)
+
+    def save_results(self) -> None:
+        """
+        Saves the results in all formats of the configured storage.
+        The `save_json` span includes the `index` span of the results index update.
+        """
+        with timed("save_json", self.span_log, url=self.url):
+            self.save_results_to_json()
+        with timed("save_csv", self.span_log, url=self.url):
+            self.save_results_to_csv()
+        if self.storage == 'columnar':
+            with timed("save_columnar", self.span_log, url=self.url):
+                self.save_results_to_columnar()
+
     def save_results_to_json(self) -> None:
         """
         Saves the results in JSON format to the test directory.
+        With columnar storage the raw payload is archived as compact gzipped JSON instead.
         """
-        page_identifier = self._get_page_identifier()
-        json_filename = os.path.join(self.test_directory, f'{page_identifier}_accessibility_test.json')
+        json_filename = self.get_json_path()
         try:
-            with open(json_filename, 'w') as json_file:
-                json.dump(self.results, json_file, indent=4)
+            if self.storage == 'columnar':
+                with gzip.open(json_filename, 'wt', compresslevel=6) as json_file:
+                    json.dump(self.results, json_file, separators=(',', ':'))
+            else:
+                with open(json_filename, 'w') as json_file:
+                    json.dump(self.results, json_file, indent=4)
         except OSError as e:
             logging.error(f"Error while saving JSON results for {self.url}: {e}")
+            return
+        with timed("index", self.span_log, url=self.url):
+            self.index_results()
+
+    def index_results(self) -> None:
+        """
+        Records the page, its score and violation counts in the results index used by the UI.
+        """
+        results_index.record_page(self.test_directory, self.url, self.results, self.get_json_path(), self.get_csv_path())
+
+    def save_results_to_columnar(self) -> None:
+        """
+        Adds the violating and incomplete nodes of the page to the Parquet dataset of the run.
+
+        Only the columns of the violations table are stored, one row per node, so the report viewer
+        can read a page without parsing its JSON. `passes` and `inapplicable` stay in the JSON archive.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        columns: dict[str, list] = {column: [] for column in VIOLATION_COLUMNS}
+        columns['Result'] = []
+        for result_type in ('violations', 'incomplete'):
+            rows = flatten_violations(self.results.get(result_type, []), self.url)
+            for column, values in rows.items():
+                columns[column].extend(values)
+            columns['Result'].extend([result_type] * len(rows['ID']))
+
+        columns['Tags'] = [tags if isinstance(tags, list) else [] for tags in columns['Tags']]
+        # an explicit schema keeps the files of pages without findings compatible with the others
+        schema = pa.schema([
+            (column, pa.list_(pa.string()) if column == 'Tags' else pa.string()) for column in columns
+        ])
+
+        part_path = os.path.join(self.get_columnar_path(), f'{self._get_page_identifier()}.parquet')
+        try:
+            os.makedirs(self.get_columnar_path(), exist_ok=True)
+            pq.write_table(pa.table(columns, schema=schema), part_path, compression='zstd')
+        except (OSError, pa.ArrowException) as e:
+            logging.error(f"Error while saving columnar results for {self.url}: {e}")
+
+    @staticmethod
+    def compact_columnar_results(test_directory: str) -> None:
+        """
+        Merges the per-page files of the run's Parquet dataset into one file sorted by URL.
+
+        Thousands of small files make every read of the dataset slow; a single file with
+        URL-sorted row groups is read in one go and lets a filter on one page skip most of it.
+        """
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        import pyarrow.parquet as pq
+
+        columnar_path = os.path.join(test_directory, COLUMNAR_RESULTS_NAME)
+        try:
+            part_paths = [os.path.join(columnar_path, name) for name in os.listdir(columnar_path)
+                          if name.endswith('.parquet')]
+        except FileNotFoundError:
+            return
+        if len(part_paths) < 2:
+            return
+        # files starting with "_" are ignored by dataset readers until the merge is complete
+        merged_path = os.path.join(columnar_path, '_run.parquet.tmp')
+        try:
+            table = ds.dataset(part_paths, format='parquet').to_table().sort_by('Url')
+            pq.write_table(table, merged_path, compression='zstd', row_group_size=COLUMNAR_ROW_GROUP_SIZE)
+            for part_path in part_paths:
+                os.remove(part_path)
+            os.replace(merged_path, os.path.join(columnar_path, 'run.parquet'))
+        except (OSError, pa.ArrowException) as e:
+            logging.error(f"Error while compacting columnar results in {columnar_path}: {e}")
 
     def save_results_to_csv(self) -> None:
         """
         Saves the results in CSV format to the test directory.
         """
-        page_identifier = self._get_page_identifier()
-        csv_filename = os.path.join(self.test_directory, f'{page_identifier}_accessibility_test.csv')
+        csv_filename = self.get_csv_path()
         try:
             with open(csv_filename, 'w', newline='') as csv_file:
                 writer = csv.writer(csv_file)
@@ -64,54 +192,9 @@ class ResultsProcessor:
                 writer.writerow(['VIOLATIONS', ' ',' ',' ',' ',' ',' ',' ', ' ', ' ', ' '])
                 writer.writerow([self.url, ' ',' ',' ',' ',' ',' ',' ', ' ', ' ', ' '])
                 writer.writerow(['ID', 'description', 'Impact', 'Help', 'HTML', 'Target', 'Help URL', 'Tags', 'Failure Summary', 'Data', 'Url'])
-                for violation in self.results['violations']:
-                # Joining tags list into a single string separated by commas
-                    tags = ", ".join(violation.get('tags', []))
-                    for node in violation['nodes']:
-                        # Extract data from the "any" list inside the node
-                        data_list: list[str] = []
-                        # Function to process the data
-                        #def process_data(item):
-                        def process_data(item, _d=data_list) -> None:
-                            data = item.get('data')
-                            if data is None:
-                                _d.append(item.get('id'))
-                            elif isinstance(data, list):
-                                _d.extend(data)
-                            elif isinstance(data, dict):
-                                _d.append(" | ".join(f"{k}: {v}" for k, v in data.items()))
-                            elif isinstance(data, str):
-                                _d.append(data)
-
-                        # Check the 'any', 'all', 'none' lists (if present)
-                        for key in ("any", "all", "none"):
-                            for item in node.get(key, []):
-                                process_data(item)
-
-                        # If data_list is still empty, append "No data available"
-                        if not data_list:
-                            data_list.append("No data available")
-            
-                        # Join the data elements into a single string
-                        flattened_data = " | ".join(data_list)
-
-                        # Ensure all items in 'target' are strings and flatten any nested lists
-                        targets = node.get('target', [])
-                        flattened_targets = " | ".join([str(target) for sublist in targets for target in (sublist if isinstance(sublist, list) else [sublist])])
-
-                        writer.writerow([
-                            violation['id'],
-                            violation['description'],
-                            violation['impact'],
-                            violation['help'],
-                            node['html'],
-                            flattened_targets,
-                            violation['helpUrl'],
-                            tags,
-                            node['failureSummary'],
-                            flattened_data,
-                            self.url
-                        ])
+                columns = flatten_violations(self.results['violations'], self.url, data_style="csv")
+                columns['Tags'] = [", ".join(tags) for tags in columns['Tags']]
+                writer.writerows(zip(*(columns[column] for column in VIOLATION_COLUMNS)))
                 # TODO  write another csv for the incomplete tests?
                 #writer.writerow(['INCOMPLETE', ' ',' ',' ',' ',' ',' ',' '])
                 #writer.writerow([self.url, ' ',' ',' ',' ',' ',' ',' '])
@@ -143,5 +226,4 @@ if __name__ == "__main__":
     results: dict[str, Any] = {}  # Placeholder for actual Axe results
     test_directory: str = "/path/to/directory"
     processor = ResultsProcessor(url, results, test_directory)
-    processor.save_results_to_json()
-    processor.save_results_to_csv()
\ No newline at end of file
+    processor.save_results()
\ No newline at end of file
@@ -0,0 +1,174 @@
+# util/robots_cache.py
+
+import logging
+import threading
+import time
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+import requests
+
+from config.constants import ROBOTS_CACHE_TTL
+from util.http_transport import ThrottledHTTPAdapter
+
+
+class RobotsCache:
+    """
+    A thread-safe cache of parsed robots.txt policies keyed by scheme and host.
+
+    Every robots.txt is fetched and parsed once and then reused until its TTL expires,
+    so crawling, sitemap discovery and `can_fetch` checks share a single request per host.
+
+    Attributes:
+        ttl (float): Seconds a cached policy stays valid.
+        hits (int): Number of lookups served from the cache.
+        misses (int): Number of lookups that had to fetch robots.txt.
+    """
+
+    def __init__(self, ttl: float = ROBOTS_CACHE_TTL):
+        """
+        Initializes an empty cache.
+
+        Args:
+            ttl (float, optional): Seconds a cached policy stays valid. Defaults to ROBOTS_CACHE_TTL.
+        """
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: dict[str, tuple[RobotFileParser, float]] = {}
+        self._host_locks: dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._next_request_at: dict[str, float] = {}
+
+    @staticmethod
+    def _cache_key(url: str) -> str:
+        """
+        Returns the scheme+host key under which the policy for `url` is stored.
+        """
+        parsed_url = urlparse(url)
+        return f"{parsed_url.scheme}://{parsed_url.netloc}"
+
+    def get_parser(self, url: str, session: requests.Session | None = None) -> RobotFileParser:
+        """
+        Returns the parsed robots.txt policy for the host of `url`, fetching it if needed.
+
+        A missing or unreachable robots.txt yields a policy that allows everything.
+
+        Args:
+            url (str): Any URL on the host.
+            session (requests.Session, optional): The session to fetch robots.txt with.
+
+        Returns:
+            RobotFileParser: The parsed policy.
+        """
+        key = self._cache_key(url)
+        with self._lock:
+            host_lock = self._host_locks.setdefault(key, threading.Lock())
+
+        # Only one thread per host fetches; the others wait and then hit the cache
+        with host_lock:
+            entry = self._entries.get(key)
+            if entry and time.monotonic() - entry[1] < self.ttl:
+                with self._lock:
+                    self.hits += 1
+                return entry[0]
+
+            with self._lock:
+                self.misses += 1
+            rp = self._fetch(f"{key}/robots.txt", session)
+            self._entries[key] = (rp, time.monotonic())
+            return rp
+
+    @staticmethod
+    def _fetch(robots_url: str, session: requests.Session | None) -> RobotFileParser:
+        """
+        Downloads and parses a robots.txt file.
+        """
+        rp = RobotFileParser(robots_url)
+        try:
+            if session:
+                response = session.get(robots_url, timeout=10)
+            else:
+                with requests.Session() as session:
+                    session.mount("http://", ThrottledHTTPAdapter())
+                    session.mount("https://", ThrottledHTTPAdapter())
+                    response = session.get(robots_url, timeout=10)
+
+            if response.status_code == 200:
+                rp.parse(response.text.splitlines())
+            else:
+                logging.info(f"No robots.txt found at {robots_url}. Assuming crawling is allowed.")
+                rp.parse([])
+        except requests.RequestException as e:
+            logging.error(f"Error fetching robots.txt: {e}")
+            rp.parse([])  # Assume crawling is allowed if there's an error fetching robots.txt
+        return rp
+
+    def can_fetch(self, url: str, user_agent: str = '*', session: requests.Session | None = None) -> bool:
+        """
+        Checks if a URL can be fetched based on the cached robots.txt of its host.
+
+        Args:
+            url (str): The URL to check.
+            user_agent (str): The user agent of the crawler (default is '*').
+            session (requests.Session, optional): The session to fetch robots.txt with.
+
+        Returns:
+            bool: True if fetching the URL is allowed, False otherwise.
+        """
+        return self.get_parser(url, session).can_fetch(user_agent, url)
+
+    def crawl_delay(self, url: str, user_agent: str = '*', session: requests.Session | None = None) -> float | None:
+        """
+        Returns the Crawl-delay in seconds the host of `url` asks for, or None if there is none.
+        """
+        delay = self.get_parser(url, session).crawl_delay(user_agent)
+        return float(delay) if delay is not None else None
+
+    def sitemaps(self, url: str, session: requests.Session | None = None) -> list[str]:
+        """
+        Returns the sitemap URLs listed in the robots.txt of the host of `url`.
+        """
+        return self.get_parser(url, session).site_maps() or []
+
+    def wait_for_crawl_delay(self, url: str, user_agent: str = '*', session: requests.Session | None = None) -> None:
+        """
+        Blocks until the Crawl-delay of the host of `url` has passed since the previous request.
+
+        Args:
+            url (str): The URL about to be requested.
+            user_agent (str): The user agent of the crawler (default is '*').
+            session (requests.Session, optional): The session to fetch robots.txt with.
+        """
+        delay = self.crawl_delay(url, user_agent, session)
+        if not delay:
+            return
+
+        key = self._cache_key(url)
+        with self._lock:
+            now = time.monotonic()
+            request_at = max(now, self._next_request_at.get(key, now))
+            self._next_request_at[key] = request_at + delay
+        if request_at > now:
+            time.sleep(request_at - now)
+
+    def stats(self) -> dict[str, int]:
+        """
+        Returns the hit and miss counts of the cache.
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "hosts": len(self._entries)}
+
+    def clear(self) -> None:
+        """
+        Drops all cached policies and resets the counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._next_request_at.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# Process-wide cache shared by the crawler, the sitemap parser and HelperFunctions.can_fetch
+robots_cache = RobotsCache()
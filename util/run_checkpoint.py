@@ -0,0 +1,138 @@
+# util/run_checkpoint.py
+
+import json
+import logging
+import os
+import threading
+from typing import Any
+
+# Files of a run directory that record the progress of the run
+CRAWL_CHECKPOINT_NAME = "crawl_checkpoint.json"
+TEST_PLAN_NAME = "test_plan.json"
+TEST_STATUS_NAME = "test_status.jsonl"
+
+
+class RunCheckpoint:
+    """
+    Records the progress of a run in its run directory, so a crashed or restarted run can be resumed.
+
+    - `crawl_checkpoint.json`: the crawl frontier, the scheduled and crawled URLs and the page signatures,
+      rewritten atomically by the WebsiteCrawler every CRAWL_CHECKPOINT_INTERVAL pages.
+    - `test_plan.json`: the extracted URLs (with their sitemap `lastmod` and page signatures) once the
+      extraction is complete, so a resumed run does not extract them again.
+    - `test_status.jsonl`: one line per audited URL, appended by the AccessibilityTester as pages finish.
+
+    Attributes:
+        directory (str): The run directory.
+    """
+
+    def __init__(self, directory: str):
+        """
+        Args:
+            directory (str): The run directory.
+        """
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    def _path(self, name: str) -> str:
+        """
+        Returns the path of a checkpoint file of the run.
+        """
+        return os.path.join(self.directory, name)
+
+    def _write_json(self, name: str, data: dict[str, Any]) -> None:
+        """
+        Writes a JSON file atomically: a crash leaves the previous version, never a truncated one.
+        """
+        temporary_path = self._path(f"{name}.tmp")
+        try:
+            with open(temporary_path, "w") as json_file:
+                json.dump(data, json_file, separators=(',', ':'))
+            os.replace(temporary_path, self._path(name))
+        except OSError as e:
+            logging.error(f"Error while writing {name} to {self.directory}: {e}")
+
+    def _read_json(self, name: str) -> dict[str, Any] | None:
+        """
+        Reads a JSON file of the run, None if it does not exist or cannot be read.
+        """
+        try:
+            with open(self._path(name)) as json_file:
+                return json.load(json_file)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logging.error(f"Error while reading {name} from {self.directory}: {e}")
+            return None
+
+    # ------------------------------------------------------------------ #
+    # Crawl                                                              #
+    # ------------------------------------------------------------------ #
+    def save_crawl(self, state: dict[str, Any]) -> None:
+        """
+        Saves the state of a crawl, see WebsiteCrawler.crawl.
+        """
+        self._write_json(CRAWL_CHECKPOINT_NAME, state)
+
+    def load_crawl(self) -> dict[str, Any] | None:
+        """
+        Returns the last saved crawl state, None if there is none.
+        """
+        return self._read_json(CRAWL_CHECKPOINT_NAME)
+
+    # ------------------------------------------------------------------ #
+    # Test plan                                                          #
+    # ------------------------------------------------------------------ #
+    def save_plan(self, urls: set[str], source: str, lastmod: dict[str, str],
+                  page_signatures: dict[str, str]) -> None:
+        """
+        Saves the extracted URLs of the run.
+        """
+        self._write_json(TEST_PLAN_NAME, {"urls": sorted(urls), "source": source, "lastmod": lastmod,
+                                          "page_signatures": page_signatures})
+
+    def load_plan(self) -> dict[str, Any] | None:
+        """
+        Returns the saved test plan, None if the URLs of the run were not extracted yet.
+        """
+        return self._read_json(TEST_PLAN_NAME)
+
+    # ------------------------------------------------------------------ #
+    # Test status                                                        #
+    # ------------------------------------------------------------------ #
+    def record_status(self, url: str, succeeded: bool) -> None:
+        """
+        Appends the outcome of an audited URL. Called from the audit worker threads.
+        """
+        line = json.dumps({"url": url, "status": "done" if succeeded else "failed"})
+        try:
+            with self._lock, open(self._path(TEST_STATUS_NAME), "a") as status_file:
+                status_file.write(line + "\n")
+        except OSError as e:
+            logging.error(f"Error while recording the test status of {url}: {e}")
+
+    def test_status(self) -> dict[str, str]:
+        """
+        Returns the last recorded status ("done" or "failed") of every audited URL.
+        A line cut short by a crash is ignored.
+        """
+        statuses: dict[str, str] = {}
+        try:
+            with open(self._path(TEST_STATUS_NAME)) as status_file:
+                for line in status_file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    statuses[entry["url"]] = entry["status"]
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logging.error(f"Error while reading the test status from {self.directory}: {e}")
+        return statuses
+
+    def completed_urls(self) -> set[str]:
+        """
+        Returns the URLs audited successfully; failed URLs are audited again on resume.
+        """
+        return {url for url, status in self.test_status().items() if status == "done"}
@@ -0,0 +1,132 @@
+# util/site_aggregator.py
+
+import logging
+import os
+
+import pandas as pd
+
+from config.constants import COLUMNAR_RESULTS_NAME, SITE_TOP_N
+from util.results_index import results_index
+from util.results_processor import ResultsProcessor
+from util.violation_flattener import flatten_targets
+
+# Columns of the node table of a run, named as in the columnar store
+_NODE_COLUMNS = ['Url', 'ID', 'Impact', 'Target']
+_IMPACT_ORDER = ['critical', 'serious', 'moderate', 'minor']
+
+
+class SiteAggregator:
+    """
+    Aggregates all page results of a test run into site-wide statistics.
+
+    All violating nodes of the run are loaded into one DataFrame (from the Parquet dataset of the run
+    if it has one, otherwise from the page JSON files) and every statistic is a vectorized
+    groupby over it. Page scores and counts come from the results index.
+
+    Attributes:
+        test_directory (str): The run directory.
+        top_n (int): The number of rules and selectors listed as top offenders.
+    """
+
+    def __init__(self, test_directory: str, top_n: int = SITE_TOP_N):
+        """
+        Args:
+            test_directory (str): The run directory.
+            top_n (int, optional): The number of top offenders listed. Defaults to SITE_TOP_N.
+        """
+        self.test_directory = test_directory
+        self.top_n = top_n
+
+    def pages(self) -> pd.DataFrame:
+        """
+        Returns one row per page with its score and violation counts per impact.
+        """
+        pages = pd.DataFrame(results_index.pages(self.test_directory))
+        if pages.empty:
+            return pages
+        return pages.drop(columns=['json_path', 'csv_path']).sort_values('score', na_position='last')
+
+    def nodes(self) -> pd.DataFrame:
+        """
+        Returns one row per violating node of the run with the columns Url, ID, Impact and Target.
+        """
+        columnar_path = os.path.join(self.test_directory, COLUMNAR_RESULTS_NAME)
+        if os.path.isdir(columnar_path):
+            import pyarrow.dataset as ds
+
+            table = ds.dataset(columnar_path, format='parquet').to_table(
+                columns=_NODE_COLUMNS, filter=ds.field('Result') == 'violations'
+            )
+            nodes = table.to_pandas()
+        else:
+            nodes = self._nodes_from_json(results_index.pages(self.test_directory))
+        # few distinct values repeated over many rows
+        return nodes.astype({'Url': 'category', 'ID': 'category', 'Impact': 'category'})
+
+    @staticmethod
+    def _nodes_from_json(pages: list[dict]) -> pd.DataFrame:
+        """
+        Builds the node table from the JSON result files, column by column.
+        """
+        columns: dict[str, list] = {column: [] for column in _NODE_COLUMNS}
+        for page in pages:
+            try:
+                results = ResultsProcessor.load_results(page['json_path'])
+            except (OSError, ValueError) as e:
+                logging.warning(f"Skipping unreadable result file {page['json_path']}: {e}")
+                continue
+            for violation in results.get('violations', []):
+                nodes = violation.get('nodes', [])
+                count = len(nodes)
+                columns['Url'].extend([page['url']] * count)
+                columns['ID'].extend([violation.get('id', '')] * count)
+                columns['Impact'].extend([violation.get('impact') or ''] * count)
+                columns['Target'].extend([flatten_targets(node.get('target', [])) for node in nodes])
+        return pd.DataFrame(columns)
+
+    def aggregate(self) -> dict[str, pd.DataFrame | dict]:
+        """
+        Computes the site-wide statistics of the run.
+
+        Returns:
+            Dict: `summary` (dict of headline figures), `impacts`, `rules`, `selectors` and `pages` DataFrames.
+        """
+        pages = self.pages()
+        nodes = self.nodes()
+        page_count = len(pages)
+
+        summary = {
+            "pages": page_count,
+            "average_score": float(pages['score'].mean()) if page_count else None,
+            "median_score": float(pages['score'].median()) if page_count else None,
+            "pages_with_critical": int((pages['critical'] > 0).sum()) if page_count else 0,
+            "violating_nodes": len(nodes),
+        }
+
+        impacts = (
+            nodes.groupby('Impact', observed=True)
+            .agg(nodes=('Url', 'size'), pages=('Url', 'nunique'), rules=('ID', 'nunique'))
+            .reindex(_IMPACT_ORDER, fill_value=0)
+        )
+
+        rules = (
+            nodes.groupby('ID', observed=True)
+            .agg(impact=('Impact', 'first'), pages=('Url', 'nunique'), nodes=('Url', 'size'))
+            .sort_values(['pages', 'nodes'], ascending=False)
+        )
+        rules['share_of_pages'] = (rules['pages'] / max(page_count, 1)).round(3)
+
+        selectors = (
+            nodes.groupby(['Target', 'ID'], observed=True)
+            .agg(pages=('Url', 'nunique'), nodes=('Url', 'size'))
+            .sort_values(['pages', 'nodes'], ascending=False)
+            .head(self.top_n)
+        )
+
+        return {
+            "summary": summary,
+            "impacts": impacts,
+            "rules": rules.head(self.top_n),
+            "selectors": selectors,
+            "pages": pages,
+        }
@@ -1,23 +1,39 @@
 # util/sitemap_parser.py
 
+import gzip
 import logging
+import queue
+import threading
 import xml.etree.ElementTree as ET
+import zlib
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urljoin, urlparse
 
 import requests
 
-from config.constants import USER_AGENT
+from config.constants import SITEMAP_MAX_WORKERS, SITEMAP_QUEUE_SIZE
+
+from .helper_functions import HelperFunctions
+from .metrics import SpanLog, metrics, timed
+from .robots_cache import robots_cache
 
 
 class SitemapParser:
     """
     A class to parse sitemaps and sitemap indexes from websites.
 
-    This class handles different formats of sitemaps including those with query parameters.
-    It can parse both individual sitemaps and sitemap indexes.
+    This class handles different formats of sitemaps including those with query parameters
+    and gzip-compressed `.xml.gz` files. Sitemaps are parsed incrementally with `iterparse`,
+    child sitemaps of an index are fetched concurrently, and URLs can be consumed from a
+    generator while the expansion is still running.
     """
     # Class variables
     NAMESPACE = {'sitemap': 'http://www.sitemaps.org/schemas/sitemap/0.9'}
+    SITEMAP_INDEX_TAG = '{http://www.sitemaps.org/schemas/sitemap/0.9}sitemapindex'
+    URLSET_TAG = '{http://www.sitemaps.org/schemas/sitemap/0.9}urlset'
+    ENTRY_TAGS = ('{http://www.sitemaps.org/schemas/sitemap/0.9}url',
+                  '{http://www.sitemaps.org/schemas/sitemap/0.9}sitemap')
     IGNORED_SEGMENTS = [
         'elementor-hf', 'wp-content', 'wp-includes', 'wp-admin', 'feed', 'elementor',
         'components', 'templates', 'plugins', 'node', 'user', 'catalog', 'author',
@@ -25,97 +41,201 @@ class SitemapParser:
     ]
 
     #def __init__(self, base_url: str):
-    def __init__(self, base_url: str, session: requests.Session | None = None):
+    def __init__(self, base_url: str, session: requests.Session | None = None,
+                 max_workers: int = SITEMAP_MAX_WORKERS, span_log: SpanLog | None = None):
         self.base_url = base_url
         self.sitemap_urls: set[str] = set()
-        ########
-        self.session = session or requests.Session()
-        self.session.headers.update({"User-Agent": USER_AGENT})
-    ######
+        # <lastmod> of every page URL that declares one
+        self.lastmod: dict[str, str] = {}
+        self.max_workers = max(1, max_workers)
+        self.session = session or HelperFunctions.create_session(pool_size=self.max_workers)
+        # records how long every sitemap took to fetch and parse
+        self.span_log = span_log
+
+    # ------------------------------------------------------------------ #
+    # Fetching                                                           #
+    # ------------------------------------------------------------------ #
+    def _request(self, sitemap_url: str, stream: bool = False) -> requests.Response:
+        """
+        Sends the GET request for a sitemap URL, passing query parameters separately.
+        """
+        parsed_url = urlparse(sitemap_url)
+        if parsed_url.query:
+            base_url = urljoin(sitemap_url, parsed_url.path)
+            params = dict(param.split('=') for param in parsed_url.query.split('&'))
+            return self.session.get(base_url, params=params, timeout=10, stream=stream)
+        return self.session.get(sitemap_url, timeout=10, stream=stream)
 
     def fetch_sitemap(self, sitemap_url: str) -> bytes | None:
         """
-        Fetches the sitemap from a given URL.
+        Fetches the sitemap from a given URL. Gzip-compressed sitemaps are decompressed.
         """
         try:
-            parsed_url = urlparse(sitemap_url)
-            if parsed_url.query:
-                base_url = urljoin(sitemap_url, urlparse(sitemap_url).path)
-                params = dict(param.split('=') for param in urlparse(sitemap_url).query.split('&'))
-                #response = requests.get(base_url, params=params, timeout=10)
-                response = self.session.get(base_url, params=params, timeout=10)
-            else:
-                #response = requests.get(sitemap_url, timeout=10)
-                response = self.session.get(sitemap_url, timeout=10)
-
+            response = self._request(sitemap_url)
             if response.status_code == 200:
-                return response.content
+                content = response.content
+                return gzip.decompress(content) if content[:2] == b'\x1f\x8b' else content
             else:
                 logging.error(f"Fetch sitemap failed with status code: {response.status_code}")
         except requests.exceptions.RequestException as e:
             logging.error(f"An error occurred while fetching the sitemap: {e}")
-        except ValueError as e:
+        except (ValueError, OSError) as e:
             logging.error(f"An error occurred while parsing the sitemap URL: {e}")
         return None
 
     def fetch_sitemap_from_robots(self) -> str | None:
         """
         Fetches sitemap URL from the robots.txt file of the base_url domain.
+        The robots.txt is read from the shared `robots_cache`.
+        """
+        sitemap_urls = robots_cache.sitemaps(self.base_url, self.session)
+        return sitemap_urls[0] if sitemap_urls else None
+
+    # ------------------------------------------------------------------ #
+    # Incremental parsing                                                #
+    # ------------------------------------------------------------------ #
+    @staticmethod
+    def _decompressed(chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        Decompresses a stream of byte chunks on the fly if it starts with the gzip magic number.
+        """
+        decompressor = None
+        for chunk in chunks:
+            if decompressor is None:
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) if chunk[:2] == b'\x1f\x8b' else False
+            yield decompressor.decompress(chunk) if decompressor else chunk
+        if decompressor:
+            yield decompressor.flush()
+
+    def _iter_locs(self, chunks: Iterable[bytes]) -> Iterator[tuple[str, str, str | None]]:
+        """
+        Parses a sitemap or sitemap index incrementally from a stream of (optionally gzipped) byte chunks.
+
+        Yields:
+            Tuple[str, str, Optional[str]]: ("url", loc, lastmod) for pages of a urlset and
+            ("sitemap", loc, lastmod) for children of an index.
+        """
+        parser = ET.XMLPullParser(events=('start', 'end'))
+        root = kind = None
+        for chunk in self._decompressed(chunks):
+            parser.feed(chunk)
+            for event, element in parser.read_events():
+                if root is None:
+                    root = element
+                    if element.tag == self.SITEMAP_INDEX_TAG:
+                        kind = 'sitemap'
+                    elif element.tag == self.URLSET_TAG:
+                        kind = 'url'
+                    else:
+                        logging.error("Not a valid sitemap file.")
+                        return
+                elif event == 'end' and element.tag in self.ENTRY_TAGS:
+                    loc = element.findtext('sitemap:loc', namespaces=self.NAMESPACE)
+                    if loc:
+                        lastmod = element.findtext('sitemap:lastmod', namespaces=self.NAMESPACE)
+                        yield kind, loc.strip(), lastmod.strip() if lastmod else None
+                    root.clear()  # drop parsed entries so memory stays flat for huge sitemaps
+        parser.close()
+
+    def _iter_locs_from_url(self, sitemap_url: str) -> Iterator[tuple[str, str, str | None]]:
+        """
+        Streams a sitemap from the network into the incremental parser.
         """
-        robots_url = urljoin(self.base_url, 'robots.txt')
         try:
-            #response = requests.get(robots_url, timeout=10)
-            response = self.session.get(robots_url, timeout=10)
-            if response.status_code == 200:
-                for line in response.text.split('\n'):
-                    if line.startswith('Sitemap: '):
-                        sitemap_url = line.split('Sitemap: ')[1].strip()
-                        return sitemap_url
+            with self._request(sitemap_url, stream=True) as response:
+                if response.status_code != 200:
+                    logging.error(f"Fetch sitemap failed with status code: {response.status_code}")
+                    return
+                # iter_content already undoes Content-Encoding: gzip; .xml.gz files are handled by _decompressed
+                yield from self._iter_locs(response.iter_content(chunk_size=64 * 1024))
         except requests.exceptions.RequestException as e:
-            logging.error(f"An error occurred while fetching robots.txt: {e}")
-        return None
+            logging.error(f"An error occurred while fetching the sitemap: {e}")
+        except (ET.ParseError, zlib.error, ValueError) as e:
+            logging.error(f"An error occurred while parsing the sitemap {sitemap_url}: {e}")
 
-    def parse_sitemap_index(self, content: bytes) -> None:
+    def _is_ignored(self, url: str) -> bool:
+        return any(segment in url.lower().split('/') for segment in self.IGNORED_SEGMENTS)
+
+    def iter_sitemap_urls(self, sitemap_url: str) -> Iterator[str]:
         """
-        Parses the sitemap index content to find individual sitemap files.
+        Expands a sitemap or sitemap index and yields page URLs as soon as they are parsed.
+
+        Child sitemaps are fetched and parsed by up to `max_workers` threads. Their URLs are
+        handed over through a bounded queue, so a slow consumer throttles the expansion.
+        Every yielded URL is also added to `sitemap_urls`.
+
+        Args:
+            sitemap_url (str): The URL of the sitemap or sitemap index.
+
+        Yields:
+            str: Page URLs not matching IGNORED_SEGMENTS, without duplicates.
         """
+        results: queue.Queue = queue.Queue(maxsize=SITEMAP_QUEUE_SIZE)
+        cancelled = threading.Event()
+
+        def put(item: tuple[str, str, str | None]) -> bool:
+            while not cancelled.is_set():
+                try:
+                    results.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def read(url: str) -> None:
+            try:
+                with timed("sitemap", self.span_log, url=url) as span:
+                    span["entries"] = 0
+                    for item in self._iter_locs_from_url(url):
+                        if not put(item):
+                            return
+                        span["entries"] += 1
+            finally:
+                put(('done', url, None))
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="sitemap")
         try:
-            root = ET.fromstring(content)
-            if root.tag != '{http://www.sitemaps.org/schemas/sitemap/0.9}sitemapindex':
-                logging.error("Not a valid sitemap index file.")
-                return  # This is not a sitemap index file
-            sitemap_tags = root.findall('sitemap:sitemap', self.NAMESPACE)
-            for sitemap in sitemap_tags:
-                loc = sitemap.find('sitemap:loc', self.NAMESPACE)
-                if loc is not None:
-                    sitemap_url = loc.text
-                    logging.info(f"Found sitemap in index: {sitemap_url}")
-                    sitemap_content = self.fetch_sitemap(sitemap_url)
-                    if sitemap_content:
-                        self.parse_sitemap(sitemap_content)
-                    else:
-                        logging.error(f"Could not fetch content from sitemap: {sitemap_url}")
-        except ET.ParseError as e:
-            logging.error(f"An error occurred while parsing the sitemap index content: {e}")
+            seen_sitemaps = {sitemap_url}
+            executor.submit(read, sitemap_url)
+            running = 1
+            while running:
+                kind, loc, lastmod = results.get()
+                if kind == 'done':
+                    running -= 1
+                elif kind == 'sitemap':
+                    if loc not in seen_sitemaps:
+                        logging.info(f"Found sitemap in index: {loc}")
+                        seen_sitemaps.add(loc)
+                        executor.submit(read, loc)
+                        running += 1
+                elif not self._is_ignored(loc) and loc not in self.sitemap_urls:
+                    self.sitemap_urls.add(loc)
+                    metrics.inc("a11y_sitemap_urls_total")
+                    if lastmod:
+                        self.lastmod[loc] = lastmod
+                    yield loc
+        finally:
+            cancelled.set()
+            executor.shutdown(wait=False, cancel_futures=True)
 
-    def parse_sitemap(self, content: bytes) -> None:
+    # ------------------------------------------------------------------ #
+    # Discovery                                                          #
+    # ------------------------------------------------------------------ #
+    def iter_urls(self) -> Iterator[str]:
         """
-        Parses the sitemap content and adds found URLs to the set.
+        Finds the sitemap of the website (robots.txt first, then sitemap_index.xml and sitemap.xml)
+        and yields its page URLs while it is still being expanded.
         """
-        try:
-            root = ET.fromstring(content)
-            if root.tag != '{http://www.sitemaps.org/schemas/sitemap/0.9}urlset':
-                logging.error("Not a valid sitemap file.")
-                return  # This is not a sitemap index file
-            url_tags = root.findall('sitemap:url', self.NAMESPACE)
-            for url_tag in url_tags:
-                loc = url_tag.find('sitemap:loc', self.NAMESPACE)
-                if loc is not None:
-                    url = loc.text
-                    if not any(segment in url.lower().split('/') for segment in self.IGNORED_SEGMENTS):
-                        self.sitemap_urls.add(loc.text)
-        except ET.ParseError as e:
-            logging.error(f"An error occurred while parsing the sitemap content: {e}")
+        sitemap_url_from_robots = self.fetch_sitemap_from_robots()
+        if sitemap_url_from_robots:
+            yield from self.iter_sitemap_urls(sitemap_url_from_robots)
+            if self.sitemap_urls:
+                return
+        # Fallback to checking for sitemap_index.xml and sitemap.xml
+        for sitemap_path in ['sitemap_index.xml', 'sitemap.xml']:
+            yield from self.iter_sitemap_urls(urljoin(self.base_url, sitemap_path))
+            if self.sitemap_urls:  # If any URLs were added
+                return
 
     def has_sitemap(self) -> bool:
         """
@@ -125,31 +245,12 @@ class SitemapParser:
         Returns:
             bool: True if a sitemap or sitemap index exists and is well-formed, False otherwise.
         """
-        # Attempt to fetch sitemap from robots.txt first
-        sitemap_url_from_robots = self.fetch_sitemap_from_robots()
-        if sitemap_url_from_robots:
-            content = self.fetch_sitemap(sitemap_url_from_robots)
-            if content:
-                if '<sitemapindex' in content.decode('utf-8'):
-                    self.parse_sitemap_index(content)
-                else:
-                    self.parse_sitemap(content)
-                return bool(self.sitemap_urls)
-        # Fallback to checking for sitemap_index.xml and sitemap.xml
-        for sitemap_path in ['sitemap_index.xml', 'sitemap.xml']:
-            sitemap_url = urljoin(self.base_url, sitemap_path)
-            content = self.fetch_sitemap(sitemap_url)
-            if content:
-                if '<sitemapindex' in content.decode('utf-8'):
-                    self.parse_sitemap_index(content)
-                else:
-                    self.parse_sitemap(content)
-                if self.sitemap_urls:  # If any URLs were added
-                    return True
-        return False # No sitemaps found or parse error encountered
+        for _ in self.iter_urls():
+            pass
+        return bool(self.sitemap_urls)  # No sitemaps found or parse error encountered
 
     def get_sitemap_urls(self) -> set[str]:
         """
         Returns the set of URLs found in the sitemap.
         """
-        return self.sitemap_urls
\ No newline at end of file
+        return self.sitemap_urls
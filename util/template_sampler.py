@@ -0,0 +1,226 @@
+# util/template_sampler.py
+
+import hashlib
+import json
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlparse
+
+import requests
+from bs4 import BeautifulSoup
+
+from config.constants import CRAWL_MAX_WORKERS, TEMPLATE_SAMPLES_PER_CLUSTER, TEMPLATE_SIGNATURE_DEPTH
+
+# Path segments that identify a record rather than a section: numbers, dates, UUIDs and hashes
+_NUMERIC_SEGMENT = re.compile(r'^\d+$')
+_ID_SEGMENT = re.compile(r'^(?=.*\d)[0-9a-f-]{8,}$', re.IGNORECASE)
+# Elements that say nothing about the layout of a page
+_IGNORED_TAGS = {"script", "style", "noscript", "template", "svg", "path", "br", "wbr"}
+
+
+class TemplateCluster:
+    """
+    A group of URLs that are assumed to be rendered by the same layout template.
+
+    Attributes:
+        pattern (str): The normalised path pattern of the URLs, e.g. `/products/*`.
+        signature (Optional[str]): The DOM-structure signature shared by the URLs, None if unknown.
+        urls (List[str]): All URLs of the cluster, sorted.
+        representatives (List[str]): The URLs that are actually audited.
+    """
+
+    def __init__(self, pattern: str, signature: str | None, urls: list[str], samples: int):
+        self.pattern = pattern
+        self.signature = signature
+        self.urls = sorted(urls, key=lambda url: (len(url), url))
+        self.representatives = self.urls[:max(1, samples)]
+
+    def to_dict(self) -> dict:
+        return {
+            "pattern": self.pattern,
+            "signature": self.signature,
+            "urls": self.urls,
+            "representatives": self.representatives,
+        }
+
+
+class TemplateSampler:
+    """
+    Clusters the URLs of a website by layout template so that only a few pages per template are audited.
+
+    URLs are grouped by their path pattern and a cheap signature of their DOM structure. Signatures
+    recorded by the WebsiteCrawler are reused; those of other URLs (e.g. from a sitemap) are computed
+    from a plain GET, which the HTTP cache usually answers locally.
+
+    Attributes:
+        samples_per_cluster (int): The number of representatives audited per cluster.
+        session (requests.Session): The session used to fetch pages without a known signature.
+        max_workers (int): The number of concurrent fetches.
+    """
+
+    def __init__(self, samples_per_cluster: int = TEMPLATE_SAMPLES_PER_CLUSTER,
+                 session: requests.Session | None = None, max_workers: int = CRAWL_MAX_WORKERS):
+        """
+        Args:
+            samples_per_cluster (int, optional): Representatives per cluster. Defaults to TEMPLATE_SAMPLES_PER_CLUSTER.
+            session (requests.Session, optional): The session to fetch pages with. A pooled session is created if None.
+            max_workers (int, optional): The number of concurrent fetches. Defaults to CRAWL_MAX_WORKERS.
+        """
+        from util.helper_functions import HelperFunctions  # avoid circular import
+
+        self.samples_per_cluster = max(1, samples_per_cluster)
+        self.max_workers = max(1, max_workers)
+        self.session = session or HelperFunctions.create_session(pool_size=self.max_workers)
+
+    @staticmethod
+    def path_pattern(url: str) -> str:
+        """
+        Returns the path pattern of `url`: IDs become `{id}`, the last segment becomes `*`
+        and only the names of query parameters are kept.
+        """
+        parsed = urlparse(url)
+        segments = [segment for segment in parsed.path.split('/') if segment]
+        normalised = []
+        for segment in segments[:-1]:
+            if _NUMERIC_SEGMENT.match(segment) or _ID_SEGMENT.match(segment):
+                segment = "{id}"
+            normalised.append(segment)
+        if segments:
+            normalised.append("*")
+        pattern = "/" + "/".join(normalised)
+        query_keys = sorted({key for key, _ in parse_qsl(parsed.query, keep_blank_values=True)})
+        if query_keys:
+            pattern += "?" + "&".join(query_keys)
+        return pattern
+
+    @staticmethod
+    def dom_signature(page: bytes | BeautifulSoup, depth: int = TEMPLATE_SIGNATURE_DEPTH) -> str:
+        """
+        Returns a short hash of the set of tag paths (e.g. `html>body>main>ul`) down to `depth`.
+
+        Repeated siblings collapse into one path, so pages of the same template with different
+        amounts of content share a signature.
+        """
+        soup = page if isinstance(page, BeautifulSoup) else BeautifulSoup(page, "html.parser")
+        paths: set[str] = set()
+        stack = [(child, "") for child in soup.find_all(recursive=False)]
+        while stack:
+            element, parent_path = stack.pop()
+            if element.name in _IGNORED_TAGS:
+                continue
+            path = f"{parent_path}>{element.name}" if parent_path else element.name
+            paths.add(path)
+            if path.count(">") + 1 < depth:
+                stack.extend((child, path) for child in element.find_all(recursive=False))
+        return hashlib.sha1("\n".join(sorted(paths)).encode()).hexdigest()[:12]
+
+    def _fetch_signature(self, url: str) -> str | None:
+        """
+        Fetches `url` and returns its DOM signature, None if the page could not be loaded.
+        """
+        try:
+            response = self.session.get(url, timeout=10)
+            if response.status_code != 200:
+                return None
+            return self.dom_signature(response.content)
+        except requests.RequestException as e:
+            logging.warning(f"Could not fetch {url} for template clustering: {e}")
+            return None
+
+    def cluster(self, urls: set[str], signatures: dict[str, str] | None = None) -> list[TemplateCluster]:
+        """
+        Groups `urls` by path pattern and DOM signature.
+
+        Args:
+            urls (Set[str]): The URLs to cluster.
+            signatures (Dict[str, str], optional): Known DOM signatures, e.g. `WebsiteCrawler.page_signatures`.
+
+        Returns:
+            List[TemplateCluster]: The clusters, largest first.
+        """
+        signatures = dict(signatures or {})
+        missing = [url for url in urls if url not in signatures]
+        if missing:
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="sampler") as executor:
+                for url, signature in zip(missing, executor.map(self._fetch_signature, missing)):
+                    signatures[url] = signature
+
+        groups: dict[tuple[str, str | None], list[str]] = {}
+        for url in urls:
+            groups.setdefault((self.path_pattern(url), signatures.get(url)), []).append(url)
+
+        clusters = [
+            TemplateCluster(pattern, signature, members, self.samples_per_cluster)
+            for (pattern, signature), members in groups.items()
+        ]
+        clusters.sort(key=lambda cluster: (-len(cluster.urls), cluster.pattern))
+        logging.info(f"Clustered {len(urls)} URLs into {len(clusters)} templates")
+        return clusters
+
+    @staticmethod
+    def representatives(clusters: list[TemplateCluster]) -> set[str]:
+        """
+        Returns the URLs to audit for `clusters`.
+        """
+        return {url for cluster in clusters for url in cluster.representatives}
+
+    @staticmethod
+    def project_results(clusters: list[TemplateCluster], results: dict[str, dict]) -> list[dict]:
+        """
+        Projects the axe violations found on the representatives onto all pages of their cluster.
+
+        Args:
+            clusters (List[TemplateCluster]): The clusters that were sampled.
+            results (Dict[str, Dict]): The axe results of the audited representatives keyed by URL.
+
+        Returns:
+            List[Dict]: One entry per cluster and violation with the number of pages it is projected onto.
+        """
+        projection = []
+        for cluster in clusters:
+            audited = [url for url in cluster.representatives if url in results]
+            violations: dict[str, dict] = {}
+            for url in audited:
+                for violation in results[url].get('violations', []):
+                    entry = violations.setdefault(violation['id'], {
+                        "pattern": cluster.pattern,
+                        "signature": cluster.signature,
+                        "id": violation['id'],
+                        "impact": violation.get('impact'),
+                        "help": violation.get('help'),
+                        "representatives_affected": 0,
+                        "representatives_audited": len(audited),
+                        "nodes": 0,
+                    })
+                    entry["representatives_affected"] += 1
+                    entry["nodes"] += len(violation.get('nodes', []))
+            for entry in violations.values():
+                # share of affected representatives, scaled to the size of the cluster
+                entry["projected_pages"] = round(
+                    len(cluster.urls) * entry["representatives_affected"] / entry["representatives_audited"]
+                )
+                projection.append(entry)
+        return projection
+
+    @classmethod
+    def save_report(cls, clusters: list[TemplateCluster], results: dict[str, dict], test_directory: str) -> str | None:
+        """
+        Writes the clusters and the projected violations to `template_clusters.json` in `test_directory`.
+
+        Returns:
+            Optional[str]: The path of the report, None if it could not be written.
+        """
+        report_path = os.path.join(test_directory, "template_clusters.json")
+        report = {
+            "clusters": [cluster.to_dict() for cluster in clusters],
+            "projected_violations": cls.project_results(clusters, results),
+        }
+        try:
+            with open(report_path, "w") as report_file:
+                json.dump(report, report_file, indent=4)
+        except OSError as e:
+            logging.error(f"Error while saving the template report to {report_path}: {e}")
+            return None
+        return report_path
@@ -3,13 +3,50 @@
 import logging
 import os
 
+import pandas as pd
 import plotly.graph_objects as go
 import streamlit as st
 from PIL import Image
 
-from util.accessibility_report_viewer import AccessibilityReportViewer
-from util.accessibility_tester import AccessibilityTester
+from config.constants import AUDIT_JOB_POLL_INTERVAL, COLUMNAR_RESULTS_NAME
+
+from util import report_cache
+from util.audit_jobs import ACTIVE_STATES, DONE, FAILED, INTERRUPTED, QUEUED, RUNNING, audit_jobs
 from util.helper_functions import HelperFunctions
+from util.results_index import results_index
+from util.template_sampler import TemplateSampler
+
+# st.fragment was st.experimental_fragment before Streamlit 1.37
+_fragment = getattr(st, "fragment", None) or st.experimental_fragment
+
+
+def format_duration(seconds: float) -> str:
+    """
+    Formats a duration as `1h 02m`, `3m 05s` or `42s`.
+    """
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+@_fragment(run_every=AUDIT_JOB_POLL_INTERVAL)
+def _job_progress_fragment(job_id: str) -> None:
+    """
+    Re-renders the progress of a running job every AUDIT_JOB_POLL_INTERVAL seconds without rerunning
+    the whole app, then reruns the app once the job has finished to show its results.
+    """
+    job = audit_jobs.store.get(job_id)
+    if job is None:
+        return
+    UIComponents.display_job(job)
+    if job['status'] not in ACTIVE_STATES:
+        if job['status'] == DONE and job['test_directory']:
+            st.session_state.results_directory = job['test_directory']
+            st.session_state.show_tests = True
+        st.rerun()
 
 
 class UIComponents:
@@ -181,24 +218,36 @@ class UIComponents:
                     horizontal=True,
                     index=None
                 )
+                lean_load = st.checkbox(
+                    "Lean load: skip images, media, web fonts and analytics (faster, but less reliable colour-contrast results)",
+                    value=st.session_state.lean_load
+                )
+                incremental = st.checkbox(
+                    "Incremental: reuse the previous results of pages that have not changed since the last test",
+                    value=st.session_state.incremental
+                )
+                template_sampling = st.checkbox(
+                    "Sample by template: test a few pages per page layout and project their issues onto the rest",
+                    value=st.session_state.template_sampling
+                )
 
                 choice_made_button = st.form_submit_button(label='Confirm Choice')
 
             if choice_made_button:
                 st.session_state.choice_made = True
                 st.session_state.test_choice = test_choice
+                st.session_state.lean_load = lean_load
+                st.session_state.incremental = incremental
+                st.session_state.template_sampling = template_sampling
                 st.session_state.axe_version = "latest"
 
             if st.session_state.choice_made:
-                if 'tester' not in st.session_state:
-                    st.session_state.tester = AccessibilityTester()
-
                 if st.session_state.test_choice == 'Test all URLs':
-                    self.perform_tests(st.session_state.tester, st.session_state.extracted_urls)
+                    self.perform_tests(st.session_state.extracted_urls)
                 elif st.session_state.test_choice == 'Test only homepage':
-                    self.perform_tests(st.session_state.tester, {st.session_state.previous_url})
+                    self.perform_tests({st.session_state.previous_url})
                 elif st.session_state.test_choice == 'Select specific URLs':
-                    self.perform_selected_tests(st.session_state.tester)
+                    self.perform_selected_tests()
                 
     def build_results_display(self, latest_results_directory: str) -> None:
         """
@@ -209,26 +258,93 @@ class UIComponents:
         """
         logging.info(f"Getting accessibility test results from CSV and JSON files in: {latest_results_directory}")
 
-        json_result_files = [f for f in os.listdir(latest_results_directory) if f.endswith('.json')]
-        display_names_to_file_paths = {
-            self.helper.extract_domain_and_page_from_json(os.path.join(latest_results_directory, file_name)): file_name
-            for file_name in json_result_files
-        }
+        # Pages are listed from the results index, so no result file is opened just to name it
+        pages_by_display_name = {page['display_name']: page for page in report_cache.cached_run_pages(latest_results_directory)}
 
-        sorted_display_names = sorted(display_names_to_file_paths.keys())
+        sorted_display_names = sorted(pages_by_display_name.keys())
         selected_display_name = st.selectbox('Select a test result to view', options=sorted_display_names)
 
-        selected_file_path = os.path.join(latest_results_directory, display_names_to_file_paths[selected_display_name]) if selected_display_name else None
+        selected_page = pages_by_display_name[selected_display_name] if selected_display_name else None
+        selected_file_path = selected_page['json_path'] if selected_page else None
 
         if selected_file_path:
-            report_viewer = AccessibilityReportViewer(selected_file_path)
+            # Scores and tables are memoized by file path and mtime, so switching between results is instant
             logging.info(f"Displaying score for {selected_display_name}")
-            score = report_viewer.calculate_accessibility_score()
+            score = selected_page['score']
+            if score is None:
+                score = report_cache.cached_accessibility_score(selected_file_path)
             logging.info(f"Displaying violations for {selected_display_name}")
-            violations_df = report_viewer.create_violations_dataframe()
+            violations_df = report_cache.cached_violations_dataframe(
+                selected_file_path,
+                columnar_path=os.path.join(latest_results_directory, COLUMNAR_RESULTS_NAME),
+                url=selected_page['url']
+            )
             st.dataframe(violations_df)
             st.session_state['score'] = score  # Store the score in the session
             st.session_state['selected_file_path'] = selected_file_path # Store the selected display name in the session
+            st.session_state['selected_url'] = selected_page['url']
+
+        template_report_path = os.path.join(latest_results_directory, "template_clusters.json")
+        if os.path.exists(template_report_path):
+            self.display_template_report(template_report_path)
+
+    @staticmethod
+    def build_site_overview(latest_results_directory: str) -> None:
+        """
+        Renders the site-wide statistics of the run: headline figures, violations per impact,
+        the most widespread rules and selectors, and the pages with the lowest scores.
+
+        Args:
+            latest_results_directory (str): The directory containing the latest test results.
+        """
+        if not latest_results_directory:
+            return
+        overview = report_cache.cached_site_overview(latest_results_directory)
+        summary = overview['summary']
+        if summary['pages'] < 2:
+            return
+
+        st.subheader("Site overview", divider="grey")
+        pages_col, score_col, critical_col, nodes_col = st.columns(4)
+        pages_col.metric("Pages tested", summary['pages'])
+        score_col.metric("Average score", f"{summary['average_score']:.1f}")
+        critical_col.metric("Pages with critical issues", summary['pages_with_critical'])
+        nodes_col.metric("Violating elements", summary['violating_nodes'])
+
+        st.bar_chart(overview['impacts']['nodes'])
+
+        rules_col, selectors_col = st.columns(2)
+        with rules_col:
+            st.write("Most widespread rules")
+            st.dataframe(overview['rules'])
+        with selectors_col:
+            st.write("Most widespread elements")
+            st.dataframe(overview['selectors'])
+
+        st.write("Pages with the lowest scores")
+        st.dataframe(overview['pages'].head(20), hide_index=True)
+
+    @staticmethod
+    def display_template_report(template_report_path: str) -> None:
+        """
+        Shows the violations of a sampled test projected onto all pages of each template.
+
+        Args:
+            template_report_path (str): The path of the `template_clusters.json` written by the TemplateSampler.
+        """
+        report = report_cache.template_report(template_report_path, report_cache.file_mtime(template_report_path))
+        st.subheader("Issues per page template", divider="grey")
+        st.caption(
+            f"{sum(len(cluster['urls']) for cluster in report['clusters'])} URLs in {len(report['clusters'])} templates. "
+            "Issues found on the tested representatives are projected onto all pages of their template."
+        )
+        projected = pd.DataFrame(report['projected_violations'])
+        if projected.empty:
+            st.write("No issues found on the tested templates.")
+            return
+        st.dataframe(projected.sort_values("projected_pages", ascending=False)[
+            ["pattern", "id", "impact", "projected_pages", "representatives_affected", "representatives_audited", "help"]
+        ])
 
     def build_gauge_and_download_display(self, latest_results_directory: str) -> None:
         """
@@ -242,44 +358,173 @@ class UIComponents:
 
         self.display_gauge_chart(score)
 
+        self.display_run_diff(latest_results_directory, st.session_state.get('selected_url'))
+
         self.display_download_options(latest_results_directory, selected_file_path)
 
-    def perform_tests(self, tester: AccessibilityTester, urls: set[str]) -> None:
+    @staticmethod
+    def display_run_diff(latest_results_directory: str, selected_url: str | None) -> None:
         """
-        Perform accessibility tests on the given URLs.
+        Shows what changed since the previous audit of the same website: new, fixed and persisting
+        violations of the selected page and of the whole run, and the score deltas per page.
+
+        Args:
+            latest_results_directory (str): The directory containing the latest test results.
+            selected_url (Optional[str]): The URL of the selected test result.
+        """
+        previous_directory = results_index.previous_run(latest_results_directory)
+        if not previous_directory:
+            return
+        diff = report_cache.cached_run_diff(previous_directory, latest_results_directory)
+        if not diff['summary']['compared_pages']:
+            return
+
+        st.write(f"Changes since the audit of {os.path.basename(previous_directory)}")
+        page = diff['pages'][diff['pages']['url'] == selected_url]
+        if not page.empty:
+            page = page.iloc[0]
+            score_col, new_col, fixed_col = st.columns(3)
+            score_col.metric("Score", f"{page['score_current']:.1f}", f"{page['score_delta']:+.1f}")
+            new_col.metric("New issues", int(page['new']))
+            fixed_col.metric("Fixed issues", int(page['fixed']))
+
+        summary = diff['summary']
+        with st.expander(
+            f"Whole run: {summary['new']} new, {summary['fixed']} fixed, {summary['persisting']} persisting issues "
+            f"on {summary['compared_pages']} pages"
+        ):
+            new_tab, fixed_tab, pages_tab = st.tabs(["New", "Fixed", "Score changes"])
+            new_tab.dataframe(diff['new'], hide_index=True)
+            fixed_tab.dataframe(diff['fixed'], hide_index=True)
+            pages_tab.dataframe(diff['pages'], hide_index=True)
+
+    def perform_tests(self, urls: set[str]) -> None:
+        """
+        Queues an audit of the given URLs as a background job and attaches the session to it.
+        The job keeps running across reruns; `build_job_progress` shows its progress.
 
         Args:
-            tester (AccessibilityTester): The tester instance to run the tests.
             urls (Set[str]): The set of URLs to test.
         """
-        logging.info(f"Starting accessibility Tests from: {st.session_state.previous_url}")
-        with st.spinner("Performing accessibility tests"):
-            if urls:
-                tester = AccessibilityTester()#
-                results,axe_version = tester.test_urls(urls)
-                if results:
-                    st.success(f"Accessibility tests completed using Axe-Core version: {axe_version}")
-                    logging.info(f"Finished accessibility Tests from: {st.session_state.previous_url} \n {len(urls)} URLs tested: {urls} using Axe-Core version: {axe_version} ")
-                else:
-                    st.error("An error occurred while checking the selected URLs.")
-                    logging.error("Error: No results returned for the URLs")
-            else:
-                st.error("No URLs selected for testing.")
-        st.session_state.show_tests = True
+        if st.session_state.test_choice != 'Select specific URLs':
+            # the choice is only acted on once, further reruns must not queue the audit again
+            st.session_state.test_choice = None
+        if not urls:
+            st.error("No URLs selected for testing.")
+            return
+        logging.info(f"Queueing accessibility Tests from: {st.session_state.previous_url}")
+        st.session_state.job_id = audit_jobs.submit(
+            st.session_state.previous_url,
+            urls=urls,
+            lean_load=st.session_state.lean_load,
+            incremental=st.session_state.incremental,
+            template_sampling=st.session_state.template_sampling,
+            lastmod=st.session_state.sitemap_lastmod,
+            page_signatures=st.session_state.page_signatures,
+        )
+        st.session_state.show_tests = False
 
-    def perform_selected_tests(self, tester: AccessibilityTester) -> None:
+    def perform_selected_tests(self) -> None:
         """
         Perform accessibility tests on selected URLs.
-
-        Args:
-            tester (AccessibilityTester): The tester instance to run the tests.
         """
         with st.form(key='run_tests_form', clear_on_submit=True):
             #st.subheader("Select URLs to test", divider="grey")
             selected_urls: list[str] = st.multiselect("Select URLs to test", options=list(st.session_state.extracted_urls), default=None, placeholder="Choose URLs To Test")
             run_tests_button_pressed = st.form_submit_button(label='Run Accessibility Tests')
         if run_tests_button_pressed:
-            self.perform_tests(tester, set(selected_urls))
+            self.perform_tests(set(selected_urls))
+
+    @staticmethod
+    def build_job_progress() -> None:
+        """
+        Shows the progress of the audit job the session is attached to, polling it while it runs.
+        When the job finishes, its run is shown in the results view.
+        """
+        job_id = st.session_state.get('job_id')
+        if not job_id:
+            return
+        job = audit_jobs.store.get(job_id)
+        if job is None:
+            st.session_state.job_id = None
+            return
+        if job['status'] in ACTIVE_STATES:
+            _job_progress_fragment(job_id)
+            return
+        UIComponents.display_job(job)
+        UIComponents.display_job_warnings(job)
+        if job['status'] in (INTERRUPTED, FAILED) and job['test_directory']:
+            if st.button("Resume audit", help="Continue from the last checkpoint without testing completed pages again"):
+                audit_jobs.resume(job_id)
+                st.session_state.show_tests = False
+                st.rerun()
+
+    @staticmethod
+    def display_job(job: dict) -> None:
+        """
+        Shows the state and progress figures of an audit job.
+
+        Args:
+            job (Dict): A job row of the JobStore.
+        """
+        total = job['pages_total']
+        finished = job['pages_done'] + job['pages_failed']
+        if job['status'] == QUEUED:
+            st.info(f"Audit of {job['url']} is queued behind other audits.")
+        elif job['status'] == RUNNING:
+            if total:
+                eta = f", about {format_duration(job['eta_seconds'])} left" if job['eta_seconds'] is not None else ""
+                # the URLs of a sitemap are still being found while the first ones are audited
+                found = " found so far" if job['urls'] is None else ""
+                st.progress(min(finished / total, 1.0),
+                            text=f"Auditing {job['url']}: {finished} of {total} pages{found}, {job['pages_per_minute']:.1f} pages/min{eta}")
+            else:
+                st.info(f"Finding URLs on {job['url']}")
+        elif job['status'] == DONE:
+            failed = f", {job['pages_failed']} failed" if job['pages_failed'] else ""
+            st.success(f"Accessibility tests of {job['pages_done']} pages completed in {format_duration(job['elapsed_seconds'])}{failed}, using Axe-Core version: {job['axe_version']}")
+        elif job['status'] == INTERRUPTED:
+            st.warning(f"The audit of {job['url']} was interrupted by a restart of the app.")
+        else:
+            st.error(f"The audit of {job['url']} failed: {job['error'] or 'no results were returned'}")
+
+    @staticmethod
+    def display_job_warnings(job: dict, limit: int = 50) -> None:
+        """
+        Shows the warnings the tester reported for a job, e.g. the URLs without results.
+
+        Args:
+            job (Dict): A job row of the JobStore.
+            limit (int, optional): The number of warnings shown. Defaults to 50.
+        """
+        warnings = job['warnings'].splitlines() if job['warnings'] else []
+        if not warnings:
+            return
+        with st.expander(f"{len(warnings)} warning(s)", expanded=len(warnings) <= 5):
+            for message in warnings[:limit]:
+                st.warning(message)
+            if len(warnings) > limit:
+                st.caption(f"... and {len(warnings) - limit} more, see the log.")
+
+    @staticmethod
+    def build_jobs_panel() -> None:
+        """
+        Lists the recent audit jobs of all users and lets the session attach to one of them.
+        """
+        jobs = audit_jobs.store.recent()
+        if not jobs:
+            return
+        with st.expander(f"Audit jobs ({sum(job['status'] in ACTIVE_STATES for job in jobs)} active)"):
+            st.dataframe(
+                pd.DataFrame(jobs)[['id', 'url', 'status', 'pages_done', 'pages_failed', 'pages_total', 'pages_per_minute']],
+                hide_index=True,
+            )
+            labels = {job['id']: f"{job['url']} ({job['status']}, {job['id']})" for job in jobs}
+            job_id = st.selectbox("Follow job", list(labels), format_func=labels.get)
+            if st.button("Follow"):
+                st.session_state.job_id = job_id
+                st.session_state.show_tests = False
+                st.rerun()
 
     @staticmethod
     def display_gauge_chart(score: int) -> None:
@@ -331,12 +576,12 @@ class UIComponents:
         """
         #st.write("Download Test Results")
     
-        # Extract the filename without extension
-        selected_file_name = os.path.splitext(os.path.basename(selected_file_path))[0]
+        # Extract the filename without extension (.json, or .json.gz with columnar storage)
+        json_file = os.path.basename(selected_file_path)
+        selected_file_name = json_file.removesuffix('.gz').removesuffix('.json')
         logging.info(f"Selected file name (without extension): {selected_file_name}")
 
-        # Construct the expected filenames for JSON and CSV based on the selected file name
-        json_file = f"{selected_file_name}.json"
+        # Construct the expected filename for the CSV based on the selected file name
         csv_file = f"{selected_file_name}.csv"
     
     # Check if the files exist in the directory
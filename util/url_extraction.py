@@ -0,0 +1,143 @@
+# util/url_extraction.py
+
+import logging
+from collections.abc import Iterator
+
+from config.constants import CRAWL_MAX_WORKERS
+from util.metrics import SpanLog, timed
+from util.run_checkpoint import RunCheckpoint
+from util.sitemap_parser import SitemapParser
+from util.website_crawler import WebsiteCrawler
+
+# How the URLs of a site are found: the entered URL only, its sitemap, or a crawl
+EXTRACTION_METHODS = ('homepage', 'sitemap', 'crawl')
+
+
+class ExtractedUrls:
+    """
+    The URLs found for a site, with what was learned about them on the way.
+
+    Iterating yields the URLs. A streamed extraction (see `extract_urls`) yields them while the
+    sitemap is still being expanded and fills `urls` and `lastmod` as it goes; they are complete
+    once the iteration has finished.
+
+    Attributes:
+        urls (Set[str]): The URLs to test.
+        lastmod (Dict[str, str]): The sitemap `<lastmod>` of every URL that declares one.
+        page_signatures (Dict[str, str]): The DOM signatures recorded by the crawler, see TemplateSampler.
+        source (str): The extraction method that produced the URLs.
+    """
+
+    def __init__(self, urls: set[str], source: str, lastmod: dict[str, str] | None = None,
+                 page_signatures: dict[str, str] | None = None):
+        self.urls = urls
+        self.source = source
+        self.lastmod = lastmod if lastmod is not None else {}
+        self.page_signatures = page_signatures or {}
+        self._pending: Iterator[str] | None = None
+
+    def __iter__(self) -> Iterator[str]:
+        if self._pending is None:
+            yield from sorted(self.urls)
+            return
+        pending, self._pending = self._pending, None
+        yield from pending
+
+
+def extract_urls(url: str, method: str = 'sitemap', crawl_depth: int = 2,
+                 crawl_workers: int = CRAWL_MAX_WORKERS, crawl_fallback: bool = True,
+                 checkpoint: RunCheckpoint | None = None, stream: bool = False) -> ExtractedUrls:
+    """
+    Finds the URLs to test for a site without any UI.
+
+    With `stream`, a sitemap extraction returns at once and its URLs are produced while iterating
+    over the result, so it can be passed to `AccessibilityTester.test_urls` and the audit starts
+    with the first URL. If the sitemap yields nothing, the iteration falls back to a crawl.
+
+    With a checkpoint, the extracted URLs are saved as the test plan of the run, and a plan saved
+    earlier is returned without extracting again; an interrupted crawl continues from its checkpoint.
+    The timing spans of the extraction are recorded in the run directory of the checkpoint.
+
+    Args:
+        url (str): The entered URL.
+        method (str, optional): One of EXTRACTION_METHODS. Defaults to 'sitemap'.
+        crawl_depth (int, optional): The crawl depth. Defaults to 2.
+        crawl_workers (int, optional): The number of concurrent crawl requests. Defaults to CRAWL_MAX_WORKERS.
+        crawl_fallback (bool, optional): Crawl the site if its sitemap yields no URLs. Defaults to True.
+        checkpoint (RunCheckpoint, optional): The checkpoint of the run. Defaults to None.
+        stream (bool, optional): Produce the URLs of a sitemap while iterating. Defaults to False.
+
+    Returns:
+        ExtractedUrls: The URLs found, empty if none were.
+    """
+    plan = checkpoint.load_plan() if checkpoint else None
+    if plan:
+        logging.info(f"Using the {len(plan['urls'])} URLs extracted earlier in {checkpoint.directory}")
+        return ExtractedUrls(set(plan['urls']), plan['source'], plan['lastmod'], plan['page_signatures'])
+
+    span_log = SpanLog(checkpoint.directory) if checkpoint else None
+    if stream and method == 'sitemap':
+        return _stream_sitemap(url, crawl_depth, crawl_workers, crawl_fallback, checkpoint, span_log)
+    with timed("extraction", span_log, url=url, method=method) as span:
+        extracted = _extract(url, method, crawl_depth, crawl_workers, crawl_fallback, checkpoint, span_log)
+        span.update(source=extracted.source, urls=len(extracted.urls))
+    if checkpoint and extracted.urls:
+        checkpoint.save_plan(extracted.urls, extracted.source, extracted.lastmod, extracted.page_signatures)
+    return extracted
+
+
+def _extract(url: str, method: str, crawl_depth: int, crawl_workers: int, crawl_fallback: bool,
+             checkpoint: RunCheckpoint | None, span_log: SpanLog | None) -> ExtractedUrls:
+    """
+    Extracts the URLs with the given method, see `extract_urls`.
+    """
+    if method not in EXTRACTION_METHODS:
+        raise ValueError(f"Unknown extraction method {method!r}, expected one of {EXTRACTION_METHODS}")
+
+    if method == 'homepage':
+        return ExtractedUrls({url}, 'homepage')
+
+    if method == 'sitemap':
+        sitemap_parser = SitemapParser(url, span_log=span_log)
+        urls = set(sitemap_parser.iter_urls())
+        logging.info(f"Extracted {len(urls)} URLs from the sitemap of {url}")
+        if urls:
+            return ExtractedUrls(urls, 'sitemap', lastmod=sitemap_parser.lastmod)
+        if not crawl_fallback:
+            logging.warning(f"No URLs found in the sitemap of {url}")
+            return ExtractedUrls(set(), 'sitemap')
+        logging.info(f"No usable sitemap on {url}: crawling for URLs")
+
+    crawler = WebsiteCrawler(url, max_workers=crawl_workers, checkpoint=checkpoint, span_log=span_log)
+    urls = crawler.crawl_urls_to_test(url, crawl_depth)
+    return ExtractedUrls(set(urls), 'crawl', page_signatures=crawler.page_signatures)
+
+
+def _stream_sitemap(url: str, crawl_depth: int, crawl_workers: int, crawl_fallback: bool,
+                    checkpoint: RunCheckpoint | None, span_log: SpanLog | None) -> ExtractedUrls:
+    """
+    Extracts the URLs of a sitemap while they are iterated over, see `extract_urls`.
+    The test plan is saved once the sitemap is fully expanded.
+    """
+    sitemap_parser = SitemapParser(url, span_log=span_log)
+    extracted = ExtractedUrls(set(), 'sitemap', lastmod=sitemap_parser.lastmod)
+
+    def produce() -> Iterator[str]:
+        # the span also covers the time the consumer spends between two URLs
+        with timed("extraction", span_log, url=url, method='sitemap', stream=True) as span:
+            for page_url in sitemap_parser.iter_urls():
+                extracted.urls.add(page_url)
+                yield page_url
+            logging.info(f"Extracted {len(extracted.urls)} URLs from the sitemap of {url}")
+            if not extracted.urls and crawl_fallback:
+                logging.info(f"No usable sitemap on {url}: crawling for URLs")
+                crawled = _extract(url, 'crawl', crawl_depth, crawl_workers, crawl_fallback, checkpoint, span_log)
+                extracted.urls, extracted.source = crawled.urls, crawled.source
+                extracted.page_signatures = crawled.page_signatures
+                yield from sorted(crawled.urls)
+            span.update(source=extracted.source, urls=len(extracted.urls))
+        if checkpoint and extracted.urls:
+            checkpoint.save_plan(extracted.urls, extracted.source, extracted.lastmod, extracted.page_signatures)
+
+    extracted._pending = produce()
+    return extracted
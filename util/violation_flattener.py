@@ -0,0 +1,89 @@
+# util/violation_flattener.py
+
+from typing import Any
+
+# Columns of a flattened violations table, one row per violating node
+VIOLATION_COLUMNS = ['ID', 'Description', 'Impact', 'Help', 'HTML', 'Target', 'Help URL', 'Tags',
+                     'FailureSummary', 'Data', 'Url']
+
+
+def flatten_targets(targets: list) -> str:
+    """
+    Joins the CSS selectors of a node; selectors inside iframes are nested lists.
+    """
+    return " | ".join([str(target) for sublist in targets for target in (sublist if isinstance(sublist, list) else [sublist])])
+
+
+def _table_data(node: dict[str, Any]) -> str:
+    """
+    The 'Data' of the report viewer: the data of the node's "any" checks.
+    """
+    data_list: list[Any] = []
+    for item in node.get('any', []):
+        data = item.get('data', [])
+        if isinstance(data, list):
+            data_list.extend(data)
+        else:
+            data_list.append(data)
+    return " | ".join([str(data_item) for data_item in data_list])
+
+
+def _csv_data(node: dict[str, Any]) -> str:
+    """
+    The 'Data' of the CSV export: the data of the node's "any", "all" and "none" checks,
+    with dicts written as `key: value` and the check id for checks without data.
+    """
+    data_list: list[str] = []
+    for key in ("any", "all", "none"):
+        for item in node.get(key, []):
+            data = item.get('data')
+            if data is None:
+                data_list.append(item.get('id'))
+            elif isinstance(data, list):
+                data_list.extend(str(data_item) for data_item in data)
+            elif isinstance(data, dict):
+                data_list.append(" | ".join(f"{k}: {v}" for k, v in data.items()))
+            elif isinstance(data, str):
+                data_list.append(data)
+    return " | ".join(data_list) if data_list else "No data available"
+
+
+# How the 'Data' column is built: "table" for the report viewer and columnar store, "csv" for the CSV export
+_DATA_STYLES = {"table": _table_data, "csv": _csv_data}
+
+
+def flatten_violations(violations: list[dict[str, Any]], url: str, data_style: str = "table") -> dict[str, list]:
+    """
+    Flattens axe `violations` (or `incomplete`) results into columns with one row per node.
+
+    The columns are built directly as lists in a single pass: rule-level values are repeated once per
+    rule instead of once per node, and no per-row dicts are created. The result can be passed to
+    `pd.DataFrame`, `pyarrow.table` or, zipped, to `csv.writer.writerows`.
+
+    Args:
+        violations (List[Dict]): The axe rule results.
+        url (str): The tested URL, repeated in the 'Url' column.
+        data_style (str, optional): "table" or "csv", see `_DATA_STYLES`. Defaults to "table".
+
+    Returns:
+        Dict[str, List]: The columns of VIOLATION_COLUMNS; 'Tags' holds the list of tags of each row.
+    """
+    node_data = _DATA_STYLES[data_style]
+    columns: dict[str, list] = {column: [] for column in VIOLATION_COLUMNS}
+    for violation in violations:
+        nodes = violation['nodes']
+        count = len(nodes)
+        if not count:
+            continue
+        columns['ID'].extend([violation.get('id', '')] * count)
+        columns['Description'].extend([violation.get('description', '')] * count)
+        columns['Impact'].extend([violation.get('impact', '')] * count)
+        columns['Help'].extend([violation.get('help', '')] * count)
+        columns['Help URL'].extend([violation.get('helpUrl', '')] * count)
+        columns['Tags'].extend([violation.get('tags', [])] * count)
+        columns['HTML'].extend([node.get('html', '') for node in nodes])
+        columns['Target'].extend([flatten_targets(node.get('target', [])) for node in nodes])
+        columns['FailureSummary'].extend([node.get('failureSummary', '') for node in nodes])
+        columns['Data'].extend([node_data(node) for node in nodes])
+    columns['Url'] = [url] * len(columns['ID'])
+    return columns
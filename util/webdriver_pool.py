@@ -0,0 +1,332 @@
+# util/webdriver_pool.py
+
+import atexit
+import logging
+import os
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from webdriver_manager.chrome import ChromeDriverManager
+
+from config.constants import (
+    AXE_MAX_WORKERS,
+    BROWSER_MEMORY_MB,
+    PAGE_READY_STRATEGY,
+    WEBDRIVER_MAX_MEMORY_MB,
+    WEBDRIVER_MAX_PAGES,
+    WEBDRIVER_POOL_SIZE,
+)
+
+
+def create_chrome_driver() -> webdriver.Chrome:
+    """
+    Starts a new headless Chrome, choosing the chromedriver depending on the environment.
+
+    Returns:
+        webdriver.Chrome: The started driver.
+    """
+    opts = Options()
+    # driver.get returns at the load event, or at DOMContentLoaded if the "dom" readiness was opted into;
+    # PageReadiness decides how much longer to wait
+    opts.page_load_strategy = "eager" if PAGE_READY_STRATEGY == "dom" else "normal"
+    opts.add_argument("--headless=new")
+    opts.add_argument("--disable-gpu")
+    opts.add_argument("--no-sandbox")
+    opts.add_argument("--disable-dev-shm-usage")
+    opts.add_argument("--window-size=1920x1080")
+
+    if os.getenv("DOCKER_ENV", "").lower() == "true":
+        logging.info("Docker environment detected – using system chromedriver")
+        return webdriver.Chrome(service=Service("/usr/bin/chromedriver"),
+                                options=opts)
+    else:
+        logging.info("Local environment – using webdriver_manager")
+        return webdriver.Chrome(service=Service(ChromeDriverManager().install()),
+                                options=opts)
+
+
+def default_worker_count() -> int:
+    """
+    Returns how many browsers can run in parallel on this machine.
+
+    The count is bounded by AXE_MAX_WORKERS, the number of CPU cores and the free RAM
+    divided by BROWSER_MEMORY_MB.
+
+    Returns:
+        int: The number of parallel browser workers, at least 1.
+    """
+    workers = min(AXE_MAX_WORKERS, os.cpu_count() or 1)
+    try:
+        available_mb = os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") // (1024 * 1024)
+        workers = min(workers, available_mb // BROWSER_MEMORY_MB)
+    except (ValueError, OSError, AttributeError):
+        pass  # sysconf is not available on every platform
+    return max(1, workers)
+
+
+class PooledDriver:
+    """
+    Bookkeeping for one browser instance owned by the pool.
+
+    Attributes:
+        driver (webdriver.Chrome): The browser instance.
+        pages (int): The number of pages audited with this browser.
+        state (Dict[str, Any]): Per-session setup done by users of the browser, e.g. registered scripts.
+    """
+
+    def __init__(self, driver: webdriver.Chrome):
+        self.driver = driver
+        self.pages = 0
+        self.state: dict[str, Any] = {}
+
+
+class WebDriverPool:
+    """
+    A thread-safe pool of warm headless Chrome instances shared by all testers in the process.
+
+    Browsers are health-checked when they are checked out and replaced after `max_pages`
+    audited pages or once their process tree exceeds `max_memory_mb`.
+
+    Attributes:
+        max_size (int): The maximum number of browsers alive at the same time.
+        max_pages (int): The number of pages after which a browser is recycled.
+        max_memory_mb (int): The memory usage in MB after which a browser is recycled.
+    """
+
+    def __init__(self, max_size: int = WEBDRIVER_POOL_SIZE, max_pages: int = WEBDRIVER_MAX_PAGES,
+                 max_memory_mb: int = WEBDRIVER_MAX_MEMORY_MB, driver_factory=create_chrome_driver):
+        """
+        Initializes an empty pool. Browsers are started lazily on first checkout.
+
+        Args:
+            max_size (int, optional): The maximum number of browsers. Defaults to WEBDRIVER_POOL_SIZE.
+            max_pages (int, optional): Pages per browser before recycling. Defaults to WEBDRIVER_MAX_PAGES.
+            max_memory_mb (int, optional): Memory per browser before recycling. Defaults to WEBDRIVER_MAX_MEMORY_MB.
+            driver_factory (Callable[[], webdriver.Chrome], optional): Starts a new browser.
+        """
+        self.max_size = max(1, max_size)
+        self.max_pages = max_pages
+        self.max_memory_mb = max_memory_mb
+        self._driver_factory = driver_factory
+        self._idle: list[PooledDriver] = []
+        self._in_use: dict[int, PooledDriver] = {}
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    # ------------------------------------------------------------------ #
+    # Checkout / return                                                  #
+    # ------------------------------------------------------------------ #
+    def acquire(self, timeout: float | None = None) -> webdriver.Chrome:
+        """
+        Checks out a healthy browser, starting a new one if none is idle and the pool is not full.
+
+        Args:
+            timeout (float, optional): Seconds to wait for a browser to become free. Waits forever if None.
+
+        Returns:
+            webdriver.Chrome: A browser reserved for the caller until `release` is called.
+
+        Raises:
+            TimeoutError: If no browser became available within `timeout`.
+        """
+        with self._cond:
+            while not self._idle and self._size >= self.max_size:
+                if not self._cond.wait(timeout):
+                    raise TimeoutError("No WebDriver became available in the pool")
+            entry = self._idle.pop() if self._idle else None
+            if entry is None:
+                self._size += 1  # Reserve the slot before starting the browser outside the lock
+
+        if entry is not None and (not self._is_healthy(entry.driver) or self._needs_recycling(entry)):
+            self._quit(entry.driver)
+            entry = None
+
+        if entry is None:
+            try:
+                entry = PooledDriver(self._driver_factory())
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            logging.info("Started a new pooled WebDriver")
+
+        with self._cond:
+            self._in_use[id(entry.driver)] = entry
+        return entry.driver
+
+    def release(self, driver: webdriver.Chrome) -> None:
+        """
+        Returns a checked-out browser to the pool, or quits it if it should be recycled.
+
+        Args:
+            driver (webdriver.Chrome): A browser obtained from `acquire`.
+        """
+        with self._cond:
+            entry = self._in_use.pop(id(driver), None)
+        if entry is None:
+            return
+
+        if self._closed or self._needs_recycling(entry):
+            self._discard(driver)
+            return
+
+        try:
+            driver.get("about:blank")  # Drop the page and its memory before idling
+        except Exception:
+            pass
+        with self._cond:
+            self._idle.append(entry)
+            self._cond.notify()
+
+    @contextmanager
+    def driver(self, timeout: float | None = None) -> Iterator[webdriver.Chrome]:
+        """
+        Context manager that borrows a browser and returns it to the pool afterwards.
+        """
+        driver = self.acquire(timeout)
+        try:
+            yield driver
+        finally:
+            self.release(driver)
+
+    def record_page(self, driver: webdriver.Chrome, failed: bool = False) -> webdriver.Chrome:
+        """
+        Counts an audited page for a checked-out browser and swaps it for a fresh one if it is due.
+
+        Args:
+            driver (webdriver.Chrome): A browser obtained from `acquire`.
+            failed (bool): Whether the audit failed. The browser is then health-checked and
+                replaced if it no longer responds, so one crashed browser cannot fail every later page.
+
+        Returns:
+            webdriver.Chrome: The browser to keep using, which may be a new instance.
+        """
+        with self._cond:
+            entry = self._in_use.get(id(driver))
+        if entry is None:
+            return driver
+
+        entry.pages += 1
+        if failed and not self._is_healthy(driver):
+            self._discard(driver)
+            return self.acquire()
+        if not self._needs_recycling(entry):
+            return driver
+
+        logging.info(f"Recycling WebDriver after {entry.pages} pages")
+        self.release(driver)
+        return self.acquire()
+
+    def driver_state(self, driver: webdriver.Chrome) -> dict[str, Any]:
+        """
+        Returns the per-session state of a checked-out browser. It lives as long as the browser,
+        so one-time setup such as script registration survives across test runs.
+
+        Args:
+            driver (webdriver.Chrome): A browser obtained from `acquire`.
+
+        Returns:
+            Dict[str, Any]: The mutable state, or an empty throwaway dict for unknown browsers.
+        """
+        with self._cond:
+            entry = self._in_use.get(id(driver))
+        return entry.state if entry is not None else {}
+
+    # ------------------------------------------------------------------ #
+    # Health and recycling                                               #
+    # ------------------------------------------------------------------ #
+    @staticmethod
+    def _is_healthy(driver: webdriver.Chrome) -> bool:
+        """
+        Checks that the browser session still responds.
+        """
+        try:
+            driver.execute_script("return 1;")
+            return True
+        except Exception as e:
+            logging.warning(f"Discarding unresponsive WebDriver: {e}")
+            return False
+
+    def _needs_recycling(self, entry: PooledDriver) -> bool:
+        """
+        Checks the page count and the memory usage of a browser against the pool limits.
+        """
+        if self.max_pages and entry.pages >= self.max_pages:
+            return True
+        if self.max_memory_mb:
+            memory_mb = self.memory_usage_mb(entry.driver)
+            if memory_mb is not None and memory_mb > self.max_memory_mb:
+                logging.info(f"WebDriver uses {memory_mb:.0f} MB, above the {self.max_memory_mb} MB limit")
+                return True
+        return False
+
+    @staticmethod
+    def memory_usage_mb(driver: webdriver.Chrome) -> float | None:
+        """
+        Returns the resident memory in MB of the chromedriver process and all browser processes below it.
+        Only available on Linux; returns None elsewhere.
+        """
+        try:
+            pending = [driver.service.process.pid]
+        except AttributeError:
+            return None
+
+        total_kb = 0
+        try:
+            while pending:
+                pid = pending.pop()
+                with open(f"/proc/{pid}/status") as status:
+                    for line in status:
+                        if line.startswith("VmRSS:"):
+                            total_kb += int(line.split()[1])
+                            break
+                for task in os.listdir(f"/proc/{pid}/task"):
+                    with open(f"/proc/{pid}/task/{task}/children") as children:
+                        pending.extend(int(child) for child in children.read().split())
+        except (OSError, ValueError):
+            if not total_kb:
+                return None
+        return total_kb / 1024
+
+    def _discard(self, driver: webdriver.Chrome) -> None:
+        """
+        Quits a browser and frees its slot in the pool.
+        """
+        self._quit(driver)
+        with self._cond:
+            self._in_use.pop(id(driver), None)
+            self._size -= 1
+            self._cond.notify()
+
+    @staticmethod
+    def _quit(driver: webdriver.Chrome) -> None:
+        """
+        Quits a browser, ignoring errors from already dead sessions.
+        """
+        try:
+            driver.quit()
+        except Exception as e:
+            logging.debug(f"Error while quitting WebDriver: {e}")
+
+    def shutdown(self) -> None:
+        """
+        Quits all idle browsers. Browsers still checked out are quit when they are released.
+        """
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._closed = True
+        for entry in idle:
+            self._quit(entry.driver)
+
+
+# Process-wide pool shared by all AccessibilityTester instances
+webdriver_pool = WebDriverPool()
+atexit.register(webdriver_pool.shutdown)
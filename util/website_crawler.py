@@ -1,14 +1,21 @@
 # website_crawler.py
 
 import logging
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from urllib.parse import urljoin, urlparse
 
 import requests
 from bs4 import BeautifulSoup
 
-from config.constants import USER_AGENT
+from config.constants import CRAWL_CHECKPOINT_INTERVAL, CRAWL_MAX_WORKERS
 
 from .helper_functions import HelperFunctions
+from .metrics import SpanLog, metrics, timed
+from .rate_limiter import host_rate_limiter
+from .robots_cache import robots_cache
+from .run_checkpoint import RunCheckpoint
+from .template_sampler import TemplateSampler
 
 
 class WebsiteCrawler:
@@ -16,69 +23,197 @@ class WebsiteCrawler:
     A class to crawl a website and gather all accessible URLs.
 
     This crawler respects the 'nofollow' directive in hyperlinks and supports setting a maximum crawl depth.
+    Pages are fetched breadth-first by a bounded pool of worker threads sharing one pooled session.
 
     Attributes:
         root_url (str): The base URL of the website to crawl.
         crawled_urls (Set[str]): A set of URLs found during crawling.
         hostname (str): The hostname of the root URL.
         user_agent (str): The user agent string to use for requests.
+        max_workers (int): The number of concurrent fetch workers.
         session (requests.Session): A session object for making HTTP requests.
+        content_type_verdicts (Dict[str, bool]): Whether each fetched URL served HTML, kept for the crawl.
+        page_signatures (Dict[str, str]): The DOM signature of every crawled page, used for template sampling.
+        checkpoint (RunCheckpoint | None): Where the crawl state is saved to and resumed from, if anywhere.
+        span_log (SpanLog | None): Where the timing spans of every fetched page are recorded, if anywhere.
     """
 
-    def __init__(self, root_url: str, user_agent: str = '*'):
+    def __init__(self, root_url: str, user_agent: str = '*', max_workers: int = CRAWL_MAX_WORKERS,
+                 checkpoint: RunCheckpoint | None = None, span_log: SpanLog | None = None):
         """
         Initializes the WebsiteCrawler with the root URL and user agent.
 
         Args:
             root_url (str): The base URL of the website to crawl.
             user_agent (str, optional): The user agent string to use for requests. Defaults to '*'.
+            max_workers (int, optional): The number of concurrent fetch workers. Defaults to CRAWL_MAX_WORKERS.
+            checkpoint (RunCheckpoint, optional): Saves the crawl state periodically and resumes an unfinished
+                crawl from it. Defaults to None.
+            span_log (SpanLog, optional): Records the robots, fetch and parse spans of every page. Defaults to None.
         """
         self.root_url = root_url
         self.crawled_urls: set[str] = set()
         self.hostname = urlparse(root_url).hostname
         self.user_agent = user_agent
-        self.session = requests.Session()  # Session for repeated requests
-####
-        self.session.headers.update({"User-Agent": USER_AGENT})
-    ######    
-    
+        self.max_workers = max(1, max_workers)
+        self.session = HelperFunctions.create_session(pool_size=self.max_workers)  # Shared by all workers
+        self.content_type_verdicts: dict[str, bool] = {}
+        self.page_signatures: dict[str, str] = {}
+        self.checkpoint = checkpoint
+        self.span_log = span_log
+
     def crawl(self, url: str, max_depth: int = 6, current_depth: int = 0) -> None:
         """
-        Recursively crawl a website starting from a root URL up to a maximum depth.
+        Crawl a website breadth-first starting from a root URL up to a maximum depth.
+
+        URLs are taken from a FIFO frontier and fetched by up to `max_workers` threads at a time.
+        Every URL is scheduled at most once, at the shallowest depth it was discovered at.
+        With a checkpoint, the frontier (including the URLs being fetched), the scheduled and crawled
+        URLs are saved every CRAWL_CHECKPOINT_INTERVAL pages, and a crawl of the same URL and depth
+        continues from the last saved state without fetching the crawled pages again.
 
         Args:
             url (str): The starting URL to crawl from.
             max_depth (int): The maximum depth to crawl.
-            current_depth (int): The current depth of the crawl.
+            current_depth (int): The depth of the starting URL.
 
         Returns:
             None
         """
-        #logging.info(f"Crawling URL: {url} at depth {current_depth}")
         if current_depth > max_depth:
             return
-        ###### added self.session to can-fetch
-        if HelperFunctions.is_valid_url(url, self.root_url, self.session) and HelperFunctions.can_fetch(url, self.user_agent, self.session):
-       
-            try:
-                response = self.session.get(url)
-                #logging.info(f"HTTP response for {url}: {response.status_code}")
-                if response.status_code == 200:
-                    clean_url = urlparse(url)._replace(fragment='').geturl()
+
+        frontier: deque[tuple[str, int]] = deque([(url, current_depth)])
+        scheduled: set[str] = {url}
+        pending: dict[Future, tuple[str, int]] = {}
+
+        state = self.checkpoint.load_crawl() if self.checkpoint else None
+        if state and state["url"] == url and state["max_depth"] == max_depth:
+            frontier = deque((frontier_url, depth) for frontier_url, depth in state["frontier"])
+            scheduled = set(state["scheduled"])
+            self.crawled_urls.update(state["crawled"])
+            self.page_signatures.update(state["page_signatures"])
+            self.content_type_verdicts.update(dict.fromkeys(state["rejected"], False))
+            logging.info(f"Resuming crawl of {url}: {len(self.crawled_urls)} pages crawled, {len(frontier)} in the frontier")
+
+        fetched = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="crawler") as pool:
+            while frontier or pending:
+                # Keep the pool saturated without queueing the whole frontier at once
+                while frontier and len(pending) < self.max_workers * 2:
+                    next_url, depth = frontier.popleft()
+                    pending[pool.submit(self._fetch_page, next_url, depth < max_depth)] = (next_url, depth)
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    depth = pending.pop(future)[1]
+                    fetched += 1
+                    clean_url, links = future.result()
+                    if clean_url is None:
+                        continue
                     self.crawled_urls.add(clean_url)
                     logging.info(f"Added: {clean_url}")
-                    soup = BeautifulSoup(response.content, "html.parser")
-                    for link in soup.find_all('a', href=True):
-                        if link.get('rel') == ['nofollow']:
-                            continue # Skip 'nofollow' links
-                        href = link.get('href')
-                        parsed_href = urlparse(href)
-                        new_url = href if parsed_href.hostname == self.hostname else urljoin(self.root_url, href)
-                       
-                        if new_url not in self.crawled_urls:
-                            self.crawl(new_url, max_depth, current_depth + 1)
-            except requests.RequestException as e:
-                logging.error(f"Error crawling URL {url}: {e}")
+                    for new_url in links:
+                        if new_url not in scheduled and new_url not in self.crawled_urls:
+                            scheduled.add(new_url)
+                            frontier.append((new_url, depth + 1))
+
+                if self.checkpoint and fetched >= CRAWL_CHECKPOINT_INTERVAL:
+                    fetched = 0
+                    # URLs being fetched go back to the front of the frontier of a resumed crawl
+                    self._save_checkpoint(url, max_depth, [*pending.values(), *frontier], scheduled, complete=False)
+
+        if self.checkpoint:
+            self._save_checkpoint(url, max_depth, [], scheduled, complete=True)
+
+    def _save_checkpoint(self, url: str, max_depth: int, frontier: list[tuple[str, int]],
+                         scheduled: set[str], complete: bool) -> None:
+        """
+        Saves the crawl state to the checkpoint of the run.
+        """
+        self.checkpoint.save_crawl({
+            "url": url,
+            "max_depth": max_depth,
+            "complete": complete,
+            "frontier": frontier,
+            "scheduled": sorted(scheduled),
+            "crawled": sorted(self.crawled_urls),
+            "page_signatures": dict(self.page_signatures),
+            "rejected": [rejected_url for rejected_url, is_html in list(self.content_type_verdicts.items()) if not is_html],
+        })
+
+    def _fetch_page(self, url: str, follow_links: bool) -> tuple[str | None, list[str]]:
+        """
+        Fetches a single page and extracts the links to follow from it. Runs on a worker thread.
+
+        The page is requested once with a streamed GET. The Content-Type is checked from the
+        response headers and the body of non-HTML responses is never downloaded.
+
+        Args:
+            url (str): The URL to fetch.
+            follow_links (bool): Whether links should be extracted from the page.
+
+        Returns:
+            Tuple[Optional[str], List[str]]: The cleaned URL (None if the page was rejected) and its links.
+        """
+        if self.content_type_verdicts.get(url) is False:
+            return None, []
+        # robots.txt is fetched here on the first URL of a host, and the crawl delay is waited for
+        with timed("crawl_robots", self.span_log, url=url):
+            allowed = (HelperFunctions.is_valid_url(url, self.root_url, self.session, check_content_type=False)
+                       and HelperFunctions.can_fetch(url, self.user_agent, self.session))
+            if allowed:
+                robots_cache.wait_for_crawl_delay(url, self.user_agent, self.session)
+        if not allowed:
+            return None, []
+
+        try:
+            with timed("crawl_fetch", self.span_log, url=url) as span, \
+                    self.session.get(url, stream=True, timeout=10) as response:
+                span["status"] = response.status_code
+                is_html = HelperFunctions.is_html_response(response)
+                self.content_type_verdicts[url] = is_html
+                self.content_type_verdicts[response.url] = is_html
+                if not is_html:
+                    logging.debug(f"URL rejected due to content type: {url}")
+                    metrics.inc("a11y_crawled_pages_total", outcome="rejected")
+                    return None, []  # Closing the response aborts the body download
+                if response.status_code != 200:
+                    metrics.inc("a11y_crawled_pages_total", outcome="rejected")
+                    return None, []
+                content = response.content
+                span["bytes"] = len(content)
+        except requests.RequestException as e:
+            logging.error(f"Error crawling URL {url}: {e}")
+            metrics.inc("a11y_crawled_pages_total", outcome="error")
+            return None, []
+
+        metrics.inc("a11y_crawled_pages_total", outcome="html")
+        clean_url = urlparse(url)._replace(fragment='').geturl()
+        with timed("crawl_parse", self.span_log, url=url):
+            soup = BeautifulSoup(content, "html.parser")
+            self.page_signatures[clean_url] = TemplateSampler.dom_signature(soup)
+            links = self._extract_links(soup) if follow_links else []
+        return clean_url, links
+
+    def _extract_links(self, soup: BeautifulSoup) -> list[str]:
+        """
+        Extracts the followable links from an HTML document.
+
+        Args:
+            soup (BeautifulSoup): The parsed HTML of the page.
+
+        Returns:
+            List[str]: The absolute URLs of all links not marked as 'nofollow'.
+        """
+        links = []
+        for link in soup.find_all('a', href=True):
+            if link.get('rel') == ['nofollow']:
+                continue # Skip 'nofollow' links
+            href = link.get('href')
+            parsed_href = urlparse(href)
+            links.append(href if parsed_href.hostname == self.hostname else urljoin(self.root_url, href))
+        return links
 
     def get_crawled_urls(self) -> set[str]:
         """
@@ -104,6 +239,9 @@ class WebsiteCrawler:
             #logging.info(f"Starting crawl for {url} with depth {crawl_depth}")
             self.crawl(url, max_depth=crawl_depth)
             logging.info(f"Crawling {url} finished with {len(self.crawled_urls)} URLs found")
+            logging.info(f"robots.txt cache: {robots_cache.stats()}")
+            logging.info(f"Request rates per host: {host_rate_limiter.stats()}")
+            metrics.write_textfile()
         except Exception as e:
             logging.error(f"Unexpected error during crawling: {e}")
         finally:
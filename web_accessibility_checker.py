@@ -51,10 +51,15 @@ def main() -> None:
     with test_choice_container:
         ui.handle_test_choice()
 
+    # Progress of the background audit this session follows, and the audits of all users
+    ui.build_job_progress()
+    ui.build_jobs_panel()
+
     # Display results if tests have been performed
     if st.session_state.show_tests:
         base_results_directory = 'data/accessibility_results'
-        latest_results_directory = helper.get_latest_results_directory(base_results_directory)
+        # the run of the audit job this session followed, else the latest run
+        latest_results_directory = st.session_state.results_directory or helper.get_latest_results_directory(base_results_directory)
         
         st.subheader('a11y Test Results')
         # Define the layout for results display
@@ -70,6 +75,8 @@ def main() -> None:
             ui.build_results_display(latest_results_directory)
         with gauge_container:
             ui.build_gauge_and_download_display(latest_results_directory)
+
+        ui.build_site_overview(latest_results_directory)
         
         if not st.session_state.test_choice == 'Select specific URLs':
             st.session_state.test_choice = False
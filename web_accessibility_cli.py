@@ -0,0 +1,166 @@
+# web_accessibility_cli.py
+
+"""
+Headless entry point of the Web Accessibility Checker for cron jobs and CI pipelines.
+
+Finds the URLs of a site, audits them with axe-core and saves the results like the Streamlit app does:
+
+    python -m web_accessibility_cli https://example.com --method crawl --depth 3 --workers 4
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import sys
+import threading
+
+from config.constants import (
+    AXE_MAX_WORKERS,
+    CRAWL_MAX_WORKERS,
+    FULL_ACCESSIBILITY_RESULTS_DIRECTORY,
+    INCREMENTAL_AUDIT,
+    LEAN_LOAD,
+    METRICS_PORT,
+    RESULTS_STORAGE,
+)
+from util.accessibility_tester import AccessibilityTester
+from util.helper_functions import HelperFunctions
+from util.metrics import SpanLog, metrics
+from util.run_checkpoint import RunCheckpoint
+from util.site_aggregator import SiteAggregator
+from util.template_sampler import TemplateSampler
+from util.url_extraction import EXTRACTION_METHODS, extract_urls
+
+# Exit codes: every URL audited, no URL audited, some URLs failed
+EXIT_OK, EXIT_FAILED, EXIT_PARTIAL = 0, 1, 2
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """
+    Parses the command-line arguments.
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m web_accessibility_cli",
+        description="Audit the accessibility of a website with axe-core, without the Streamlit UI.",
+    )
+    parser.add_argument("url", help="The URL of the website to audit.")
+    parser.add_argument("--method", choices=EXTRACTION_METHODS, default="sitemap",
+                        help="How URLs are found: the URL only, its sitemap (crawling if it has none) or a crawl. Default: sitemap.")
+    parser.add_argument("--depth", type=int, default=2, help="The crawl depth. Default: 2.")
+    parser.add_argument("--workers", type=int, default=AXE_MAX_WORKERS,
+                        help=f"Concurrent browser sessions for the audit. Default: {AXE_MAX_WORKERS}.")
+    parser.add_argument("--crawl-workers", type=int, default=CRAWL_MAX_WORKERS,
+                        help=f"Concurrent requests while crawling. Default: {CRAWL_MAX_WORKERS}.")
+    parser.add_argument("--output-dir", default=FULL_ACCESSIBILITY_RESULTS_DIRECTORY,
+                        help=f"The results directory; runs are saved to <output-dir>/<domain>/<timestamp>. Default: {FULL_ACCESSIBILITY_RESULTS_DIRECTORY}.")
+    parser.add_argument("--storage", choices=("json", "columnar"), default=RESULTS_STORAGE,
+                        help=f"The result storage format. Default: {RESULTS_STORAGE}.")
+    parser.add_argument("--lean-load", action=argparse.BooleanOptionalAction, default=LEAN_LOAD,
+                        help="Block images, media and trackers while pages load.")
+    parser.add_argument("--incremental", action=argparse.BooleanOptionalAction, default=INCREMENTAL_AUDIT,
+                        help="Reuse the results of pages unchanged since the last run.")
+    parser.add_argument("--sample", action="store_true",
+                        help="Audit representative URLs of every page template only.")
+    parser.add_argument("--resume", metavar="RUN_DIRECTORY",
+                        help="Continue an interrupted run from the checkpoint in its run directory, "
+                             "without crawling or testing completed URLs again.")
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT,
+                        help="Serve Prometheus metrics at http://0.0.0.0:<port>/metrics while the audit runs. "
+                             "Default: A11Y_METRICS_PORT, off if 0.")
+    parser.add_argument("--json", action="store_true", help="Print the run summary as JSON.")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log debug messages.")
+    return parser.parse_args(argv)
+
+
+def run(args: argparse.Namespace) -> int:
+    """
+    Extracts the URLs, audits them and prints the run summary.
+
+    Returns:
+        int: The exit code, see EXIT_OK, EXIT_FAILED and EXIT_PARTIAL.
+    """
+    if args.resume:
+        if not os.path.isdir(args.resume):
+            logging.error(f"No run directory {args.resume}")
+            return EXIT_FAILED
+        test_directory = args.resume
+    else:
+        test_directory = HelperFunctions.create_test_directory(args.url, args.output_dir)
+    checkpoint = RunCheckpoint(test_directory)
+
+    # sitemap URLs are audited while the sitemap is still being expanded, unless templates are sampled
+    extracted = extract_urls(args.url, args.method, args.depth, args.crawl_workers, checkpoint=checkpoint,
+                             stream=not args.sample)
+    urls = extracted.urls
+    streamed = not args.sample and not urls
+    if args.sample and not urls:
+        logging.error(f"No URLs found for {args.url}")
+        return EXIT_FAILED
+
+    clusters = None
+    if args.sample and len(urls) > 1:
+        clusters = TemplateSampler().cluster(urls, extracted.page_signatures)
+        urls = TemplateSampler.representatives(clusters)
+        logging.info(f"{len(extracted.urls)} URLs share {len(clusters)} page templates. Testing {len(urls)} representative URLs.")
+
+    lock = threading.Lock()
+    done = 0
+
+    def on_page(url: str, succeeded: bool) -> None:
+        nonlocal done
+        with lock:
+            done += 1
+            # while streaming, the total is the number of URLs found so far
+            total = len(extracted.urls if streamed else urls)
+            logging.info(f"[{done}/{total}] {'OK' if succeeded else 'FAILED'} {url}")
+
+    tester = AccessibilityTester(workers=args.workers, lean_load=args.lean_load, incremental=args.incremental,
+                                 storage=args.storage, results_directory=args.output_dir)
+    results, axe_version = tester.test_urls(extracted if streamed else urls, lastmod=extracted.lastmod,
+                                            on_page=on_page, test_directory=test_directory, resume=bool(args.resume))
+    if streamed:
+        urls = extracted.urls
+    if not urls:
+        logging.error(f"No URLs found for {args.url}")
+        return EXIT_FAILED
+    if not results:
+        return EXIT_FAILED
+    if clusters:
+        TemplateSampler.save_report(clusters, results, tester.test_directory)
+
+    summary = SiteAggregator(tester.test_directory).aggregate()["summary"]
+    summary.update({
+        "url": args.url,
+        "test_directory": tester.test_directory,
+        "axe_version": axe_version,
+        "extracted_urls": len(extracted.urls),
+        "tested_urls": len(urls),
+        "failed_urls": len(urls) - len(results),
+    })
+    # pages without a score make the averages NaN, which is not valid JSON
+    summary = {key: None if isinstance(value, float) and math.isnan(value) else value
+               for key, value in summary.items()}
+    if args.json:
+        # seconds per phase (count, total, p50, p95, p99, max), see run_metrics.json
+        summary["phases"] = SpanLog(tester.test_directory).summarize()
+        print(json.dumps(summary, indent=4))
+    else:
+        for key, value in summary.items():
+            print(f"{key}: {value}")
+    return EXIT_OK if len(results) == len(urls) else EXIT_PARTIAL
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    # progress and problems go to stderr, the summary to stdout
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO,
+                        format='%(asctime)s %(levelname)s %(message)s', stream=sys.stderr)
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+    return run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())